@@ -0,0 +1,251 @@
+"""
+API Client - rate limiting, retries and latency stats around the IQ_Option API
+
+ApiClient wraps an IQ_Option instance. Every endpoint call goes through:
+
+    priority gate   orders (buy) go first: background calls (candles,
+                    balance, ...) wait while an order is waiting or in flight
+    token bucket    per-endpoint rate / burst limit
+    retry policy    bounded retries with jittered exponential backoff,
+                    only for idempotent reads - buy is never retried
+    histogram       per-endpoint latency buckets (plus calls/errors/retries)
+
+Methods without a policy are passed through to the wrapped object.
+
+Limits can be overridden in config.json:
+    "api": {"rate_limits": {"get_candles": [5, 10]}, "max_retries": 2, "retry_backoff": 0.5}
+"""
+
+import time
+import random
+import logging
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# endpoint -> (tokens per second, burst)
+DEFAULT_RATE_LIMITS = {
+    'buy': (2.0, 5),   # burst covers one batch of simultaneous orders
+    'get_candles': (5.0, 10),
+    'check_win_v4': (5.0, 5),
+    'get_balance': (2.0, 2),
+    'get_optioninfo_v2': (1.0, 2),
+    'get_all_init_v2': (0.2, 2),  # bulk instrument status (asset cache)
+}
+ORDER_ENDPOINTS = {'buy'}
+IDEMPOTENT_ENDPOINTS = {'get_candles', 'get_balance', 'get_optioninfo_v2', 'get_all_init_v2'}
+
+LATENCY_BUCKETS_MS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 70000)
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, up to `capacity` stored"""
+
+    def __init__(self, rate, capacity):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Take one token, sleeping until one is available; returns the time waited"""
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram (milliseconds)"""
+
+    def __init__(self, bounds=LATENCY_BUCKETS_MS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # last bucket = above the largest bound
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        ms = seconds * 1000
+        self.counts[bisect_left(self.bounds, ms)] += 1
+        self.total += ms
+        self.max = max(self.max, ms)
+
+    @property
+    def count(self):
+        return sum(self.counts)
+
+    def percentile(self, q):
+        """Upper bound of the bucket holding the q-th percentile (ms)"""
+        n = self.count
+        if n == 0:
+            return 0.0
+        rank = q / 100 * n
+        seen = 0
+        for bound, count in zip(self.bounds + (self.max,), self.counts):
+            seen += count
+            if seen >= rank:
+                return float(min(bound, self.max))
+        return self.max
+
+
+class PriorityGate:
+    """Lets background calls through only while no order is waiting or in flight"""
+
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.orders = 0
+
+    @contextmanager
+    def order(self):
+        with self.cond:
+            self.orders += 1
+        try:
+            yield
+        finally:
+            with self.cond:
+                self.orders -= 1
+                self.cond.notify_all()
+
+    def wait_background(self, timeout=30):
+        """Block a background call until no order is pending (returns the time waited)"""
+        start = time.monotonic()
+        with self.cond:
+            self.cond.wait_for(lambda: self.orders == 0, timeout=timeout)
+        return time.monotonic() - start
+
+
+class EndpointStats:
+    """Counters and latency histogram of one endpoint"""
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.throttled = 0.0  # seconds spent waiting on the bucket / priority gate
+        self.latency = LatencyHistogram()
+        self.lock = threading.Lock()  # order threads call the same endpoint at once
+
+    def add(self, calls=0, errors=0, retries=0, throttled=0.0, latency=None):
+        with self.lock:
+            self.calls += calls
+            self.errors += errors
+            self.retries += retries
+            self.throttled += throttled
+            if latency is not None:
+                self.latency.record(latency)
+
+    def snapshot(self):
+        """Consistent copy of the counters: (calls, errors, retries, throttled, p50, p95, max)"""
+        with self.lock:
+            return (self.calls, self.errors, self.retries, self.throttled,
+                    self.latency.percentile(50), self.latency.percentile(95), self.latency.max)
+
+
+class ApiClient:
+    """Rate-limited, retrying, instrumented wrapper around an IQ_Option object"""
+
+    def __init__(self, api, config=None):
+        config = config or {}
+        self.api = api
+        self.max_retries = config.get('max_retries', 2)
+        self.retry_backoff = config.get('retry_backoff', 0.5)
+
+        limits = dict(DEFAULT_RATE_LIMITS)
+        limits.update({name: tuple(value) for name, value in config.get('rate_limits', {}).items()})
+        self.buckets = {name: TokenBucket(rate, burst) for name, (rate, burst) in limits.items()}
+
+        self.gate = PriorityGate()
+        self.local = threading.local()  # per-thread wait of the last call in its token bucket
+        self.stats = {}
+        self.stats_lock = threading.Lock()
+
+    def __getattr__(self, name):
+        attr = getattr(self.api, name)
+        if name not in self.buckets or not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            return self.call(name, attr, *args, **kwargs)
+        return call
+
+    def _stats(self, name):
+        with self.stats_lock:
+            if name not in self.stats:
+                self.stats[name] = EndpointStats()
+            return self.stats[name]
+
+    def call(self, name, fn, *args, **kwargs):
+        """Call one endpoint through the priority gate, limiter and retry policy"""
+        stats = self._stats(name)
+
+        if name in ORDER_ENDPOINTS:
+            with self.gate.order():
+                return self._attempt(name, fn, stats, args, kwargs, retries=0)
+
+        stats.add(throttled=self.gate.wait_background())
+        retries = self.max_retries if name in IDEMPOTENT_ENDPOINTS else 0
+        return self._attempt(name, fn, stats, args, kwargs, retries)
+
+    def _attempt(self, name, fn, stats, args, kwargs, retries):
+        for attempt in range(retries + 1):
+            self.local.waited = self.buckets[name].acquire()
+            stats.add(calls=1, throttled=self.local.waited)
+            start = time.monotonic()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                stats.add(errors=1, latency=time.monotonic() - start)
+                if attempt >= retries:
+                    raise
+                error = e
+            else:
+                latency = time.monotonic() - start
+                if result is not None or attempt >= retries:
+                    stats.add(latency=latency)
+                    return result
+                stats.add(errors=1, latency=latency)
+                error = "empty response"
+
+            stats.add(retries=1)
+            delay = self.retry_backoff * (2 ** attempt) * random.uniform(0.5, 1.5)
+            logger.warning(f"⚠️  {name} failed ({error}), retry {attempt + 1}/{retries} in {delay:.1f}s")
+            time.sleep(delay)
+
+    def last_wait(self):
+        """Seconds the calling thread's last call waited in its rate limiter"""
+        return getattr(self.local, 'waited', 0.0)
+
+    def summary(self):
+        """{endpoint: {calls, errors, retries, throttled_s, p50_ms, p95_ms, max_ms}}"""
+        with self.stats_lock:
+            items = list(self.stats.items())
+        summary = {}
+        for name, s in sorted(items):
+            calls, errors, retries, throttled, p50, p95, top = s.snapshot()
+            summary[name] = {
+                'calls': calls,
+                'errors': errors,
+                'retries': retries,
+                'throttled_s': round(throttled, 3),
+                'p50_ms': round(p50, 1),
+                'p95_ms': round(p95, 1),
+                'max_ms': round(top, 1),
+            }
+        return summary
+
+    def log_summary(self):
+        for name, s in self.summary().items():
+            logger.info(f"📡 {name}: {s['calls']} calls, {s['errors']} errors, {s['retries']} retries, "
+                        f"p50≤{s['p50_ms']:.0f}ms p95≤{s['p95_ms']:.0f}ms max {s['max_ms']:.0f}ms, "
+                        f"throttled {s['throttled_s']:.1f}s")
@@ -0,0 +1,87 @@
+"""
+Asset Cache - open/closed status and payout of every instrument, one bulk call
+
+IQ Option lists every instrument with its state in the init data
+(get_all_init_v2): per option type, each active has
+
+    name            "front.EURUSD", "front.EURUSD-OTC", ...
+    enabled         tradable at all
+    is_suspended    temporarily closed (e.g. the regular market is shut
+                    while only the -OTC instrument trades)
+    commission      option.profit.commission in percent - payout = 1 - commission
+
+The cache loads that once and refreshes it when it is older than `ttl`
+seconds, so the scan loop and the order path can skip a closed or
+low-payout pair with a dictionary lookup - before any candle request or
+indicator work. If the bulk call fails, the last good snapshot is kept;
+without any snapshot (or for a pair it does not list) every pair is
+allowed and the broker decides.
+
+Config (config.json "assets"):
+    "assets": {"ttl": 300, "min_payout": 0.75, "option_type": "turbo"}
+"""
+
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL = 300              # seconds
+DEFAULT_OPTION_TYPE = "turbo"  # 1-minute options
+
+
+def parse_init(data, option_type=DEFAULT_OPTION_TYPE):
+    """{pair: (open, payout or None)} from get_all_init_v2() data"""
+    assets = {}
+    actives = ((data or {}).get(option_type) or {}).get('actives') or {}
+    for active in actives.values():
+        name = str(active.get('name', ''))
+        name = name.split('.', 1)[1] if '.' in name else name
+        is_open = bool(active.get('enabled')) and not active.get('is_suspended', False)
+        commission = ((active.get('option') or {}).get('profit') or {}).get('commission')
+        payout = (100.0 - float(commission)) / 100.0 if commission is not None else None
+        assets[name] = (is_open, payout)
+    return assets
+
+
+class AssetCache:
+    """Instrument availability with a TTL, refreshed from one bulk call"""
+
+    def __init__(self, fetch, ttl=DEFAULT_TTL, min_payout=None, option_type=DEFAULT_OPTION_TYPE):
+        self.fetch = fetch
+        self.ttl = ttl
+        self.min_payout = min_payout
+        self.option_type = option_type
+        self.assets = {}
+        self.loaded_at = None
+        self.lock = threading.Lock()
+
+    def refresh(self, now):
+        """Reload the snapshot (a failed or empty load keeps the previous one)"""
+        try:
+            assets = parse_init(self.fetch(), self.option_type)
+        except Exception as e:
+            assets = None
+            logger.warning(f"⚠️  Asset status refresh failed: {e}")
+        with self.lock:
+            self.loaded_at = now  # retried after the next ttl either way
+            if not assets:
+                return False
+            self.assets = assets
+        closed = sum(1 for is_open, _ in assets.values() if not is_open)
+        logger.info(f"🏷️  Asset status: {len(assets)} {self.option_type} instruments, {closed} closed")
+        return True
+
+    def unavailable(self, pair, now):
+        """Reason `pair` cannot be traded right now (None if it can or is unknown)"""
+        if self.loaded_at is None or now - self.loaded_at >= self.ttl:
+            self.refresh(now)
+        status = self.assets.get(pair)
+        if status is None:
+            return None
+        is_open, payout = status
+        if not is_open:
+            return "market closed"
+        if self.min_payout is not None and payout is not None and payout < self.min_payout:
+            return f"payout {payout:.0%} below {self.min_payout:.0%}"
+        return None
@@ -0,0 +1,117 @@
+"""
+Bot State - warm state carried between scheduled bot runs
+
+Snapshot file (.state/bot_state.npz, restored/saved by actions/cache):
+    meta                 uint8   JSON: version, saved_at, last_evaluated, pending, shadow, bars
+    <pair>/time          int64   epoch seconds of each buffered 1m candle
+    <pair>/open ... /volume  float64
+    <pair>@<tf>/...      same columns for the higher-timeframe bars (timeframes.py)
+
+The candle buffer of a pair is the exact window the indicators are computed
+on (the ta indicators are recomputed from it, so the buffer is their whole
+state). last_evaluated holds the start time of the last completed candle
+each pair was evaluated on, pending the trades opened but not settled and
+shadow the hypothetical trades of the shadow variants still open. The
+5m/15m/1h bars outlive the 1m window, so they are kept here too.
+"""
+
+import os
+import json
+import time
+import logging
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PATH = ".state/bot_state.npz"
+STATE_VERSION = 1
+CANDLE_COLUMNS = ('open', 'high', 'low', 'close', 'volume')
+
+
+class BotState:
+    """Candle buffers, decision cache and pending trades of the bot"""
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        self.candles = {}          # pair -> DataFrame(time, open, high, low, close, volume)
+        self.last_evaluated = {}   # pair -> epoch seconds of the last evaluated completed candle
+        self.pending = {}          # trade_id (str) -> open trade record
+        self.shadow = []           # open hypothetical trades (shadow.py)
+        self.bars = {}             # pair -> timeframe -> DataFrame of completed bars
+        self.saved_at = None
+
+    @classmethod
+    def load(cls, path=DEFAULT_PATH):
+        """Restore a snapshot (an empty state if missing, unreadable or from another version)"""
+        state = cls(path)
+        if not os.path.exists(path):
+            return state
+
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                meta = json.loads(data['meta'].tobytes().decode('utf-8'))
+                if meta.get('version') != STATE_VERSION:
+                    logger.warning(f"⚠️  Ignoring bot state version {meta.get('version')}")
+                    return state
+
+                for pair in meta.get('pairs', []):
+                    state.candles[pair] = _read_frame(data, pair)
+                for pair, timeframes in meta.get('bars', {}).items():
+                    state.bars[pair] = {tf: _read_frame(data, f"{pair}@{tf}") for tf in timeframes}
+
+            state.last_evaluated = {pair: int(t) for pair, t in meta.get('last_evaluated', {}).items()}
+            state.pending = meta.get('pending', {})
+            state.shadow = meta.get('shadow', [])
+            state.saved_at = meta.get('saved_at')
+        except Exception as e:
+            logger.warning(f"⚠️  Failed to restore bot state: {e}")
+            return cls(path)
+
+        return state
+
+    def save(self):
+        """Write the snapshot atomically"""
+        arrays = {}
+        pairs = []
+        for pair, df in self.candles.items():
+            if df is None or df.empty:
+                continue
+            _write_frame(arrays, pair, df)
+            pairs.append(pair)
+
+        bars = {}
+        for pair, timeframes in self.bars.items():
+            for tf, df in timeframes.items():
+                if df is not None and not df.empty:
+                    _write_frame(arrays, f"{pair}@{tf}", df)
+                    bars.setdefault(pair, []).append(tf)
+
+        meta = {
+            'version': STATE_VERSION,
+            'saved_at': time.time(),
+            'pairs': sorted(pairs),
+            'last_evaluated': self.last_evaluated,
+            'pending': self.pending,
+            'shadow': self.shadow,
+            'bars': bars,
+        }
+        arrays['meta'] = np.frombuffer(json.dumps(meta, default=str).encode('utf-8'), dtype=np.uint8)
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = self.path + ".tmp.npz"
+        np.savez_compressed(tmp, **arrays)
+        os.replace(tmp, self.path)
+        self.saved_at = meta['saved_at']
+
+
+def _write_frame(arrays, prefix, df):
+    arrays[f"{prefix}/time"] = ((df['time'] - pd.Timestamp(0)) // pd.Timedelta(seconds=1)).to_numpy(dtype=np.int64)
+    for name in CANDLE_COLUMNS:
+        arrays[f"{prefix}/{name}"] = df[name].to_numpy(dtype=np.float64)
+
+
+def _read_frame(data, prefix):
+    df = pd.DataFrame({name: data[f"{prefix}/{name}"] for name in CANDLE_COLUMNS})
+    df.insert(0, 'time', pd.to_datetime(data[f"{prefix}/time"], unit='s'))
+    return df
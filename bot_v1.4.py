@@ -6,8 +6,13 @@ Lightweight bot designed to run on GitHub Actions (max 11 min per run)
 Features:
 - Checks all enabled currency pairs for signals
 - Executes trades on IQ Option (Practice account)
-- Saves results to trades.csv
+- Saves results to the trade store (trades.csv or the partitioned trade archive)
 - Designed for scheduled runs (every 30 minutes)
+- BOT_RECORD=<path> records every external input; --replay <path> replays it offline
+
+Usage:
+  python bot_v1.4.py
+  python bot_v1.4.py --replay run.botrec
 """
 
 import os
@@ -17,8 +22,25 @@ import json
 import pandas as pd
 import numpy as np
 import logging
+import argparse
+import tempfile
+import threading
 from datetime import datetime, timedelta
 
+from api_client import DEFAULT_RATE_LIMITS, ApiClient
+from assets import DEFAULT_OPTION_TYPE, DEFAULT_TTL, AssetCache
+from bot_state import DEFAULT_PATH as STATE_PATH, BotState
+from candle_snapshots import SnapshotArchive
+from indicators import IndicatorBatch
+from risk import RiskEngine
+from recorder import (Clock, RecordingBroker, RecordingClock, RecordingStore, ReplayBroker, ReplayClock,
+                      ReplayStore, compare_trades, load_recording, start_recording, write_workspace)
+from shadow import DEFAULT_VARIANTS as SHADOW_PATH, ShadowRunner
+from timeframes import TIMEFRAMES, confirmation, required_timeframes, update_bars
+from ledger import DEFAULT_DRIFT_THRESHOLD, DEFAULT_RECONCILE_INTERVAL, BalanceLedger
+from trade_schema import TIME_FORMAT
+from trade_store import open_trade_store
+
 # Setup logging
 logging.basicConfig(
     level=logging.INFO,
@@ -30,6 +52,11 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+CONFIG_PATH = "versions/v1.4/config.json"
+CANDLE_WINDOW = 100         # candles the indicators are computed on
+PENDING_MAX_AGE = 24 * 3600  # give up recovering an unsettled trade after a day
+SUBMIT_TIMEOUT = 30          # seconds execute_batch waits for the orders of a batch to be sent
+
 # Import IQ Option API
 try:
     from iqoptionapi.stable_api import IQ_Option
@@ -37,35 +64,76 @@ except ImportError:
     logger.error("iqoptionapi not installed. Install with: pip install iqoptionapi")
     sys.exit(1)
 
-# Import TA library
-try:
-    import ta
-except ImportError:
-    logger.error("ta library not installed. Install with: pip install ta")
-    sys.exit(1)
+
+class OrderTask:
+    """One order of a batch: its signal, submit/ack times, limiter wait and settled record"""
+
+    def __init__(self, signal, amount):
+        self.signal = signal
+        self.pair = signal['pair']
+        self.amount = amount
+        self.submitted_at = None
+        self.acked_at = None
+        self.queued = 0.0                # seconds the buy waited in the rate limiter
+        self.placed = False
+        self.record = None
+        self.sent = threading.Event()   # buy answered (or failed)
+        self.done = threading.Event()   # settled, failed or given up
 
 
 class TradeBotV14:
     """Lightweight Trading Bot for GitHub Actions"""
 
-    def __init__(self):
-        """Initialize bot"""
-        self.config = self.load_config()
+    def __init__(self, broker=None, clock=None, store=None, recording=None,
+                 config=None, risk=None, snapshots=None, state_path=STATE_PATH):
+        """
+        Initialize bot
+
+        broker, clock, store: stand-ins for IQ_Option, the wall clock and the
+        TRADE_STORE store (replay); recording: event log every input goes to
+        config, risk, snapshots, state_path: one shard of coordinator.py (its
+        pairs, the shared risk budget and snapshot archive, its own state)
+        """
+        self.config = config or self.load_config()
         self.api = None
+        self.ledger = None
+        self.broker = broker
+        self.recording = recording
+        self.clock = clock or (RecordingClock(recording) if recording else Clock())
+        self.snapshots = snapshots or SnapshotArchive()
+        self.store = store or open_trade_store()  # TRADE_STORE env var (default csv:trades.csv)
+        if recording:
+            self.store = RecordingStore(self.store, recording)
+        self.state = BotState.load(state_path)  # warm state from the previous run (actions/cache)
+        self.risk = risk or RiskEngine(self.config.get('risk', {}))
+        self.shadow = ShadowRunner.load(self.config, self.state.shadow)  # config variants, no orders
+        # pair -> higher timeframes its live or shadow config confirms with
+        self.timeframes = {}
+        for pairs in [self.config['currencies']] + (list(self.shadow.configs.values()) if self.shadow else []):
+            for pair, cfg in pairs.items():
+                names = required_timeframes([cfg])
+                if names:
+                    self.timeframes.setdefault(pair, set()).update(names)
+        # order threads share the state snapshot and trade store - the main loop
+        # takes it too when it changes the state, so a save never sees a dict resized
+        self.io_lock = threading.RLock()
+        self.open_orders = []  # OrderTasks whose order thread is still waiting for the result
 
         # Load credentials from environment
         self.email = os.getenv("IQ_EMAIL")
         self.password = os.getenv("IQ_PASSWORD")
         self.mode = os.getenv("IQ_MODE", "PRACTICE").upper()
 
-        if not self.email or not self.password:
+        if broker is None and (not self.email or not self.password):
             raise ValueError("IQ_EMAIL and IQ_PASSWORD must be set in environment")
 
         logger.info(f"✅ Bot initialized in {self.mode} mode")
+        if self.shadow:
+            logger.info(f"🧪 Shadow mode: {len(self.shadow.configs) - 1} variant(s) + live -> {self.shadow.path}")
 
     def load_config(self):
         """Load config from versions/v1.4/config.json"""
-        config_path = "versions/v1.4/config.json"
+        config_path = CONFIG_PATH
 
         if not os.path.exists(config_path):
             raise FileNotFoundError(f"Config file not found: {config_path}")
@@ -80,7 +148,11 @@ class TradeBotV14:
         """Connect to IQ Option"""
         logger.info(f"🔌 Connecting to IQ Option ({self.mode})...")
 
-        self.api = IQ_Option(self.email, self.password)
+        # Rate limits, retries for idempotent reads, orders ahead of candle refreshes
+        broker = self.broker or IQ_Option(self.email, self.password)
+        if self.recording:
+            broker = RecordingBroker(broker, self.recording)
+        self.api = ApiClient(broker, self.config.get('api'))
         check, reason = self.api.connect()
 
         if not check:
@@ -99,12 +171,24 @@ class TradeBotV14:
         balance = self.api.get_balance()
         logger.info(f"💰 Current balance: ${balance:.2f}")
 
+        # Local ledger: trade records read capital from it, the broker is checked in the background
+        ledger_config = self.config.get('ledger', {})
+        self.ledger = BalanceLedger(balance, ledger_config.get('drift_threshold', DEFAULT_DRIFT_THRESHOLD))
+        interval = ledger_config.get('reconcile_interval', DEFAULT_RECONCILE_INTERVAL)
+        if interval:  # null = no background reconcile (replay)
+            self.ledger.start_reconciler(self.api.get_balance, interval)
+
+        # Open/closed status and payout of every instrument (one bulk call per ttl)
+        asset_config = self.config.get('assets', {})
+        self.assets = AssetCache(self.api.get_all_init_v2, asset_config.get('ttl', DEFAULT_TTL),
+                                 asset_config.get('min_payout'), asset_config.get('option_type', DEFAULT_OPTION_TYPE))
+
         return True
 
     def get_candles(self, pair, count=100):
         """Get candles for a currency pair"""
         try:
-            candles = self.api.get_candles(pair, 60, count, time.time())
+            candles = self.api.get_candles(pair, 60, count, self.clock.time())
 
             if not candles:
                 return pd.DataFrame()
@@ -119,44 +203,96 @@ class TradeBotV14:
             logger.error(f"Error fetching candles for {pair}: {e}")
             return pd.DataFrame()
 
-    def calculate_indicators(self, df, config):
-        """Calculate technical indicators"""
-        if df.empty or len(df) < 50:
-            return df
-
-        ind = config.get('indicators', self.config['default_indicators'])
-
-        # ADX
-        adx_indicator = ta.trend.ADXIndicator(
-            high=df['high'], low=df['low'], close=df['close'], window=14
-        )
-        df['adx'] = adx_indicator.adx()
-
-        # MACD
-        macd = ta.trend.MACD(
-            close=df['close'], window_slow=13, window_fast=5, window_sign=3
-        )
-        df['macd'] = macd.macd()
-        df['macd_signal'] = macd.macd_signal()
-
-        # RSI
-        df['rsi'] = ta.momentum.RSIIndicator(
-            close=df['close'], window=ind.get('rsi_period', 14)
-        ).rsi()
-
-        # EMA
-        df['ema20'] = ta.trend.EMAIndicator(
-            close=df['close'], window=ind.get('ema_period', 20)
-        ).ema_indicator()
+    def update_candles(self, pair):
+        """
+        Bring the pair's candle buffer up to date, fetching only the missing candles
+
+        The buffer keeps the last CANDLE_WINDOW candles (including the one still
+        forming), i.e. the same window a full fetch would return.
+        """
+        buffer = self.state.candles.get(pair)
+        count = CANDLE_WINDOW
+        if buffer is not None and not buffer.empty:
+            last = buffer['time'].iloc[-1].timestamp()
+            # +2: re-fetch the last buffered candle (it may have been forming) with overlap
+            count = min(CANDLE_WINDOW, int((self.clock.time() - last) // 60) + 2)
+
+        fresh = self.get_candles(pair, count)
+        if fresh.empty:
+            return buffer if buffer is not None else fresh
+
+        if count < CANDLE_WINDOW and fresh['time'].iloc[0] <= buffer['time'].iloc[-1]:
+            merged = pd.concat([buffer[buffer['time'] < fresh['time'].iloc[0]], fresh], ignore_index=True)
+            buffer = merged.tail(CANDLE_WINDOW).reset_index(drop=True)
+        elif count < CANDLE_WINDOW:
+            # hole between the buffer and the new candles - start over
+            buffer = self.get_candles(pair, CANDLE_WINDOW)
+        else:
+            buffer = fresh
+
+        with self.io_lock:  # an order thread may be saving the state
+            self.state.candles[pair] = buffer
+        return buffer
+
+    def calculate_indicators(self, frames):
+        """
+        Calculate technical indicators for many pairs at once
+
+        Windows of the same length are stacked into one (pairs x candles)
+        array; each indicator series is computed for all of them in a single
+        vectorized pass and shared by everyone asking for the same periods.
+        Returns {pair: IndicatorBatch holding its row}.
+        """
+        groups = {}
+        for pair, df in frames.items():
+            groups.setdefault(len(df), {})[pair] = df
+
+        batches = {}
+        for group in groups.values():
+            batches.update(dict.fromkeys(group, IndicatorBatch(group)))
+        return batches
+
+    def update_timeframes(self, windows):
+        """
+        Bring the higher-timeframe bars of the evaluated pairs up to date
+
+        Bars are resampled from the 1m windows (no extra requests) and kept
+        in the warm state. Returns {timeframe: {pair: IndicatorBatch}}.
+        """
+        frames = {}
+        for pair, df in windows.items():
+            bars = dict(self.state.bars.get(pair, {}))
+            for name in self.timeframes.get(pair, ()):
+                bars[name] = update_bars(bars.get(name), df, TIMEFRAMES[name])
+                if not bars[name].empty:
+                    frames.setdefault(name, {})[pair] = bars[name]
+            with self.io_lock:
+                self.state.bars[pair] = bars
+        return {name: self.calculate_indicators(group) for name, group in frames.items()}
+
+    def confirm(self, pair, direction, pair_config, timeframes):
+        """Reason the configured higher timeframes reject `direction` (None = confirmed / none required)"""
+        for name, rule in pair_config.get('confirm', {}).items():
+            batch = timeframes.get(name, {}).get(pair)
+            reason = confirmation(batch, pair, direction, rule) if batch is not None else "no bars yet"
+            if reason:
+                return f"{name} {reason}"
+        return None
 
-        # Slope
-        df['slope'] = df['close'].diff(10) / 10
+    def indicator_settings(self, pair_config):
+        return pair_config.get('indicators', self.config['default_indicators'])
 
-        return df
+    def read_row(self, batch, pair, ind):
+        """Indicators of the pair's last completed candle, with the periods of `ind`"""
+        # ⚠️ IMPORTANT: Use completed candle only (like backtester)
+        # row -1 = current candle (may not be closed yet)
+        # row -2 = previous candle (definitely closed)
+        # This matches backtester logic: use candles_df.iloc[i-50:i]
+        return batch.row(pair, -2, ind.get('ema_period', 20), ind.get('rsi_period', 14))
 
-    def check_trading_hours(self, pair_config):
-        """Check if within trading hours"""
-        now = datetime.utcnow()
+    def check_trading_hours(self, pair_config, now=None):
+        """Check if within trading hours (now: UTC datetime, default current time)"""
+        now = now or self.clock.utcnow()
         hour = now.hour
 
         start = pair_config['trading_hours']['start']
@@ -167,9 +303,9 @@ class TradeBotV14:
         else:
             return start <= hour < end
 
-    def check_session_filter(self, pair_config):
-        """Check session filter for allowed direction"""
-        hour = datetime.utcnow().hour
+    def check_session_filter(self, pair_config, now=None):
+        """Check session filter for allowed direction (now: UTC datetime, default current time)"""
+        hour = (now or self.clock.utcnow()).hour
 
         for session, direction in pair_config.get('session_filters', {}).items():
             start, end = map(int, session.split('-'))
@@ -178,54 +314,79 @@ class TradeBotV14:
 
         return None
 
-    def generate_signal(self, pair, pair_config):
-        """Generate trading signal (using completed candles only, like backtester)"""
+    def is_pair_open(self, pair_config, now):
+        """True if the pair may trade at `now` (trading hours and a session direction)"""
+        return self.check_trading_hours(pair_config, now) and self.check_session_filter(pair_config, now) is not None
+
+    def next_open(self, pairs, now):
+        """
+        Earliest time >= now at which any of the pairs may trade (None if not within 24h)
+
+        Trading hours and session filters are hour-based, so scanning hour
+        starts gives the exact opening time.
+        """
+        if any(self.is_pair_open(cfg, now) for cfg in pairs.values()):
+            return now
+
+        hour_start = now.replace(minute=0, second=0, microsecond=0)
+        for h in range(1, 25):
+            candidate = hour_start + timedelta(hours=h)
+            if any(self.is_pair_open(cfg, candidate) for cfg in pairs.values()):
+                return candidate
+        return None
+
+    def next_wakeup(self, offset, now=None):
+        """Epoch seconds of the next 1m candle close + offset seconds"""
+        now = now if now is not None else self.clock.time()
+        wake = now // 60 * 60 + offset
+        return wake if wake > now else wake + 60
+
+    def load_window(self, pair, pair_config):
+        """Candle window to evaluate for a pair (None if outside its hours or already evaluated)"""
         # Check trading hours
         if not self.check_trading_hours(pair_config):
             return None
 
         # Check session filter
-        allowed_direction = self.check_session_filter(pair_config)
-        if not allowed_direction:
+        if not self.check_session_filter(pair_config):
             return None
 
-        # Get candles
-        df = self.get_candles(pair)
+        # Get candles (incremental: only candles missing from the buffer are fetched)
+        df = self.update_candles(pair)
         if df.empty or len(df) < 50:
             return None
 
-        # Calculate indicators
-        df = self.calculate_indicators(df, pair_config)
-
-        # ⚠️ IMPORTANT: Use completed candle only (like backtester)
-        # df.iloc[-1] = current candle (may not be closed yet)
-        # df.iloc[-2] = previous candle (definitely closed)
-        # This matches backtester logic: use candles_df.iloc[i-50:i]
-        latest = df.iloc[-2]  # Use completed candle
-        ind = pair_config.get('indicators', self.config['default_indicators'])
-
-        # Check indicators
-        if latest['adx'] < ind['adx_min']:
+        # Skip candles already evaluated (loop runs every 30s, candles close every 60s)
+        completed = int(df['time'].iloc[-2].timestamp())
+        if self.state.last_evaluated.get(pair) == completed:
+            logger.info(f"⏭️  {pair}: candle {df['time'].iloc[-2]} already evaluated")
             return None
+        with self.io_lock:
+            self.state.last_evaluated[pair] = completed
+        return df
 
-        if abs(latest['macd']) < ind['macd_min']:
-            return None
+    def generate_signal(self, pair, pair_config, batch, timeframes=None):
+        """
+        Generate trading signal from the pair's row of an indicator batch (completed candles only, like backtester)
 
-        price_ema_dist = abs(latest['close'] - latest['ema20']) / latest['close']
-        if price_ema_dist > ind['price_ema_max']:
+        timeframes: higher-timeframe batches (update_timeframes) for the
+        pair's "confirm" rules
+        """
+        allowed_direction = self.check_session_filter(pair_config)
+        if not allowed_direction:
             return None
 
-        # Determine signal
-        signal = None
-
-        if latest['slope'] > 0 and latest['macd'] > 0 and allowed_direction == 'call':
-            signal = 'call'
-        elif latest['slope'] < 0 and latest['macd'] < 0 and allowed_direction == 'put':
-            signal = 'put'
-
+        ind = self.indicator_settings(pair_config)
+        latest = self.read_row(batch, pair, ind)  # Use completed candle
+        signal = self.decide(latest, ind, allowed_direction)
         if not signal:
             return None
 
+        rejected = self.confirm(pair, signal, pair_config, timeframes or {})
+        if rejected:
+            logger.info(f"⏭️  {pair} {signal.upper()} not confirmed: {rejected}")
+            return None
+
         return {
             'pair': pair,
             'signal': signal,
@@ -234,90 +395,321 @@ class TradeBotV14:
             'macd': latest['macd'],
             'rsi': latest['rsi'],
             'ema20': latest['ema20'],
-            'time': latest['time']
+            'time': latest['time'],
+            'candles': batch.frame(pair, ind.get('ema_period', 20),
+                                   ind.get('rsi_period', 14)).iloc[:-1].tail(50)  # Completed candles + indicators the decision saw
         }
 
-    def execute_trade(self, signal):
-        """Execute binary options trade"""
-        pair = signal['pair']
-        direction = signal['signal']
+    def decide(self, latest, ind, allowed_direction):
+        """Signal direction ('call' / 'put') for one candle's indicators, or None"""
+        # Check indicators
+        if latest['adx'] < ind['adx_min']:
+            return None
+
+        if abs(latest['macd']) < ind['macd_min']:
+            return None
+
+        price_ema_dist = abs(latest['close'] - latest['ema20']) / latest['close']
+        if price_ema_dist > ind['price_ema_max']:
+            return None
+
+        # Determine signal
+        if latest['slope'] > 0 and latest['macd'] > 0 and allowed_direction == 'call':
+            return 'call'
+        if latest['slope'] < 0 and latest['macd'] < 0 and allowed_direction == 'put':
+            return 'put'
+        return None
+
+    def run_shadow(self, batches, now, timeframes=None):
+        """Settle and open hypothetical trades of the shadow variants (never breaks the trade path)"""
+        try:
+            start = time.perf_counter()
+            with self.io_lock:  # the shadow's open trades are part of the state snapshot
+                settled = self.shadow.settle(self.state.candles)
+                opened = self.shadow.evaluate(self, batches, now, timeframes)
+            if settled or opened:
+                logger.info(f"🧪 Shadow ({len(self.shadow.configs)} variants): {opened} opened, "
+                            f"{len(settled)} settled, {len(self.shadow.pending)} open "
+                            f"({(time.perf_counter() - start) * 1000:.1f}ms)")
+        except Exception as e:
+            logger.warning(f"⚠️  Shadow evaluation failed: {e}")
+
+    def execute_batch(self, signals):
+        """
+        Place all orders of one candle close concurrently
+
+        Risk and balance checks for the whole batch run atomically first, then
+        every reserved order gets its own thread; a barrier releases them
+        together so no pair enters late. Returns the placed orders as soon as
+        the buys are answered: each order thread waits for its own result and
+        saves the trade, so the loop is back in time for the next close. A pair
+        with an order still open is not ordered again.
+        """
         amount = self.config['amount']
+        busy = self.open_order_pairs()
+        # an instrument may have closed since the scan (refreshed snapshot)
+        tradable = []
+        for signal in signals:
+            unavailable = self.assets.unavailable(signal['pair'], self.clock.time())
+            if signal['pair'] in busy:
+                logger.info(f"⏭️  {signal['pair']} not ordered: previous order still open")
+            elif unavailable:
+                logger.warning(f"🚫 {signal['pair']} not ordered: {unavailable}")
+            else:
+                tradable.append(signal)
+        signals = tradable
+
+        reasons = self.risk.reserve_batch([(s['pair'], amount) for s in signals], self.ledger.balance,
+                                          self.clock.utcnow())
+        tasks = []
+        for signal, reason in zip(signals, reasons):
+            if reason:
+                logger.warning(f"🛑 {signal['pair']} blocked by risk engine: {reason}")
+            else:
+                tasks.append(OrderTask(signal, amount))
+        if not tasks:
+            return []
+
+        barrier = threading.Barrier(len(tasks))
+        for task in tasks:
+            # daemon: an order stuck on the broker never keeps the run alive
+            threading.Thread(target=self.execute_trade, args=(task, barrier),
+                             name=f"order-{task.pair}", daemon=True).start()
+        self.open_orders.extend(tasks)
+
+        for task in tasks:
+            if not task.sent.wait(SUBMIT_TIMEOUT):
+                logger.warning(f"⏰ {task.pair}: buy not answered after {SUBMIT_TIMEOUT}s")
+
+        submitted = [t for t in tasks if t.submitted_at is not None]
+        acked = [t.acked_at for t in tasks if t.acked_at is not None]
+        if len(submitted) > 1:
+            # time in the buy limiter is broken out: a batch larger than its burst queues there
+            sent = [t.submitted_at + t.queued for t in submitted]
+            queued = max(t.queued for t in submitted)
+            logger.info(f"🚀 Batch of {len(tasks)}: submit spread {(max(sent) - min(sent)) * 1000:.0f}ms "
+                        f"(up to {queued * 1000:.0f}ms queued in the buy limiter), "
+                        f"ack spread {(max(acked) - min(acked)) * 1000 if acked else 0:.0f}ms")
+        return [t for t in tasks if t.placed]
+
+    def open_order_pairs(self):
+        """
+        Pairs whose order thread is still waiting for the result
+
+        Which orders have settled depends on thread timing, so the answer is
+        a clock observation: logged when recording, read back when replaying.
+        Orders observed as settled are waited for, so a replayed order thread
+        always finishes before the next order of its pair starts.
+        """
+        still_open = sorted({t.pair for t in self.open_orders if not t.done.is_set()})
+        pairs = set(self.clock.observe('open_orders', still_open))
+        for task in self.open_orders:
+            if task.pair not in pairs:
+                task.done.wait()
+        self.open_orders = [t for t in self.open_orders if t.pair in pairs]
+        return pairs
+
+    def wait_for_orders(self):
+        """
+        Wait for the open orders to settle before the run ends
+
+        Each order gets up to 65s + execution.settle_timeout from its submit -
+        one still unsettled stays in the pending trades for the next run.
+        """
+        timeout = 65 + self.config.get('execution', {}).get('settle_timeout', 30)
+        self.open_order_pairs()
+        open_orders = list(self.open_orders)
+        if open_orders:
+            logger.info(f"⏳ Waiting for {len(open_orders)} open order(s) to settle...")
+        for task in open_orders:
+            wait = (task.submitted_at or self.clock.time()) + timeout - self.clock.time()
+            if not task.done.wait(max(0, wait)):
+                logger.warning(f"⏰ {task.pair}: no result after {timeout:.0f}s, left pending for recovery")
+        self.open_orders = []
+
+    def execute_trade(self, task, barrier=None):
+        """Place one reserved order and wait for its result (runs on an order thread)"""
+        signal = task.signal
+        pair = task.pair
+        direction = signal['signal']
+        amount = task.amount
 
-        logger.info(f"📊 Executing trade:")
-        logger.info(f"   Pair: {pair}")
-        logger.info(f"   Direction: {direction.upper()}")
-        logger.info(f"   Amount: ${amount}")
-        logger.info(f"   Entry Price: {signal['price']:.5f}")
+        logger.info(f"📊 Executing trade: {pair} {direction.upper()} ${amount} @ {signal['price']:.5f}")
 
+        placed = False
         try:
+            if barrier is not None:
+                try:
+                    barrier.wait(timeout=5)
+                except threading.BrokenBarrierError:
+                    pass  # a sibling is late - submit anyway
+
             # Execute trade
+            task.submitted_at = self.clock.time()
             status, trade_id = self.api.buy(amount, pair, direction, 1)
+            task.acked_at = self.clock.time()
+            task.queued = self.api.last_wait()
 
             if not status:
-                logger.error("❌ Trade failed")
+                logger.error(f"❌ Trade failed ({pair})")
                 return None
+            placed = task.placed = True
 
-            logger.info(f"✅ Trade opened (ID: {trade_id})")
+            logger.info(f"✅ Trade opened (ID: {trade_id}, {pair}) in {(task.acked_at - task.submitted_at) * 1000:.0f}ms")
+            self.ledger.stake(trade_id, amount)
+
+            # Track as pending until settled (survives a killed run via the state snapshot)
+            pending = {
+                'trade_id': trade_id,
+                'opened_at': task.submitted_at,
+                'pair': pair,
+                'direction': direction,
+                'amount': amount,
+                'entry_price': float(signal['price']),
+                'adx': float(signal['adx']),
+                'macd': float(signal['macd']),
+                'rsi': float(signal['rsi']),
+            }
+            with self.io_lock:
+                self.save_snapshot(trade_id, signal)
+                self.state.pending[str(trade_id)] = pending
+                self.save_state()
+            task.sent.set()
 
             # Wait for result (1 min + buffer)
-            logger.info("⏳ Waiting for result...")
-            time.sleep(65)
+            logger.info(f"⏳ Waiting for result ({pair})...")
+            self.clock.sleep(65)
 
             # Get result
             result = self.api.check_win_v4(trade_id)
+            with self.io_lock:
+                task.record = self.settle_trade(pending, result)
+                self.save_trade(task.record)
+                self.save_state()
+            return task.record
+
+        except Exception as e:
+            logger.error(f"❌ Error executing trade ({pair}): {e}")
+            return None
 
-            if result > 0:
-                profit = result
-                outcome = "win"
-                logger.info(f"✅ Trade WON - Profit: ${profit:.2f}")
-            elif result == 0:
-                profit = 0
-                outcome = "tie"
-                logger.info(f"⚖️  Trade TIE")
+        finally:
+            if not placed:
+                self.risk.release(pair, amount)
+            task.sent.set()
+            task.done.set()
+
+    def settle_trade(self, pending, result, settled_at=None):
+        """Turn a pending trade and its result (profit, >0 win / 0 tie / <0 loss) into a trade record"""
+        amount = pending['amount']
+
+        if result > 0:
+            profit = result
+            outcome = "win"
+            logger.info(f"✅ Trade WON - Profit: ${profit:.2f}")
+        elif result == 0:
+            profit = 0
+            outcome = "tie"
+            logger.info(f"⚖️  Trade TIE")
+        else:
+            profit = -amount
+            outcome = "loss"
+            logger.info(f"❌ Trade LOST - Loss: ${amount:.2f}")
+
+        self.ledger.settle(pending['trade_id'], profit)
+        self.risk.record_result(pending['pair'], profit, amount, settled_at or self.clock.utcnow())
+
+        # Create trade record (matching backtester format)
+        trade_record = {
+            'trade_id': pending['trade_id'],
+            'time': (settled_at or self.clock.utcnow()).strftime(TIME_FORMAT),
+            'pair': pending['pair'],
+            'direction': pending['direction'],
+            'entry_price': pending['entry_price'],  # Entry price from signal
+            'result': outcome,
+            'profit': profit,
+            'capital': self.ledger.balance,
+            'adx': pending['adx'],
+            'macd': pending['macd'],
+            'rsi': pending['rsi']
+        }
+
+        self.state.pending.pop(str(pending['trade_id']), None)
+        return trade_record
+
+    def recover_pending_trades(self):
+        """Settle trades a previous run opened but never recorded (e.g. killed while waiting)"""
+        if not self.state.pending:
+            return
+
+        logger.info(f"♻️  Recovering {len(self.state.pending)} pending trade(s) from the last run")
+        try:
+            closed = self.api.get_optioninfo_v2(50)['msg']['closed_options']
+        except Exception as e:
+            logger.warning(f"⚠️  Failed to fetch closed options: {e}")
+            return
+
+        results = {}
+        for option in closed:
+            ids = option.get('id') or []
+            for option_id in (ids if isinstance(ids, list) else [ids]):
+                results[str(option_id)] = option
+
+        for key, pending in list(self.state.pending.items()):
+            option = results.get(key)
+            if option is None:
+                if self.clock.time() - pending['opened_at'] > PENDING_MAX_AGE:
+                    logger.warning(f"⚠️  Dropping pending trade {key}: no result after {PENDING_MAX_AGE // 3600}h")
+                    self.state.pending.pop(key)
+                continue
+
+            if option.get('win') == 'equal':
+                result = 0
             else:
-                profit = -amount
-                outcome = "loss"
-                logger.info(f"❌ Trade LOST - Loss: ${amount:.2f}")
+                result = float(option.get('win_amount') or 0) - float(option.get('amount') or pending['amount'])
+            settled_at = datetime.utcfromtimestamp(pending['opened_at'] + 65)
+            # not in the store yet, so not in the rebuilt counters - counted on the day it was opened
+            self.risk.record_open(pending['pair'], pending['amount'], datetime.utcfromtimestamp(pending['opened_at']))
+            self.save_trade(self.settle_trade(pending, result, settled_at))
+
+    def save_state(self):
+        """Write the warm-state snapshot (candle buffers, decision cache, pending trades)"""
+        try:
+            with self.io_lock:
+                self.state.save()
+        except Exception as e:
+            logger.warning(f"⚠️  Failed to save bot state: {e}")
 
-            # Create trade record (matching backtester format)
-            trade_record = {
-                'trade_id': trade_id,
-                'time': datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S'),
-                'pair': pair,
-                'direction': direction,
-                'entry_price': signal['price'],  # Entry price from signal
-                'result': outcome,
-                'profit': profit,
-                'capital': self.api.get_balance(),
+    def save_snapshot(self, trade_id, signal):
+        """Save the candle window behind a trade to data/candles/snapshots.bin"""
+        candles = signal.get('candles')
+        if candles is None or candles.empty:
+            return
+
+        try:
+            columns = ['time', 'open', 'high', 'low', 'close', 'volume',
+                       'adx', 'macd', 'macd_signal', 'rsi', 'ema20', 'slope']
+            meta = {
+                'signal': signal['signal'],
+                'price': signal['price'],
                 'adx': signal['adx'],
                 'macd': signal['macd'],
-                'rsi': signal['rsi']
+                'rsi': signal['rsi'],
+                'ema20': signal['ema20'],
             }
-
-            return trade_record
-
+            self.snapshots.append(trade_id, signal['pair'],
+                                  candles[[c for c in columns if c in candles.columns]], meta)
+            logger.info(f"💾 Saved candle snapshot ({len(candles)} candles)")
         except Exception as e:
-            logger.error(f"❌ Error executing trade: {e}")
-            return None
+            # Never let snapshot capture break the trade path
+            logger.warning(f"⚠️  Failed to save candle snapshot: {e}")
 
     def save_trade(self, trade):
-        """Save trade to trades.csv"""
+        """Save trade to the configured trade store (TRADE_STORE)"""
         if not trade:
             return
 
-        # Load existing trades
-        if os.path.exists('trades.csv'):
-            df = pd.read_csv('trades.csv')
-        else:
-            df = pd.DataFrame()
-
-        # Append new trade
-        new_row = pd.DataFrame([trade])
-        df = pd.concat([df, new_row], ignore_index=True)
-
-        # Save
-        df.to_csv('trades.csv', index=False)
-        logger.info(f"💾 Saved trade to trades.csv")
+        self.store.append([trade])
+        logger.info(f"💾 Saved trade to {type(self.store).__name__}")
 
     def run(self):
         """Main bot execution (continuous monitoring for GitHub Actions)"""
@@ -329,6 +721,13 @@ class TradeBotV14:
         if not self.connect():
             return
 
+        if self.state.saved_at:
+            age = int(self.clock.time() - self.state.saved_at)
+            logger.info(f"♻️  Restored state from {age}s ago "
+                        f"({len(self.state.candles)} candle buffers, {len(self.state.pending)} pending trades)")
+        self.risk.start(self.store, self.clock.utcnow())
+        self.recover_pending_trades()
+
         # Get enabled pairs
         enabled_pairs = {
             pair: config
@@ -337,49 +736,91 @@ class TradeBotV14:
         }
 
         logger.info(f"✅ Enabled pairs: {', '.join(enabled_pairs.keys())}")
-        logger.info(f"⏰ Start time: {datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')} UTC")
-        logger.info(f"🔄 Continuous monitoring: checking signals every 30 seconds")
-        logger.info(f"⏱️  Will run for ~11 minutes (max 22 iterations)")
-
+        logger.info(f"⏰ Start time: {self.clock.utcnow().strftime('%Y-%m-%d %H:%M:%S')} UTC")
         trades_executed = 0
-        start_time = time.time()
-        max_runtime = 11 * 60  # 11 minutes (optimized for 6 runs/day = 1,980 min/month)
-        check_interval = 30  # Check every 30 seconds
+        start_time = self.clock.time()
+        # 11 minutes (optimized for 6 runs/day = 1,980 min/month)
+        max_runtime = self.config.get('scheduler', {}).get('max_runtime_seconds', 11 * 60)
+        deadline = start_time + max_runtime
+        # Wake up this many seconds after each 1m candle close (candle is final by then)
+        close_offset = self.config.get('scheduler', {}).get('close_offset_seconds', 2)
+
+        logger.info(f"🔄 Continuous monitoring: checking signals at each candle close (+{close_offset}s)")
+        logger.info(f"⏱️  Will run for up to ~{max_runtime / 60:.0f} minutes (stops early when no pair can trade)")
 
         # Continuous monitoring loop
         iteration = 0
         while True:
             iteration += 1
-            current_time = datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
-            elapsed = int(time.time() - start_time)
+            now = self.clock.utcnow()
+            current_time = now.strftime('%Y-%m-%d %H:%M:%S')
+            elapsed = int(self.clock.time() - start_time)
 
             # Check if we should stop (approaching timeout)
             if elapsed >= max_runtime:
                 logger.info(f"\n⏱️  Reached max runtime ({max_runtime/60:.1f} min), stopping gracefully")
                 break
 
+            # Daily limits reached - nothing more to do today
+            halted = self.risk.halted(now)
+            if halted:
+                logger.info(f"\n🛑 Risk engine: {halted}, stopping")
+                break
+
+            # Only pairs inside their trading hours + a session window are checked
+            open_pairs = {pair: cfg for pair, cfg in enabled_pairs.items() if self.is_pair_open(cfg, now)}
+            if not open_pairs:
+                opens_at = self.next_open(enabled_pairs, now)
+                wait = (opens_at - now).total_seconds() if opens_at else None
+                if wait is None or self.clock.time() + wait + close_offset >= deadline:
+                    next_window = f"{opens_at.strftime('%Y-%m-%d %H:%M')} UTC" if opens_at else "none within 24h"
+                    logger.info(f"\n🛑 No pair can trade before the run ends (next window: {next_window}), stopping early")
+                    break
+                logger.info(f"\n😴 No pair open - sleeping until {opens_at.strftime('%H:%M')} UTC ({int(wait)}s)")
+                self.clock.sleep(wait + close_offset)
+                continue
+
             logger.info(f"\n{'='*60}")
             logger.info(f"🔄 Iteration #{iteration} - {current_time} UTC (Elapsed: {elapsed}s)")
             logger.info(f"{'='*60}")
 
-            # Check each pair
-            for pair, pair_config in enabled_pairs.items():
+            # Load the window of each open pair
+            windows = {}
+            for pair, pair_config in open_pairs.items():
                 try:
+                    paused = self.risk.check(pair, now=now)
+                    if paused:
+                        logger.info(f"\n⏸️  Skipping {pair}: {paused}")
+                        continue
+
+                    # Closed / low-payout instrument: no candle request, no indicators
+                    unavailable = self.assets.unavailable(pair, self.clock.time())
+                    if unavailable:
+                        logger.info(f"\n🚫 Skipping {pair}: {unavailable}")
+                        continue
+
                     logger.info(f"\n🔍 Checking {pair}...")
+                    df = self.load_window(pair, pair_config)
+                    if df is not None:
+                        windows[pair] = df
+
+                except Exception as e:
+                    logger.error(f"❌ Error processing {pair}: {e}")
+                    continue
 
+            # Indicators of all pairs in one vectorized pass, then each pair reads its row
+            batches = self.calculate_indicators(windows) if windows else {}
+            # 5m/15m/1h bars resampled from the same windows, for the pairs that confirm with them
+            timeframes = self.update_timeframes(windows) if self.timeframes else {}
+            signals = []
+            for pair, batch in batches.items():
+                try:
                     # Generate signal
-                    signal = self.generate_signal(pair, pair_config)
+                    signal = self.generate_signal(pair, open_pairs[pair], batch, timeframes)
 
                     if signal:
-                        logger.info(f"🔔 Signal detected: {signal['signal'].upper()}")
-
-                        # Execute trade
-                        trade = self.execute_trade(signal)
-
-                        if trade:
-                            self.save_trade(trade)
-                            trades_executed += 1
-                            logger.info(f"✅ Trade #{trades_executed} executed successfully")
+                        logger.info(f"🔔 {pair} signal detected: {signal['signal'].upper()}")
+                        signals.append(signal)
                     else:
                         logger.info(f"⏭️  No signal for {pair}")
 
@@ -387,42 +828,124 @@ class TradeBotV14:
                     logger.error(f"❌ Error processing {pair}: {e}")
                     continue
 
-            # Wait before next check (unless we're close to timeout)
-            remaining = max_runtime - (time.time() - start_time)
-            if remaining > check_interval:
-                logger.info(f"\n💤 Waiting {check_interval}s before next check... (Remaining: {int(remaining)}s)")
-                time.sleep(check_interval)
+            # Place every order of this candle together
+            if signals:
+                for task in self.execute_batch(signals):
+                    trades_executed += 1
+                    logger.info(f"✅ Trade #{trades_executed} placed ({task.pair})")
+
+            # Shadow variants on the same windows and indicator series (after the orders went out)
+            if self.shadow:
+                self.run_shadow(batches, now, timeframes)
+
+            # Wait for the next candle close (unless the run ends first)
+            wake = self.next_wakeup(close_offset)
+            if wake < deadline:
+                logger.info(f"\n💤 Waiting {wake - self.clock.time():.0f}s for the next candle close... "
+                            f"(Remaining: {int(deadline - self.clock.time())}s)")
+                self.clock.sleep(max(0, wake - self.clock.time()))
             else:
-                logger.info(f"\n⏱️  Less than {check_interval}s remaining, stopping")
+                logger.info(f"\n⏱️  No candle close left before the deadline, stopping")
                 break
 
+        self.wait_for_orders()
+
         # Summary
         logger.info("\n" + "=" * 60)
         logger.info("📊 Run Summary")
         logger.info("=" * 60)
         logger.info(f"Total iterations: {iteration}")
         logger.info(f"Trades executed: {trades_executed}")
-        logger.info(f"Total runtime: {int(time.time() - start_time)}s ({(time.time() - start_time)/60:.1f} min)")
-        logger.info(f"Final balance: ${self.api.get_balance():.2f}")
+        logger.info(f"Total runtime: {int(self.clock.time() - start_time)}s ({(self.clock.time() - start_time)/60:.1f} min)")
+        self.ledger.stop()
+        self.ledger.reconcile_with(self.api.get_balance)
+        logger.info(f"Final balance: ${self.ledger.balance:.2f} (ledger drift ${self.ledger.drift:+.2f}"
+                    f"{', FLAGGED' if self.ledger.drift_flagged else ''})")
+        self.api.log_summary()
         logger.info("=" * 60)
 
         # บันทึกเวลารันล่าสุด (สำหรับ dashboard)
         try:
             with open('last_run.txt', 'w') as f:
-                f.write(datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S'))
+                f.write(self.clock.utcnow().strftime('%Y-%m-%d %H:%M:%S'))
             logger.info("✅ Saved last run time")
         except Exception as e:
             logger.warning(f"⚠️  Failed to save last run time: {e}")
 
 
+def replay(path):
+    """
+    Replay a recorded run offline at full speed
+
+    The run starts from the recorded config, shadow variants and warm state
+    in a scratch directory; broker, clock and trade store answer from the
+    recording. Returns True when it reproduced the recorded trades exactly.
+    """
+    header, readings, responses, reads, recorded = load_recording(path)
+
+    # no throttling, no backoff and no background reconcile - inputs come from the log
+    config = header['config']
+    config['api'] = {**config.get('api', {}), 'retry_backoff': 0,
+                     'rate_limits': {name: [1e9, 1e9] for name in DEFAULT_RATE_LIMITS}}
+    config['ledger'] = {**config.get('ledger', {}), 'reconcile_interval': None}
+
+    cwd, mode = os.getcwd(), os.environ.get("IQ_MODE")
+    broker, clock, store = ReplayBroker(responses), ReplayClock(readings), ReplayStore(reads)
+    start = time.perf_counter()
+    with tempfile.TemporaryDirectory() as root:
+        write_workspace(header, root, CONFIG_PATH, SHADOW_PATH, STATE_PATH)
+        os.chdir(root)
+        os.environ["IQ_MODE"] = header.get('mode', "PRACTICE")
+        try:
+            TradeBotV14(broker=broker, clock=clock, store=store).run()
+        finally:
+            os.chdir(cwd)
+            if mode is None:
+                os.environ.pop("IQ_MODE", None)
+            else:
+                os.environ["IQ_MODE"] = mode
+    elapsed = time.perf_counter() - start
+
+    divergences = broker.divergences + clock.divergences + store.divergences
+    differences = compare_trades(recorded, store.trades)
+    logger.info("=" * 60)
+    logger.info(f"⏯️  Replayed {path} in {elapsed:.2f}s: {len(store.trades)} trades "
+                f"(recorded {len(recorded)}), {len(divergences)} divergences")
+    for message in (divergences + differences)[:20]:
+        logger.warning(f"   ≠ {message}")
+    ok = not divergences and not differences
+    logger.info("✅ Replay matches the recording" if ok else "❌ Replay differs from the recording")
+    return ok
+
+
 def main():
     """Main entry point"""
+    parser = argparse.ArgumentParser(description="Trade Bot V1.4")
+    parser.add_argument("--replay", metavar="RECORDING",
+                        help="replay a recorded run offline (record one with BOT_RECORD=<path>)")
+    args = parser.parse_args()
+    if args.replay:
+        sys.exit(0 if replay(args.replay) else 1)
+
+    bot = None
+    recording = None
     try:
-        bot = TradeBotV14()
+        # BOT_RECORD=<path>: log every external input for offline replay
+        if os.getenv("BOT_RECORD"):
+            recording = start_recording(os.getenv("BOT_RECORD"), CONFIG_PATH, STATE_PATH, SHADOW_PATH)
+        bot = TradeBotV14(recording=recording)
         bot.run()
     except Exception as e:
         logger.error(f"\n❌ Fatal error: {e}")
         sys.exit(1)
+    finally:
+        # Warm state for the next scheduled run (also on errors / cancellation)
+        if bot is not None:
+            bot.save_state()
+            logger.info("💾 Saved bot state")
+        if recording is not None:
+            recording.close()
+            logger.info(f"⏺️  Recorded {recording.count} events to {recording.path}")
 
 
 if __name__ == "__main__":
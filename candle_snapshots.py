@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Candle Snapshots - per-trade candle windows captured by the bot at trade time
+
+Container (append-only, one frame per trade):
+    data/candles/snapshots.bin   frames: MAGIC | uint32 payload_len | uint16 id_len | trade_id | payload
+    data/candles/snapshots.idx   text lines: trade_id <TAB> offset <TAB> frame_len
+
+payload = zlib(uint32 header_len | header JSON | column bytes), where the
+header lists the columns (name, dtype) stored back to back, plus the
+indicator values the bot used for its decision.
+
+Reading one trade loads the (small) index once, then seeks to a single
+frame - other snapshots are never read or decompressed.
+
+Usage:
+  python candle_snapshots.py list
+  python candle_snapshots.py reindex
+"""
+
+import os
+import io
+import json
+import zlib
+import struct
+import argparse
+import numpy as np
+
+DEFAULT_ROOT = "data/candles"
+MAGIC = b"CSN1"
+FRAME_HEADER = struct.Struct("<4sIH")  # magic, payload length, trade_id length
+
+
+class SnapshotArchive:
+    """Append-only compressed container of per-trade candle snapshots"""
+
+    def __init__(self, root=DEFAULT_ROOT):
+        self.root = root
+        self.data_path = os.path.join(root, "snapshots.bin")
+        self.index_path = os.path.join(root, "snapshots.idx")
+        self._index = None
+        self._index_mtime = None
+
+    # ------------------------------------------------------------------ write
+    def append(self, trade_id, pair, candles, meta=None):
+        """
+        Append one snapshot
+
+        candles: DataFrame with a 'time' column plus numeric columns
+                 (OHLCV and indicator values)
+        meta:    dict of scalar values to keep with the snapshot
+        """
+        trade_key = str(trade_id)
+        columns = []
+        blobs = []
+
+        for name in candles.columns:
+            if name == 'time':
+                epoch = (candles['time'] - np.datetime64(0, 's')) // np.timedelta64(1, 's')
+                arr = np.ascontiguousarray(epoch.to_numpy(dtype='<i8'))
+            else:
+                arr = np.ascontiguousarray(candles[name].to_numpy(dtype='<f8'))
+            columns.append([name, arr.dtype.str])
+            blobs.append(arr.tobytes())
+
+        header = json.dumps({
+            'trade_id': trade_key,
+            'pair': pair,
+            'n': len(candles),
+            'columns': columns,
+            'meta': meta or {},
+        }, default=float).encode('utf-8')
+
+        payload = zlib.compress(struct.pack("<I", len(header)) + header + b"".join(blobs), 6)
+        id_bytes = trade_key.encode('utf-8')
+        frame = FRAME_HEADER.pack(MAGIC, len(payload), len(id_bytes)) + id_bytes + payload
+
+        os.makedirs(self.root, exist_ok=True)
+        with open(self.data_path, 'ab') as f:
+            offset = f.tell()
+            f.write(frame)
+        with open(self.index_path, 'a') as f:
+            f.write(f"{trade_key}\t{offset}\t{len(frame)}\n")
+
+        if self._index is not None:
+            self._index[trade_key] = (offset, len(frame))
+        return offset
+
+    # ------------------------------------------------------------------- read
+    def index(self):
+        """Return {trade_id: (offset, frame_len)} (reloaded when the index file changes)"""
+        if not os.path.exists(self.index_path):
+            return {}
+
+        mtime = os.stat(self.index_path).st_mtime_ns
+        if self._index is None or mtime != self._index_mtime:
+            index = {}
+            with open(self.index_path) as f:
+                for line in f:
+                    parts = line.rstrip("\n").split("\t")
+                    if len(parts) == 3:
+                        index[parts[0]] = (int(parts[1]), int(parts[2]))
+            self._index = index
+            self._index_mtime = mtime
+        return self._index
+
+    def __contains__(self, trade_id):
+        return str(trade_id) in self.index()
+
+    def read(self, trade_id):
+        """
+        Read a single snapshot
+
+        Returns:
+            dict of numpy arrays (one per column) plus 'pair' and 'meta',
+            or None if the trade has no snapshot
+        """
+        entry = self.index().get(str(trade_id))
+        if entry is None:
+            return None
+
+        offset, length = entry
+        with open(self.data_path, 'rb') as f:
+            f.seek(offset)
+            frame = f.read(length)
+
+        magic, payload_len, id_len = FRAME_HEADER.unpack_from(frame)
+        if magic != MAGIC:
+            raise ValueError(f"Corrupt snapshot frame at offset {offset}")
+        start = FRAME_HEADER.size + id_len
+        raw = zlib.decompress(frame[start:start + payload_len])
+
+        header_len = struct.unpack_from("<I", raw)[0]
+        header = json.loads(raw[4:4 + header_len])
+        pos = 4 + header_len
+
+        result = {'pair': header['pair'], 'meta': header['meta']}
+        n = header['n']
+        for name, dtype in header['columns']:
+            dt = np.dtype(dtype)
+            result[name] = np.frombuffer(raw, dtype=dt, count=n, offset=pos)
+            pos += n * dt.itemsize
+        return result
+
+    def reindex(self):
+        """Rebuild the index by scanning frame headers (payloads are skipped, not decompressed)"""
+        index = {}
+        if os.path.exists(self.data_path):
+            with open(self.data_path, 'rb') as f:
+                while True:
+                    offset = f.tell()
+                    head = f.read(FRAME_HEADER.size)
+                    if len(head) < FRAME_HEADER.size:
+                        break
+                    magic, payload_len, id_len = FRAME_HEADER.unpack(head)
+                    if magic != MAGIC:
+                        break  # truncated / partial write at the tail
+                    trade_key = f.read(id_len).decode('utf-8')
+                    f.seek(payload_len, io.SEEK_CUR)
+                    index[trade_key] = (offset, FRAME_HEADER.size + id_len + payload_len)
+
+        os.makedirs(self.root, exist_ok=True)
+        with open(self.index_path, 'w') as f:
+            for trade_key, (offset, length) in index.items():
+                f.write(f"{trade_key}\t{offset}\t{length}\n")
+
+        self._index = None
+        return len(index)
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Per-trade candle snapshot container")
+    parser.add_argument("--root", default=DEFAULT_ROOT, help="snapshot directory")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list", help="list stored trade ids")
+    sub.add_parser("reindex", help="rebuild snapshots.idx from snapshots.bin")
+
+    args = parser.parse_args()
+    archive = SnapshotArchive(args.root)
+
+    if args.command == "list":
+        for trade_key, (offset, length) in archive.index().items():
+            print(f"{trade_key}\toffset={offset}\tbytes={length}")
+    elif args.command == "reindex":
+        print(f"Indexed {archive.reindex()} snapshots")
+
+
+if __name__ == "__main__":
+    main()
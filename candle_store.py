@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Candle Store - per-pair, time-indexed 1m candle storage
+
+Layout (one directory per pair, one .npy file per column):
+    data/candle_store/EURUSD/time.npy     int64   epoch seconds (UTC, sorted)
+    data/candle_store/EURUSD/open.npy     float64
+    data/candle_store/EURUSD/high.npy     float64
+    data/candle_store/EURUSD/low.npy      float64
+    data/candle_store/EURUSD/close.npy    float64
+    data/candle_store/EURUSD/volume.npy   float64
+
+Columns are opened with np.load(mmap_mode='r'): finding the N bars before a
+trade is a binary search on the time column, and the returned arrays are
+slices of the memory map (no parsing, no copies).
+
+Usage:
+  python candle_store.py build data/EURUSD_1m_30d.csv --pair EURUSD
+  python candle_store.py info EURUSD
+"""
+
+import os
+import argparse
+import logging
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ROOT = "data/candle_store"
+PRICE_COLUMNS = ('open', 'high', 'low', 'close', 'volume')
+
+
+def to_epoch_seconds(value):
+    """Convert a timestamp-like value (naive = UTC) to int epoch seconds"""
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    return int(pd.Timestamp(value).timestamp())
+
+
+class CandleStore:
+    """Memory-mapped columnar candle store, one directory per pair"""
+
+    def __init__(self, root=DEFAULT_ROOT):
+        self.root = root
+        self._cache = {}  # pair -> (time.npy mtime, {column: memmap})
+
+    def pair_dir(self, pair):
+        return os.path.join(self.root, pair)
+
+    def has_pair(self, pair):
+        return os.path.exists(os.path.join(self.pair_dir(pair), "time.npy"))
+
+    def pairs(self):
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(p for p in os.listdir(self.root) if self.has_pair(p))
+
+    def write(self, pair, df):
+        """Write candles (time, open, high, low, close, volume) for a pair, replacing existing data"""
+        df = df.dropna(subset=['time'])
+        times = pd.to_datetime(df['time'])
+        epoch = (times - pd.Timestamp(0)) // pd.Timedelta(seconds=1)
+        order = np.argsort(epoch.to_numpy(), kind='stable')
+
+        columns = {'time': epoch.to_numpy(dtype=np.int64)[order]}
+        for name in PRICE_COLUMNS:
+            values = df[name] if name in df.columns else pd.Series(0.0, index=df.index)
+            columns[name] = values.to_numpy(dtype=np.float64)[order]
+
+        # Drop duplicate timestamps (keep the last one written)
+        t = columns['time']
+        keep = np.ones(len(t), dtype=bool)
+        keep[:-1] = t[1:] != t[:-1]
+        columns = {name: arr[keep] for name, arr in columns.items()}
+
+        path = self.pair_dir(pair)
+        os.makedirs(path, exist_ok=True)
+        # time.npy is written last: readers use its mtime to detect a rebuild
+        for name in PRICE_COLUMNS + ('time',):
+            tmp = os.path.join(path, f"{name}.tmp.npy")
+            np.save(tmp, columns[name])
+            os.replace(tmp, os.path.join(path, f"{name}.npy"))
+
+        self._cache.pop(pair, None)
+        logger.info(f"💾 Stored {len(columns['time'])} candles for {pair} in {path}")
+        return len(columns['time'])
+
+    def build_from_csv(self, pair, csv_path):
+        """Import a candle CSV (time, open, high, low, close, volume) into the store"""
+        df = pd.read_csv(csv_path)
+        return self.write(pair, df)
+
+    def columns(self, pair):
+        """Return {column: memmap} for a pair (re-opened if the store was rebuilt)"""
+        time_path = os.path.join(self.pair_dir(pair), "time.npy")
+        mtime = os.stat(time_path).st_mtime_ns
+
+        cached = self._cache.get(pair)
+        if cached and cached[0] == mtime:
+            return cached[1]
+
+        cols = {'time': np.load(time_path, mmap_mode='r')}
+        for name in PRICE_COLUMNS:
+            cols[name] = np.load(os.path.join(self.pair_dir(pair), f"{name}.npy"), mmap_mode='r')
+
+        self._cache[pair] = (mtime, cols)
+        return cols
+
+    def window(self, pair, end_time, count=50):
+        """
+        Return the last `count` candles with time <= end_time
+
+        Binary search on the sorted time column (O(log n)); values are
+        zero-copy slices of the memory-mapped columns.
+        """
+        cols = self.columns(pair)
+        end = int(np.searchsorted(cols['time'], to_epoch_seconds(end_time), side='right'))
+        start = max(0, end - count)
+        return {name: arr[start:end] for name, arr in cols.items()}
+
+    def range(self, pair, start_time, end_time):
+        """Return candles with start_time <= time <= end_time (zero-copy slices)"""
+        cols = self.columns(pair)
+        t = cols['time']
+        start = int(np.searchsorted(t, to_epoch_seconds(start_time), side='left'))
+        end = int(np.searchsorted(t, to_epoch_seconds(end_time), side='right'))
+        return {name: arr[start:end] for name, arr in cols.items()}
+
+
+def main():
+    """Command line entry point"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="Per-pair memory-mapped candle store")
+    parser.add_argument("--root", default=DEFAULT_ROOT, help="store directory")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    build = sub.add_parser("build", help="import a candle CSV")
+    build.add_argument("csv_path")
+    build.add_argument("--pair", help="pair name (default: taken from file name, e.g. EURUSD_1m_30d.csv)")
+
+    info = sub.add_parser("info", help="show stored range for a pair")
+    info.add_argument("pair")
+
+    args = parser.parse_args()
+    store = CandleStore(args.root)
+
+    if args.command == "build":
+        pair = args.pair or os.path.basename(args.csv_path).split("_")[0]
+        store.build_from_csv(pair, args.csv_path)
+    elif args.command == "info":
+        cols = store.columns(args.pair)
+        t = cols['time']
+        if len(t):
+            first = pd.to_datetime(t[0], unit='s')
+            last = pd.to_datetime(t[-1], unit='s')
+            print(f"{args.pair}: {len(t)} candles, {first} -> {last}")
+        else:
+            print(f"{args.pair}: empty")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,399 @@
+#!/usr/bin/env python3
+"""
+Coordinator - enabled pairs sharded across worker processes
+
+One TradeBotV14 process runs every pair in one interpreter: indicator work
+and blocking broker calls share the GIL, and one slow connection holds up
+the whole loop. The coordinator splits the enabled pairs into shards (a
+stable hash of the pair name, so a pair keeps its shard and warm state
+between runs) and runs each shard as its own process:
+
+    worker      the unchanged bot loop for its pairs, with its own broker
+                connection (optionally its own account), API rate limits
+                and warm state (.state/shard-<n>/bot_state.npz)
+    coordinator owns what must stay single: the risk engine (one daily
+                budget for every shard), the cash of each account, the
+                trade store and the candle snapshot archive
+
+Workers reach them through a duplex pipe per shard (ShardLink): each call
+is one small pickled request, answered by a coordinator thread of that
+shard, so a stuck shard never blocks the others. Trades are merged into
+the trade store in (time, trade_id) order after a short reordering delay;
+shadow results of the shards are merged at the end. A shard still running
+past the run deadline is terminated.
+
+Shards on the same account each see only their own stakes in their local
+ledger, so the balance check of a batch runs against the coordinator's
+cash of the account instead (AccountRisk): stakes are debited when
+reserved and credited back on release or settlement, and a batch never
+gets more than the lower of that and the shard's own balance. Trades
+recovered from an earlier run never move the cash: their stake and payout
+are already in the broker balance it starts from.
+
+Accounts (optional, --accounts accounts.json) name the environment
+variables holding each account's credentials; shard n uses account
+n % len(accounts):
+    {"accounts": [{"email_env": "IQ_EMAIL", "password_env": "IQ_PASSWORD"},
+                  {"email_env": "IQ_EMAIL_2", "password_env": "IQ_PASSWORD_2"}]}
+
+Usage:
+  python coordinator.py --shards 4
+  python coordinator.py --shards 2 --accounts accounts.json
+"""
+
+import os
+import sys
+import glob
+import json
+import time
+import heapq
+import zlib
+import logging
+import argparse
+import threading
+import importlib.util
+import multiprocessing
+from datetime import datetime
+
+import pandas as pd
+
+from risk import RiskEngine
+from shadow import ID_SCALE, ShadowRunner, append_results, read_results
+from trade_store import open_trade_store
+from candle_snapshots import SnapshotArchive
+
+logger = logging.getLogger(__name__)
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+BOT_PATH = os.path.join(ROOT, "bot_v1.4.py")
+CONFIG_PATH = "versions/v1.4/config.json"
+STATE_PATTERN = ".state/shard-{shard}/bot_state.npz"
+JOURNAL_DELAY = 5.0  # seconds a trade may wait for an earlier one from another shard
+GRACE = 120          # seconds past max runtime before a shard is terminated
+
+
+def shard_of(pair, shards):
+    """Stable shard of a pair (same across runs and processes)"""
+    return zlib.crc32(pair.encode('utf-8')) % shards
+
+
+def split_config(config, shards):
+    """One config per non-empty shard, each with only its enabled pairs"""
+    parts = {}
+    for pair, cfg in config['currencies'].items():
+        if cfg.get('enabled', False):
+            parts.setdefault(shard_of(pair, shards), {})[pair] = cfg
+    return {shard: {**config, 'currencies': pairs} for shard, pairs in sorted(parts.items())}
+
+
+def load_bot_module():
+    spec = importlib.util.spec_from_file_location("bot_v14", BOT_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+# ----------------------------------------------------------------- journal
+class Journal:
+    """Trades of all shards written to one store in (time, trade_id) order"""
+
+    def __init__(self, store, delay=JOURNAL_DELAY):
+        self.store = store
+        self.delay = delay
+        self.heap = []
+        self.seq = 0
+        self.lock = threading.Lock()
+        self.written = 0
+
+    def append(self, trades):
+        with self.lock:
+            for trade in trades:
+                self.seq += 1
+                heapq.heappush(self.heap, (str(trade['time']), str(trade['trade_id']), self.seq,
+                                           time.monotonic(), trade))
+
+    def flush(self, everything=False):
+        """Write the trades that waited at least `delay` (all of them if everything)"""
+        with self.lock:
+            ready = []
+            while self.heap and (everything or time.monotonic() - self.heap[0][3] >= self.delay):
+                ready.append(heapq.heappop(self.heap)[4])
+            if ready:
+                self.store.append(ready)
+                self.written += len(ready)
+        return len(ready)
+
+    def read(self, start=None):
+        self.flush(everything=True)
+        return self.store.read(start=start)
+
+
+# --------------------------------------------------------------------- IPC
+class ShardLink:
+    """Worker side of a shard's pipe: one request/response at a time"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.lock = threading.Lock()
+
+    def call(self, target, method, *args, **kwargs):
+        with self.lock:
+            self.conn.send((target, method, args, kwargs))
+            status, value = self.conn.recv()
+        if status == 'error':
+            raise RuntimeError(f"coordinator {target}.{method}: {value}")
+        return value
+
+
+class Remote:
+    """Proxy whose method calls run on a coordinator object"""
+
+    def __init__(self, link, target):
+        self._link = link
+        self._target = target
+
+    def __getattr__(self, name):
+        def call(*args, **kwargs):
+            return self._link.call(self._target, name, *args, **kwargs)
+        return call
+
+
+class RemoteRisk(Remote):
+    """The coordinator's risk engine (one budget for every shard)"""
+
+    def __init__(self, link):
+        super().__init__(link, 'risk')
+
+    def start(self, store, now=None):
+        logger.info("🛡️  Risk counters: shared through the coordinator")
+
+
+class AccountRisk:
+    """
+    The risk engine as seen by one shard: balance checks use the cash of the
+    shard's account, shared with every other shard trading that account
+    """
+
+    def __init__(self, engine, cash):
+        self.engine = engine
+        self.cash = cash  # {'balance': None until the first batch}
+        self.stakes = {}  # pair -> stakes this shard debited and not yet credited back
+
+    def __getattr__(self, name):
+        return getattr(self.engine, name)
+
+    def reserve_batch(self, orders, balance, now=None):
+        with self.engine.lock:
+            if self.cash['balance'] is None:
+                self.cash['balance'] = float(balance)
+            reasons = self.engine.reserve_batch(orders, min(self.cash['balance'], balance), now)
+            for (pair, amount), reason in zip(orders, reasons):
+                if reason is None:
+                    self.cash['balance'] -= amount
+                    self.stakes.setdefault(pair, []).append(amount)
+        return reasons
+
+    def _credit(self, pair, amount):
+        """Take a debited stake back out of the books; False if it was never debited"""
+        stakes = self.stakes.get(pair, [])
+        if amount not in stakes:
+            return False
+        stakes.remove(amount)
+        return True
+
+    def release(self, pair, amount):
+        with self.engine.lock:
+            self.engine.release(pair, amount)
+            if self._credit(pair, amount):
+                self.cash['balance'] += amount
+
+    def record_result(self, pair, profit, amount=0, now=None):
+        with self.engine.lock:
+            self.engine.record_result(pair, profit, amount, now)
+            # a trade recovered from an earlier run (record_open) settled before the
+            # cash was taken from the broker balance: it is in there already
+            if self._credit(pair, amount):
+                self.cash['balance'] += amount + profit
+
+
+def serve(conn, targets, shard):
+    """Answer one shard's requests until its pipe closes (coordinator thread)"""
+    while True:
+        try:
+            target, method, args, kwargs = conn.recv()
+        except (EOFError, OSError):
+            return
+        try:
+            result = getattr(targets[target], method)(*args, **kwargs)
+            reply = ('ok', result)
+        except Exception as e:
+            logger.warning(f"⚠️  Shard {shard}: {target}.{method} failed: {e}")
+            reply = ('error', f"{type(e).__name__}: {e}")
+        try:
+            conn.send(reply)
+        except (EOFError, OSError):
+            return
+
+
+# ------------------------------------------------------------------ worker
+def run_shard(shard, config, account, conn, factory=None):
+    """
+    Worker process: run the bot loop for one shard
+
+    factory(bot_module, shard, config, **shared) -> bot replaces the default
+    TradeBotV14 construction (load tests); its bot may have a report()
+    method whose result is sent to the coordinator after the run.
+    """
+    if account:
+        os.environ["IQ_EMAIL"] = os.getenv(account['email_env'], "")
+        os.environ["IQ_PASSWORD"] = os.getenv(account['password_env'], "")
+
+    bot_module = load_bot_module()
+    for handler in logging.getLogger().handlers:
+        handler.setFormatter(logging.Formatter(f'%(asctime)s - %(levelname)s - [shard {shard}] %(message)s'))
+
+    link = ShardLink(conn)
+    shared = {
+        'risk': RemoteRisk(link),
+        'store': Remote(link, 'journal'),
+        'snapshots': Remote(link, 'snapshots'),
+        'state_path': STATE_PATTERN.format(shard=shard),
+    }
+    bot = None
+    try:
+        if factory is not None:
+            bot = factory(bot_module, shard, config, **shared)
+        else:
+            bot = bot_module.TradeBotV14(config=config, **shared)
+        if bot.shadow:
+            root, ext = os.path.splitext(bot.shadow.path)
+            bot.shadow.path = f"{root}.shard-{shard}{ext}"
+        bot.run()
+        if hasattr(bot, 'report'):
+            link.call('reports', '__setitem__', shard, bot.report())
+    except Exception as e:
+        logger.error(f"❌ Shard {shard} failed: {e}")
+        sys.exit(1)
+    finally:
+        if bot is not None:
+            bot.save_state()
+        conn.close()
+
+
+# ------------------------------------------------------------- coordinator
+class Coordinator:
+    """Runs the shards and serves the shared risk budget, journal and snapshots"""
+
+    def __init__(self, config, shards, accounts=None, store=None, factory=None):
+        self.config = config
+        self.parts = split_config(config, shards)
+        self.accounts = accounts or []
+        self.factory = factory
+        self.risk = RiskEngine(config.get('risk', {}))
+        self.cash = {}  # account index -> {'balance': ...} shared by its shards
+        self.journal = Journal(store or open_trade_store())
+        self.snapshots = SnapshotArchive()
+        self.reports = {}
+        max_runtime = config.get('scheduler', {}).get('max_runtime_seconds', 11 * 60)
+        self.timeout = max_runtime + GRACE
+
+    def run(self):
+        """Run every shard to completion; returns {shard: exit code}"""
+        self.risk.start(self.journal.store, datetime.utcnow())
+        shared = {'journal': self.journal, 'snapshots': self.snapshots, 'reports': self.reports}
+        context = multiprocessing.get_context("spawn")
+
+        workers, threads = {}, []
+        for shard, config in self.parts.items():
+            index = shard % len(self.accounts) if self.accounts else 0
+            account = self.accounts[index] if self.accounts else None
+            targets = {**shared, 'risk': AccountRisk(self.risk, self.cash.setdefault(index, {'balance': None}))}
+            parent, child = context.Pipe()
+            process = context.Process(target=run_shard, args=(shard, config, account, child, self.factory),
+                                      name=f"shard-{shard}")
+            process.start()
+            child.close()
+            thread = threading.Thread(target=serve, args=(parent, targets, shard), name=f"serve-{shard}", daemon=True)
+            thread.start()
+            workers[shard] = process
+            threads.append(thread)
+            logger.info(f"🧩 Shard {shard}: {len(config['currencies'])} pairs ({', '.join(config['currencies'])}) "
+                        f"pid {process.pid}")
+
+        stop = threading.Event()
+        flusher = threading.Thread(target=self._flush_loop, args=(stop,), name="journal", daemon=True)
+        flusher.start()
+
+        deadline = time.monotonic() + self.timeout
+        for shard, process in workers.items():
+            process.join(max(0, deadline - time.monotonic()))
+            if process.is_alive():
+                logger.warning(f"⏰ Shard {shard} still running after {self.timeout}s, terminating")
+                process.terminate()
+                process.join(5)
+        for thread in threads:
+            thread.join(5)
+
+        stop.set()
+        flusher.join()
+        self.journal.flush(everything=True)
+        self.merge_shadow()
+
+        codes = {shard: process.exitcode for shard, process in workers.items()}
+        logger.info(f"🧩 Shards done: {codes}, {self.journal.written} trades journaled, "
+                    f"risk P&L ${self.risk.total.pnl:.2f} over {self.risk.total.trades} trades")
+        return codes
+
+    def _flush_loop(self, stop):
+        while not stop.wait(1.0):
+            try:
+                self.journal.flush()
+            except Exception as e:
+                logger.warning(f"⚠️  Journal flush failed: {e}")
+
+    def merge_shadow(self):
+        """Append the shards' shadow results to the shadow results file in time order, ids renumbered"""
+        runner = ShadowRunner.load(self.config)
+        if runner is None:
+            return
+        root, ext = os.path.splitext(runner.path)
+        parts = sorted(glob.glob(f"{root}.shard-*{ext}"))
+        frames = [read_results(path) for path in parts]
+        frames = [df for df in frames if not df.empty]
+        if frames:
+            merged = pd.concat(frames, ignore_index=True)
+            merged = merged.sort_values(['time', 'variant', 'pair', 'trade_id'], kind='stable', ignore_index=True)
+            # every shard counts from 0 within a settle second: renumber so the ids stay unique
+            seconds = (merged['time'] - pd.Timestamp(0)) // pd.Timedelta(seconds=1)
+            merged['trade_id'] = seconds * ID_SCALE + merged.groupby(seconds).cumcount()
+            append_results(runner.path, merged.to_dict('records'))
+        for path in parts:
+            os.remove(path)
+
+
+def main():
+    """Command line entry point"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - [coordinator] %(message)s',
+        handlers=[logging.FileHandler('bot.log'), logging.StreamHandler()]
+    )
+    parser = argparse.ArgumentParser(description="Run the bot sharded across worker processes")
+    parser.add_argument("--shards", type=int, default=os.cpu_count() or 2, help="worker processes")
+    parser.add_argument("--accounts", help="accounts JSON (credential env var names per account)")
+    parser.add_argument("--config", default=CONFIG_PATH)
+    args = parser.parse_args()
+
+    with open(args.config) as f:
+        config = json.load(f)
+    accounts = None
+    if args.accounts:
+        with open(args.accounts) as f:
+            accounts = json.load(f)['accounts']
+
+    codes = Coordinator(config, max(1, args.shards), accounts).run()
+    sys.exit(0 if all(code == 0 for code in codes.values()) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -21,6 +21,16 @@ import json
 import numpy as np
 import sys
 
+from candle_store import CandleStore
+from candle_snapshots import SnapshotArchive
+from montecarlo import PERCENTILES, RUIN_LEVELS, simulate, summarize as summarize_paths
+from perf_cube import DIMENSIONS, METRICS, PerfCube
+from result_cache import ResultCache
+from shadow import read_results, summarize
+from trade_archive import TradeArchive
+from trade_schema import normalize_trades, read_trades
+from trade_store import open_trade_store
+
 # เช็คโหมดจาก command line arguments และ query parameters
 MODE = "live"  # default
 
@@ -126,111 +136,137 @@ def calculate_adx(high, low, close, period=14):
     return adx.values, plus_di.values, minus_di.values
 
 # Load functions
-@st.cache_data(ttl=10)
-def load_trades():
+def trades_version(df):
+    """
+    สร้าง fingerprint ของข้อมูล trades (ใช้เป็น cache key ของแต่ละมุมมอง)
+
+    คำนวณครั้งเดียวตอนโหลดข้อมูล ทำให้ cache ต่อคู่เงินไม่ต้อง hash DataFrame ทุกรอบ rerun
+    """
+    return int(pd.util.hash_pandas_object(df, index=False).sum())
+
+@st.cache_resource
+def get_result_cache():
+    """Cache รวมของไฟล์ผล backtest (test_results/v1.4_*.csv) - parse เฉพาะไฟล์ใหม่/ที่เปลี่ยน"""
+    return ResultCache("test_results/v1.4_*.csv")
+
+def load_trades(since=None):
     """
     โหลดข้อมูล trades ตามโหมด:
-    - live: อ่านจาก trades.csv (Live Bot)
+    - live: อ่านจาก trade archive หรือ trades.csv (Live Bot) ตั้งแต่วันที่ since
     - test: อ่านจาก test_results/ (Easy Backtester) หรือ test_tools/paper_trading_results.csv
+
+    Returns:
+        (df, data_source, data_version) - data_version เปลี่ยนเมื่อข้อมูลเปลี่ยน
     """
     if MODE == "test":
-        all_dfs = []
-
-        # V1.4: ลองอ่านจาก test_results/ (Easy Backtester)
-        test_results_dir = "test_results"
-        if os.path.exists(test_results_dir):
-            import glob
-            # หาไฟล์ v1.4_*.csv
-            v14_files = glob.glob(f"{test_results_dir}/v1.4_*.csv")
-
-            for filepath in v14_files:
-                try:
-                    df = pd.read_csv(filepath)
-                    if not df.empty:
-                        # ดึงชื่อคู่เงินจากชื่อไฟล์ (เช่น v1.4_EURUSD_1m_30d.csv -> EURUSD)
-                        # แต่ถ้ามีคอลัมน์ pair อยู่แล้ว ไม่ต้อง overwrite
-                        if 'pair' not in df.columns:
-                            filename = os.path.basename(filepath)
-                            pair = filename.replace("v1.4_", "").replace("_1m_30d.csv", "")
-                            df['pair'] = pair  # เพิ่มคอลัมน์คู่เงิน
-                        all_dfs.append(df)
-                except:
-                    continue
-
-        # ถ้าไม่มีจาก test_results/ ลองอ่านจาก test_tools/ (Paper Trading)
-        if not all_dfs:
-            test_file = "test_tools/paper_trading_results.csv"
-            if os.path.exists(test_file):
-                df = pd.read_csv(test_file)
-                if not df.empty:
-                    df['pair'] = 'UNKNOWN'
-                    all_dfs.append(df)
+        # stat ไฟล์อย่างเดียวทุกรอบ rerun - โหลดใหม่เฉพาะเมื่อ path/size/mtime เปลี่ยน
+        return load_test_trades(get_result_cache().signature())
+    return load_live_trades(since)
+
+@st.cache_data(max_entries=4)
+def load_test_trades(signature):
+    """โหลดผล backtest (cache ตาม signature ของไฟล์ ไม่ใช่ ttl)"""
+    df = pd.DataFrame()
+
+    # V1.4: ลองอ่านจาก test_results/ (Easy Backtester) ผ่าน result cache
+    if signature:
+        df = get_result_cache().load()
+
+    # ถ้าไม่มีจาก test_results/ ลองอ่านจาก test_tools/ (Paper Trading)
+    if df.empty:
+        test_file = "test_tools/paper_trading_results.csv"
+        if os.path.exists(test_file):
+            df = pd.read_csv(test_file)
+            if not df.empty:
+                df['pair'] = 'UNKNOWN'
+                df = normalize_trades(df)
 
-        # รวมทุกไฟล์
-        if all_dfs:
-            df = pd.concat(all_dfs, ignore_index=True)
+    if not df.empty:
+        return df, "📊 BACKTESTING (V1.4)", hash(signature)
 
-            # รองรับทั้ง format เก่า (time, direction) และ format ใหม่ (entry_time, signal)
-            if 'entry_time' in df.columns and 'time' not in df.columns:
-                df['time'] = pd.to_datetime(df['entry_time'])
-            else:
-                df['time'] = pd.to_datetime(df['time'])
+    return pd.DataFrame(), "⚠️ NO TEST DATA", None
+
+@st.cache_data(ttl=10)
+def load_live_trades(since=None):
+    """
+    โหลด trades ของ Live Bot (trade archive, GitHub raw URL หรือ trades.csv)
 
-            if 'signal' in df.columns and 'direction' not in df.columns:
-                df['direction'] = df['signal']
+    since: 'YYYY-MM-DD' - archive ตัด partition ก่อนวันนั้นทิ้งจาก manifest โดยไม่เปิดไฟล์
+    """
+    # โหมด live - อ่านจาก GitHub raw URL (real-time)
+    # URL format: https://raw.githubusercontent.com/USERNAME/REPO/BRANCH/FILE
+    github_url = "https://raw.githubusercontent.com/TezukaStar/bot-trade/main/trades.csv"
+    archive_url = "https://raw.githubusercontent.com/TezukaStar/bot-trade/main/archive/trades"
 
-            # สร้าง trade_id ถ้ายังไม่มี
-            if 'trade_id' not in df.columns:
-                df['trade_id'] = [f"trade_{i:03d}" for i in range(len(df))]
+    # ลอง 0: trade archive (GitHub ก่อน แล้วค่อย local) - โหลด manifest แล้วอ่านเฉพาะไฟล์ในช่วงวันที่
+    for root in (archive_url, "archive/trades"):
+        try:
+            archive = TradeArchive(root)
+            manifest = archive.manifest()
+            if manifest['files']:
+                df = archive.read(start=since, manifest=manifest)
+                return df, "🔴 LIVE BOT (Archive)", trades_version(df)
+        except Exception:
+            pass
 
-            return df, "📊 BACKTESTING (V1.4)"
+    df = pd.DataFrame()
+    data_loaded = False
 
-        return pd.DataFrame(), "⚠️ NO TEST DATA"
-    else:
-        # โหมด live - อ่านจาก GitHub raw URL (real-time)
-        # URL format: https://raw.githubusercontent.com/USERNAME/REPO/BRANCH/FILE
-        github_url = "https://raw.githubusercontent.com/TezukaStar/bot-trade/main/trades.csv"
+    # ลอง 1: ดึงจาก GitHub (real-time)
+    try:
+        df = read_trades(github_url)
+        if not df.empty:
+            data_loaded = True
+    except:
+        pass
+
+    # ลอง 2: ถ้าดึงจาก GitHub ไม่สำเร็จ ให้อ่านจาก local file (fallback)
+    if not data_loaded:
+        live_file = "trades.csv"
+        if os.path.exists(live_file):
+            try:
+                df = read_trades(live_file)
+                if not df.empty:
+                    data_loaded = True
+            except:
+                pass
+
+    # read_trades แปลงเป็น schema กลางแล้ว (time, direction, trade_id แบบ integer)
+    if data_loaded and since:
+        df = df[df['time'] >= pd.Timestamp(since)].reset_index(drop=True)
+    if data_loaded and not df.empty:
+        return df, "🔴 LIVE BOT", trades_version(df)
 
-        df = pd.DataFrame()
-        data_loaded = False
+    return pd.DataFrame(), "⚠️ NO LIVE DATA", None
 
-        # ลอง 1: ดึงจาก GitHub (real-time)
+@st.cache_data(ttl=10)
+def load_shadow_trades():
+    """โหลดผลเทรดสมมติของ shadow variants (shadow_trades.csv จาก GitHub หรือ local)"""
+    github_url = "https://raw.githubusercontent.com/TezukaStar/bot-trade/main/shadow_trades.csv"
+    for path in (github_url, "shadow_trades.csv"):
         try:
-            df = pd.read_csv(github_url)
+            df = read_results(path)
             if not df.empty:
-                data_loaded = True
-        except:
+                return df
+        except Exception:
             pass
+    return pd.DataFrame()
 
-        # ลอง 2: ถ้าดึงจาก GitHub ไม่สำเร็จ ให้อ่านจาก local file (fallback)
-        if not data_loaded:
-            live_file = "trades.csv"
-            if os.path.exists(live_file):
-                try:
-                    df = pd.read_csv(live_file)
-                    if not df.empty:
-                        data_loaded = True
-                except:
-                    pass
-
-        # ประมวลผลข้อมูล
-        if data_loaded and not df.empty:
-            # รองรับทั้ง format เก่า (time, direction) และ format ใหม่ (entry_time, signal)
-            if 'entry_time' in df.columns and 'time' not in df.columns:
-                df['time'] = pd.to_datetime(df['entry_time'])
-            else:
-                df['time'] = pd.to_datetime(df['time'])
-
-            if 'signal' in df.columns and 'direction' not in df.columns:
-                df['direction'] = df['signal']
-
-            # สร้าง trade_id ถ้ายังไม่มี
-            if 'trade_id' not in df.columns:
-                df['trade_id'] = [f"trade_{i:03d}" for i in range(len(df))]
-
-            return df, "🔴 LIVE BOT"
+@st.cache_resource
+def get_trade_store(mode):
+    """
+    SQLite trade store ของบอท (โหมด live + TRADE_STORE=sqlite:<path>)
 
-        return pd.DataFrame(), "⚠️ NO LIVE DATA"
+    ใช้เมื่อ dashboard รันเครื่องเดียวกับบอท - filter/แบ่งหน้า/สรุปผลคำนวณใน SQL
+    ไม่ได้ตั้งค่า (หรือยังไม่มีไฟล์ db) = อ่าน trades.csv จาก GitHub ตามเดิม
+    """
+    if mode == "test":
+        return None
+    spec = os.getenv("TRADE_STORE", "")
+    kind, _, path = spec.partition(":")
+    if kind != "sqlite" or not os.path.exists(path or "trades.db"):
+        return None
+    return open_trade_store(spec)
 
 @st.cache_data(ttl=10)
 def load_config():
@@ -252,6 +288,59 @@ def load_config():
     except:
         return {}
 
+@st.cache_resource
+def get_perf_cube(mode, since):
+    """
+    Performance cube ของข้อมูลชุดนี้ (ใช้ร่วมกันทุก session)
+
+    อัปเดตแบบเพิ่มเฉพาะเทรดใหม่เมื่อ data_version เปลี่ยน - heatmap query จาก cube ไม่ต้องวนทุกเทรด
+    session ที่ยังถือ data_version เก่ากว่าที่ cube อัปเดตไปแล้วจะไม่ย้อน cube กลับ (PerfCube.update ข้ามให้)
+    """
+    return PerfCube()
+
+def load_perf_cube():
+    """Cube ที่อัปเดตถึงข้อมูลปัจจุบันแล้ว (SQLite: อ่านเฉพาะเทรดหลัง watermark)"""
+    cube = get_perf_cube(MODE, since)
+    if trade_store is not None:
+        cube.update_from_store(trade_store, data_version)
+    else:
+        cube.update(trades_df, data_version)
+    return cube
+
+@st.cache_resource
+def get_candle_store():
+    """Candle store แบบ memory-mapped (เปิดครั้งเดียว ใช้ร่วมกันทุก session)"""
+    return CandleStore()
+
+@st.cache_resource
+def get_snapshot_archive():
+    """Snapshot แท่งเทียนต่อเทรดที่บอทบันทึกไว้ (data/candles/snapshots.bin)"""
+    return SnapshotArchive()
+
+def load_candle_window(pair, trade_time, count=50):
+    """
+    ดึงแท่งเทียน `count` แท่งล่าสุดก่อน trade_time ของคู่เงินที่เทรดจริง
+
+    ใช้ binary search บน time index ของ candle store (O(log n)) และได้ slice แบบ zero-copy
+    ถ้ายังไม่มี store แต่มี data/{pair}_1m_30d.csv จะ import ครั้งแรกให้อัตโนมัติ
+
+    Returns:
+        dict ของ numpy arrays หรือ None ถ้าไม่มีข้อมูลของคู่เงินนี้
+    """
+    store = get_candle_store()
+
+    if not store.has_pair(pair):
+        csv_path = f"data/{pair}_1m_30d.csv"
+        if not os.path.exists(csv_path):
+            return None
+        try:
+            store.build_from_csv(pair, csv_path)
+        except Exception:
+            return None
+
+    candles = store.window(pair, trade_time, count)
+    return candles if len(candles['time']) > 0 else None
+
 def get_last_run_time():
     """
     อ่านเวลารันล่าสุดจาก last_run.txt (ทั้ง GitHub และ local)
@@ -300,63 +389,90 @@ def get_last_run_time():
 
     return None
 
-def get_bot_status():
+def latest_trade_time(mode):
+    """
+    เวลาเทรดล่าสุดของบอท - อ่านแบบเดียวกับ load_live_trades
+
+    trade archive ก่อน (manifest -> เปิดเฉพาะไฟล์ของวันล่าสุด, คอลัมน์ time), แล้ว SQLite store,
+    trades.csv เป็นทางสุดท้าย (workflow เขียนลง archive ไม่ได้เขียน trades.csv แล้ว)
     """
-    เช็คสถานะของ bot จากข้อมูล trades
+    archive_url = "https://raw.githubusercontent.com/TezukaStar/bot-trade/main/archive/trades"
+    for root in (archive_url, "archive/trades"):
+        try:
+            archive = TradeArchive(root)
+            manifest = archive.manifest()
+            if manifest['files']:
+                last_day = max(entry['last'] for entry in manifest['files'])
+                df = archive.read(start=last_day, columns=['time'], manifest=manifest)
+                if not df.empty:
+                    return df['time'].max()
+        except Exception:
+            pass
+
+    store = get_trade_store(mode)
+    if store is not None:
+        _, last = store.time_range()
+        if last:
+            return pd.Timestamp(last)
+
+    github_url = "https://raw.githubusercontent.com/TezukaStar/bot-trade/main/trades.csv"
+    for path in (github_url, "trades.csv"):
+        try:
+            df = read_trades(path)
+            if not df.empty:
+                return df['time'].max()
+        except Exception:
+            pass
+    return None
+
+@st.cache_data(ttl=10)
+def get_bot_status(mode):
+    """
+    เช็คสถานะของ bot จากเวลาเทรดล่าสุด
 
     Returns:
         - 🟢 Active: เทรดภายใน 30 นาทีที่ผ่านมา
         - 🟡 Waiting: รอสัญญาณ หรือ นอกช่วงเวลาเทรด
         - ⚪ No Data: ยังไม่มีข้อมูลเทรด
     """
-    # ลองดึงข้อมูลจาก GitHub
-    try:
-        github_url = "https://raw.githubusercontent.com/TezukaStar/bot-trade/main/trades.csv"
-        df = pd.read_csv(github_url)
-        if not df.empty and 'time' in df.columns:
-            # หาเทรดล่าสุด
-            df['time'] = pd.to_datetime(df['time'])
-            last_trade_time = df['time'].max()
-            now = pd.Timestamp.now(tz='UTC').tz_localize(None)
-            diff = (now - last_trade_time).total_seconds()
-            minutes_ago = int(diff / 60)
+    last_trade_time = latest_trade_time(mode)
+    if last_trade_time is None:
+        return "⚪ No Data (ยังไม่มีข้อมูลเทรด)", "info"
 
-            if diff < 1800:  # น้อยกว่า 30 นาที
-                return f"🟢 Active (เทรดล่าสุด {minutes_ago} นาที)", "success"
-            else:
-                return f"🟡 Waiting (เทรดล่าสุด {minutes_ago} นาที)", "warning"
-    except Exception as e:
-        # ถ้าดึงจาก GitHub ไม่ได้ ลอง local file
-        if os.path.exists("trades.csv"):
-            try:
-                df = pd.read_csv("trades.csv")
-                if not df.empty and 'time' in df.columns:
-                    df['time'] = pd.to_datetime(df['time'])
-                    last_trade_time = df['time'].max()
-                    now = pd.Timestamp.now(tz='UTC').tz_localize(None)
-                    diff = (now - last_trade_time).total_seconds()
-                    minutes_ago = int(diff / 60)
+    now = pd.Timestamp.now(tz='UTC').tz_localize(None)
+    diff = (now - last_trade_time).total_seconds()
+    minutes_ago = int(diff / 60)
 
-                    if diff < 1800:
-                        return f"🟢 Active (เทรดล่าสุด {minutes_ago} นาที)", "success"
-                    else:
-                        return f"🟡 Waiting (เทรดล่าสุด {minutes_ago} นาที)", "warning"
-            except:
-                pass
-
-    return "⚪ No Data (ยังไม่มีข้อมูลเทรด)", "info"
+    if diff < 1800:  # น้อยกว่า 30 นาที
+        return f"🟢 Active (เทรดล่าสุด {minutes_ago} นาที)", "success"
+    return f"🟡 Waiting (เทรดล่าสุด {minutes_ago} นาที)", "warning"
 
 # Header
 st.markdown('<p class="main-header">🤖 แดชบอร์ด Trade Bot V1.4</p>', unsafe_allow_html=True)
 
 # Load data
-trades_df, data_source = load_trades()
+LIVE_RANGES = {"ทั้งหมด": None, "7 วันล่าสุด": 7, "30 วันล่าสุด": 30, "90 วันล่าสุด": 90}
+
+trade_store = get_trade_store(MODE)
+since = None
+if trade_store is not None:
+    # SQLite: ไม่โหลดทั้งตาราง - version = (max id, จำนวนแถว) ใช้เป็น cache key
+    trades_df, data_source, data_version = None, "🔴 LIVE BOT (SQLite)", trade_store.version()
+    has_trades = data_version[1] > 0
+else:
+    if MODE != "test":
+        # ช่วงข้อมูลโหมด live - archive อ่านเฉพาะ partition ในช่วงที่เลือก
+        live_range = st.sidebar.selectbox("📅 ช่วงข้อมูล", list(LIVE_RANGES), key="live_range")
+        if LIVE_RANGES[live_range] is not None:
+            since = (datetime.utcnow() - timedelta(days=LIVE_RANGES[live_range])).strftime("%Y-%m-%d")
+    trades_df, data_source, data_version = load_trades(since)
+    has_trades = not trades_df.empty
 config = load_config()
 
 # Status
 col1, col2, col3, col4 = st.columns([2, 1, 1, 1])
 with col1:
-    status, status_type = get_bot_status()
+    status, status_type = get_bot_status(MODE)
     if status_type == "success":
         st.success(f"**สถานะบอท:** {status}")
     elif status_type == "warning":
@@ -396,13 +512,13 @@ with col_right:
         st.info(f"**⏰ รันล่าสุด:** ไม่มีข้อมูล")
 
 # แสดงช่วงวันที่ในโหมด Test
-if MODE == "test" and not trades_df.empty:
+if MODE == "test" and has_trades:
     start_date = trades_df['time'].min().strftime('%Y-%m-%d')
     end_date = trades_df['time'].max().strftime('%Y-%m-%d')
     total_days = (trades_df['time'].max() - trades_df['time'].min()).days + 1
     st.success(f"**📅 ช่วงเวลาทดสอบ:** {start_date} ถึง {end_date} ({total_days} วัน)")
 
-if trades_df.empty:
+if not has_trades:
     st.warning("⚠️ ยังไม่มีข้อมูลการเทรด")
 
     if MODE == "test":
@@ -441,48 +557,50 @@ PYTHONPATH=.. python3 paper_trading_simulator.py \\
     st.stop()
 
 # Helper function to calculate metrics for a dataframe
-def calculate_metrics(df, capital):
-    """Calculate all trading metrics for a given dataframe"""
-    total_trades = len(df)
-    wins = len(df[df['result'] == 'win'])
-    losses = len(df[df['result'] == 'loss'])
+def sequence_metrics(profits, is_win, capital):
+    """Equity curve, max drawdown และ streak สูงสุด จากผลเทรดที่เรียงตามเวลาแล้ว"""
+    equity = np.concatenate([[capital], capital + np.cumsum(profits)])
+    peak = np.maximum.accumulate(equity)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        drawdowns = np.where(peak > 0, (peak - equity) / peak * 100, 0)
+    max_dd = float(drawdowns.max())
+
+    # Streak = ความยาวของช่วงที่ผลเหมือนกันติดกัน (run-length แทนการวนทีละเทรด)
+    max_win_streak = max_loss_streak = 0
+    if len(is_win) > 0:
+        starts = np.concatenate([[0], np.flatnonzero(np.diff(is_win.astype(np.int8))) + 1])
+        lengths = np.diff(np.append(starts, len(is_win)))
+        run_is_win = is_win[starts]
+        max_win_streak = int(lengths[run_is_win].max(initial=0))
+        max_loss_streak = int(lengths[~run_is_win].max(initial=0))
+
+    return equity, max_dd, max_win_streak, max_loss_streak
+
+def build_metrics(agg, profits, is_win, capital):
+    """
+    รวมตัวชี้วัดทั้งหมดของหนึ่งมุมมอง
+
+    agg: จำนวน/ผลรวม (total_trades, wins, losses, total_profit, avg_win, avg_loss,
+         today_trades, today_profit, today_wins) - มาจาก pandas หรือ SQL ก็ได้
+    profits, is_win: ผลเทรดเรียงตามเวลา (ใช้ทำ equity/drawdown/streak)
+    """
+    total_trades = agg['total_trades']
+    wins = agg['wins']
+    losses = agg['losses']
     win_rate = (wins / total_trades * 100) if total_trades > 0 else 0
 
-    total_profit = df['profit'].sum()
+    total_profit = float(agg['total_profit'])
     current_capital = capital + total_profit
     roi = (total_profit / capital * 100) if capital > 0 else 0
 
     avg_profit = total_profit / total_trades if total_trades > 0 else 0
-    avg_win = df[df['result'] == 'win']['profit'].mean() if wins > 0 else 0
-    avg_loss = abs(df[df['result'] == 'loss']['profit'].mean()) if losses > 0 else 0
+    avg_win = float(agg['avg_win']) if wins > 0 else 0
+    avg_loss = abs(float(agg['avg_loss'])) if losses > 0 else 0
     profit_factor = (avg_win * wins) / (avg_loss * losses) if (avg_loss * losses) > 0 else 0
 
-    # Calculate max drawdown
-    df_sorted = df.sort_values('time')
-    equity = [capital]
-    for profit in df_sorted['profit']:
-        equity.append(equity[-1] + profit)
-    peak = equity[0]
-    max_dd = 0
-    for val in equity:
-        if val > peak:
-            peak = val
-        dd = ((peak - val) / peak * 100) if peak > 0 else 0
-        if dd > max_dd:
-            max_dd = dd
-
-    # Calculate win/loss streaks
-    current_streak = 0
-    max_win_streak = 0
-    max_loss_streak = 0
-    for _, trade in df_sorted.iterrows():
-        if trade['result'] == 'win':
-            current_streak = current_streak + 1 if current_streak > 0 else 1
-            max_win_streak = max(max_win_streak, current_streak)
-        else:
-            current_streak = current_streak - 1 if current_streak < 0 else -1
-            max_loss_streak = max(max_loss_streak, abs(current_streak))
+    equity, max_dd, max_win_streak, max_loss_streak = sequence_metrics(profits, is_win, capital)
 
+    today_trades = agg['today_trades']
     return {
         'total_trades': total_trades,
         'wins': wins,
@@ -498,15 +616,67 @@ def calculate_metrics(df, capital):
         'max_dd': max_dd,
         'max_win_streak': max_win_streak,
         'max_loss_streak': max_loss_streak,
+        'today_trades': today_trades,
+        'today_profit': float(agg['today_profit']),
+        'today_win_rate': (agg['today_wins'] / today_trades * 100) if today_trades > 0 else 0,
         'equity': equity
     }
 
-# Calculate overall metrics
+def calculate_metrics(df, capital, today=None):
+    """Calculate all trading metrics for a given dataframe"""
+    win_mask = (df['result'] == 'win').to_numpy()
+    loss_mask = (df['result'] == 'loss').to_numpy()
+    profits = df['profit'].to_numpy(dtype=float)
+    today_mask = (df['time'].dt.normalize() == pd.Timestamp(today)).to_numpy() if today else np.zeros(len(df), dtype=bool)
+
+    agg = {
+        'total_trades': len(df),
+        'wins': int(win_mask.sum()),
+        'losses': int(loss_mask.sum()),
+        'total_profit': profits.sum(),
+        'avg_win': profits[win_mask].mean() if win_mask.any() else 0,
+        'avg_loss': profits[loss_mask].mean() if loss_mask.any() else 0,
+        'today_trades': int(today_mask.sum()),
+        'today_profit': profits[today_mask].sum(),
+        'today_wins': int((today_mask & win_mask).sum()),
+    }
+
+    order = np.argsort(df['time'].to_numpy(), kind='stable')
+    return build_metrics(agg, profits[order], win_mask[order], capital)
+
+@st.cache_data(max_entries=64)
+def get_view(_df, pair, capital, data_version, today):
+    """
+    คำนวณข้อมูลของมุมมองเดียว (pair=None = ภาพรวมทั้งหมด)
+
+    Cache ตาม (pair, capital, data_version, today) - สลับกลับมาคู่เงินเดิมจึงไม่ต้องคำนวณใหม่
+    _df ไม่ถูก hash (Streamlit ข้าม argument ที่ขึ้นต้นด้วย _) เพราะ data_version แทนเนื้อหาแล้ว
+    """
+    view_df = _df if pair is None else _df[_df['pair'] == pair]
+    return calculate_metrics(view_df, capital, today)
+
+@st.cache_data(max_entries=64)
+def get_store_view(pair, capital, data_version, today):
+    """
+    เหมือน get_view แต่ให้ SQLite นับ/รวมยอด (COUNT/SUM/AVG บน index)
+
+    ดึงมาแค่ profit + ผลชนะ เรียงตามเวลา เพื่อทำ equity curve / drawdown / streak
+    """
+    store = get_trade_store(MODE)
+    profits, is_win = store.series(pair)
+    return build_metrics(store.aggregates(pair, day=today), profits, is_win, capital)
+
+def load_view_metrics(pair):
+    """ตัวชี้วัดของมุมมองจากแหล่งข้อมูลที่ใช้อยู่ (SQLite หรือ DataFrame)"""
+    today = datetime.now().strftime("%Y-%m-%d")
+    if trade_store is not None:
+        return get_store_view(pair, start_capital, data_version, today)
+    return get_view(trades_df, pair, start_capital, data_version, today)
+
 start_capital = config.get('capital', 100)
-metrics = calculate_metrics(trades_df, start_capital)
 
 # Helper function to render full metrics display
-def render_metrics(metrics_dict, df):
+def render_metrics(metrics_dict):
     """Render complete metrics display with 2 rows"""
     st.markdown("### 📊 ตัวชี้วัดประสิทธิภาพ")
 
@@ -531,12 +701,9 @@ def render_metrics(metrics_dict, df):
                   f"เฉลี่ย ${metrics_dict['avg_profit']:.2f}/เทรด")
 
     with col5:
-        today = datetime.now().strftime("%Y-%m-%d")
-        today_trades = df[df['time'].dt.strftime("%Y-%m-%d") == today]
-        today_profit = today_trades['profit'].sum() if not today_trades.empty else 0
-        today_win_rate = (len(today_trades[today_trades['result'] == 'win']) / len(today_trades) * 100) if len(today_trades) > 0 else 0
+        today_profit = metrics_dict['today_profit']
         st.metric("📅 กำไรวันนี้", f"${today_profit:.2f}",
-                  f"{len(today_trades)} เทรด • {today_win_rate:.0f}% ชนะ",
+                  f"{metrics_dict['today_trades']} เทรด • {metrics_dict['today_win_rate']:.0f}% ชนะ",
                   delta_color="normal" if today_profit >= 0 else "inverse")
 
     # Additional metrics (Row 2)
@@ -567,9 +734,38 @@ def render_metrics(metrics_dict, df):
 
     st.markdown("---")
 
-# Helper function to render charts for any dataframe
-def render_charts(df, metrics_dict, pair_name="All Pairs"):
-    """Render Win/Loss Pie Chart and Equity Curve for given dataframe"""
+# Equity curve: downsample ก่อนส่งให้ browser
+EQUITY_MAX_POINTS = 2000       # จำนวนจุดสูงสุดที่ส่งไปกราฟ (payload คงที่ไม่ว่าจะมีกี่เทรด)
+EQUITY_WEBGL_THRESHOLD = 1000  # เกินนี้ใช้ Scattergl (WebGL) แทน SVG
+
+def downsample_minmax(values, max_points=EQUITY_MAX_POINTS):
+    """
+    Min/max bucketing: คืน index ของจุดที่จะเก็บไว้ (เรียงจากน้อยไปมาก)
+
+    แบ่งเป็น max_points/4 ช่วง แต่ละช่วงเก็บจุดแรก, ต่ำสุด, สูงสุด, จุดสุดท้าย
+    ทำให้ยอดและก้นของ drawdown ยังเห็นครบแม้จะลดจำนวนจุดลงมาก
+    """
+    n = len(values)
+    if n <= max_points:
+        return np.arange(n)
+
+    n_buckets = max(1, max_points // 4)
+    bucket_size = -(-n // n_buckets)
+    padded = np.concatenate([values, np.full(n_buckets * bucket_size - n, values[-1])])
+    buckets = padded.reshape(n_buckets, bucket_size)
+
+    starts = np.arange(n_buckets) * bucket_size
+    idx = np.concatenate([
+        starts,
+        starts + buckets.argmin(axis=1),
+        starts + buckets.argmax(axis=1),
+        np.minimum(starts + bucket_size - 1, n - 1),
+    ])
+    return np.unique(np.minimum(idx, n - 1))
+
+# Helper function to render charts for any view
+def render_charts(metrics_dict, pair_name="All Pairs"):
+    """Render Win/Loss Pie Chart and Equity Curve for given view metrics"""
     st.markdown(f"### 📈 กราฟแสดงผล")
 
     col1, col2 = st.columns(2)
@@ -606,16 +802,26 @@ def render_charts(df, metrics_dict, pair_name="All Pairs"):
 
     with col2:
         # Equity Curve
-        equity = metrics_dict['equity']
+        equity = np.asarray(metrics_dict['equity'])
+
+        # ประวัติยาว: เลือกช่วงเทรดเพื่อซูม - ช่วงแคบพอจะได้ความละเอียดเต็ม
+        start, end = 0, len(equity) - 1
+        if len(equity) > EQUITY_MAX_POINTS:
+            start, end = st.slider("ช่วงเทรด (ซูม)", 0, len(equity) - 1, (0, len(equity) - 1),
+                                   key=f"equity_range_{pair_name}")
+
+        idx = start + downsample_minmax(equity[start:end + 1])
+        large = len(idx) > EQUITY_WEBGL_THRESHOLD
+        scatter = go.Scattergl if large else go.Scatter
 
         fig_equity = go.Figure()
 
-        fig_equity.add_trace(go.Scatter(
-            x=list(range(len(equity))),
-            y=equity,
-            mode='lines+markers',
+        fig_equity.add_trace(scatter(
+            x=idx,
+            y=equity[idx],
+            mode='lines' if large else 'lines+markers',
             name='Capital',
-            line=dict(color='#2196f3', width=3),
+            line=dict(color='#2196f3', width=2 if large else 3),
             marker=dict(size=6, color='#2196f3'),
             fill='tozeroy',
             fillcolor='rgba(33, 150, 243, 0.1)'
@@ -640,133 +846,354 @@ def render_charts(df, metrics_dict, pair_name="All Pairs"):
 
         st.plotly_chart(fig_equity, width='stretch')
 
-# Helper function to render trade list with pagination
-def render_trade_list(df, tab_key=""):
-    """Render paginated trade list for given dataframe"""
+# Trade list: precomputed index + virtualized grid
+TRADES_PER_PAGE = 100
+
+@st.cache_data(max_entries=8)
+def get_trade_index(_df, data_version):
+    """
+    Precompute ลำดับเวลา ใหม่→เก่า ครั้งเดียวต่อ data_version
+
+    เก็บ codes ของ pair/result/direction เรียงตามลำดับนั้นไว้ด้วย
+    การกรองจึงเป็นแค่ boolean mask บน array เล็กๆ - ไม่ต้อง sort ใหม่ทุกครั้งที่ render
+    """
+    order = np.argsort(_df['time'].to_numpy(), kind='stable')[::-1].copy()
+    index = {'order': order}
+    for col in ('pair', 'result', 'direction'):
+        if col in _df.columns:
+            codes, labels = pd.factorize(_df[col], sort=True)
+            index[col] = (codes[order], [str(label) for label in labels])
+    return index
+
+def filter_trade_positions(index, pairs=None, results=None, directions=None):
+    """คืนตำแหน่งแถว (เรียงใหม่→เก่า) ที่ผ่าน filter"""
+    mask = np.ones(len(index['order']), dtype=bool)
+    for col, wanted in (('pair', pairs), ('result', results), ('direction', directions)):
+        if wanted and col in index:
+            codes, labels = index[col]
+            wanted_codes = [labels.index(value) for value in wanted if value in labels]
+            mask &= np.isin(codes, wanted_codes)
+    return index['order'][mask]
+
+@st.cache_data(max_entries=8)
+def get_store_labels(data_version):
+    """ตัวเลือกของ filter จาก SQLite (DISTINCT บน index) ครั้งเดียวต่อ data_version"""
+    store = get_trade_store(MODE)
+    return {col: store.labels(col) for col in ('pair', 'result', 'direction')}
+
+def render_trade_list(df, tab_key="", pair=None, data_version=None, store=None):
+    """
+    Render trade list as a single virtualized grid (only the visible page is materialized)
+
+    store: SQLite trade store - filter/นับ/แบ่งหน้าด้วย WHERE + LIMIT/OFFSET แทน DataFrame
+    """
     st.markdown("---")
-    st.markdown("### 📝 รายการเทรด (คลิกเพื่อดูกราฟแท่งเทียนจริง + อินดิเคเตอร์ทั้งหมด)")
+    st.markdown("### 📝 รายการเทรด (เลือกแถวเพื่อดูกราฟแท่งเทียนจริง + อินดิเคเตอร์ทั้งหมด)")
 
-    # Pagination settings
-    trades_per_page = 10
-    total_trades_count = len(df)
-    total_pages = max(1, (total_trades_count + trades_per_page - 1) // trades_per_page)
+    if store is not None:
+        labels = get_store_labels(data_version)
+    else:
+        index = get_trade_index(df, data_version)
+        labels = {col: index[col][1] for col in ('pair', 'result', 'direction') if col in index}
 
-    # Initialize page number in session state with unique key per tab
-    page_key = f'page_number_{tab_key}'
-    if page_key not in st.session_state:
-        st.session_state[page_key] = 1
+    # Filters
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        if pair is None and 'pair' in labels:
+            pairs = st.multiselect("💱 คู่เงิน", labels['pair'], key=f"filter_pair_{tab_key}")
+        else:
+            pairs = [pair] if pair else None
+    with col2:
+        results = st.multiselect("🎯 ผลลัพธ์", labels.get('result', []), key=f"filter_result_{tab_key}")
+    with col3:
+        directions = st.multiselect("↕️ ทิศทาง", labels.get('direction', []), key=f"filter_direction_{tab_key}")
 
-    # Ensure page number is within valid range
-    if st.session_state[page_key] > total_pages:
-        st.session_state[page_key] = total_pages
-    if st.session_state[page_key] < 1:
-        st.session_state[page_key] = 1
+    if store is not None:
+        total_trades_count = store.count(pairs, results, directions)
+    else:
+        positions = filter_trade_positions(index, pairs, results, directions)
+        total_trades_count = len(positions)
 
-    # Pagination controls
-    col1, col2, col3, col4, col5 = st.columns([1, 1, 2, 1, 1])
+    # Pagination settings
+    total_pages = max(1, (total_trades_count + TRADES_PER_PAGE - 1) // TRADES_PER_PAGE)
 
-    current_page = st.session_state[page_key]
+    # Ensure page number is within valid range (ก่อนสร้าง widget)
+    page_key = f'page_number_{tab_key}'
+    if st.session_state.get(page_key, 1) > total_pages:
+        st.session_state[page_key] = total_pages
 
+    col1, col2 = st.columns([1, 3])
     with col1:
-        if st.button("⏮️ แรกสุด", disabled=(current_page <= 1), key=f"first_page_{tab_key}"):
-            st.session_state[page_key] = 1
-            st.rerun()
+        current_page = st.number_input("หน้า", min_value=1, max_value=total_pages, step=1, key=page_key)
+    with col2:
+        st.markdown(f"<div style='padding-top: 2rem'>หน้า {current_page} จาก {total_pages} ({total_trades_count} เทรด)</div>",
+                    unsafe_allow_html=True)
 
+    # Materialize only the visible page
+    start_idx = (current_page - 1) * TRADES_PER_PAGE
+    if store is not None:
+        page_trades = store.page(pairs, results, directions, limit=TRADES_PER_PAGE, offset=start_idx)
+    else:
+        page_trades = df.iloc[positions[start_idx:start_idx + TRADES_PER_PAGE]]
+
+    table = pd.DataFrame({
+        'เวลา': page_trades['time'].to_numpy(),
+        'คู่เงิน': page_trades['pair'].to_numpy() if 'pair' in page_trades.columns else '',
+        'ทิศทาง': np.where(page_trades['direction'] == 'call', "🔼 CALL", "🔽 PUT"),
+        'ผลลัพธ์': np.where(page_trades['result'] == 'win', "🟢 WIN",
+                          np.where(page_trades['result'] == 'tie', "⚪ TIE", "🔴 LOSS")),
+        'กำไร': page_trades['profit'].to_numpy(),
+        'ทุน': page_trades['capital'].to_numpy(),
+    })
+    trade_ids = page_trades['trade_id'].tolist()
+    table_key = f"trade_table_{tab_key}_{current_page}"
+
+    def select_trade():
+        rows = st.session_state[table_key].selection.rows
+        if rows:
+            st.session_state['selected_trade_id'] = trade_ids[rows[0]]
+
+    st.dataframe(
+        table,
+        hide_index=True,
+        width='stretch',
+        key=table_key,
+        on_select=select_trade,
+        selection_mode="single-row",
+        column_config={
+            'เวลา': st.column_config.DatetimeColumn(format="YYYY-MM-DD HH:mm:ss"),
+            'กำไร': st.column_config.NumberColumn(format="$%.2f"),
+            'ทุน': st.column_config.NumberColumn(format="$%.2f"),
+        },
+    )
+
+# Shadow variants: เปรียบเทียบ config ทางเลือกกับ config จริง (เทรดสมมติ ไม่ได้ส่งออเดอร์)
+def render_shadow(df):
+    """ตารางสรุปต่อ variant + กราฟกำไรสะสมของแต่ละ variant"""
+    st.markdown("### 🧪 Shadow Variants (เทรดสมมติ - ไม่ได้ส่งออเดอร์)")
+    st.caption("variant `live` = config จริง คิดผลแบบเดียวกับ variant อื่น (ราคาปิดแท่งถัดไป)")
+
+    summary = summarize(df)
+    st.dataframe(summary, width='stretch', hide_index=True)
+
+    fig = go.Figure()
+    for variant, group in df.sort_values('time', kind='stable').groupby('variant', observed=True):
+        fig.add_trace(go.Scatter(
+            x=group['time'], y=group['profit'].cumsum(), mode='lines', name=str(variant),
+            line=dict(width=3 if variant == 'live' else 1.5)
+        ))
+    fig.update_layout(
+        title=dict(text="กำไรสะสมต่อ variant ($)", font=dict(size=16, color='#e0e0e0')),
+        paper_bgcolor='#1a1a1a',
+        plot_bgcolor='#1a1a1a',
+        font=dict(color='#e0e0e0'),
+        height=400,
+        xaxis=dict(gridcolor='#2d2d2d', showgrid=True),
+        yaxis=dict(gridcolor='#2d2d2d', showgrid=True),
+        hovermode='x unified'
+    )
+    st.plotly_chart(fig, width='stretch')
+
+# Session heatmap: win rate / จำนวนเทรด / กำไร ตามชั่วโมง × วัน × คู่เงิน × ทิศทาง × indicator
+DIMENSION_NAMES = {'hour': 'ชั่วโมง (UTC)', 'weekday': 'วันในสัปดาห์', 'pair': 'คู่เงิน',
+                   'direction': 'ทิศทาง', 'adx': 'ADX', 'rsi': 'RSI'}
+METRIC_NAMES = {'win_rate': 'Win Rate (%)', 'trades': 'จำนวนเทรด', 'pnl': 'กำไร ($)', 'avg_pnl': 'กำไรเฉลี่ย/เทรด ($)'}
+
+def render_heatmap(cube):
+    """Heatmap ของ slice ที่เลือกจาก performance cube + ช่วง session ใน config"""
+    st.markdown("### 🗓️ Session Heatmap")
+    st.caption(f"สรุปจาก performance cube ({cube.total:,} เทรด) - เวลาเป็น UTC เหมือน session_filters ใน config")
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        rows = st.selectbox("แถว", DIMENSIONS, index=DIMENSIONS.index('hour'),
+                            format_func=DIMENSION_NAMES.get, key="heatmap_rows")
     with col2:
-        if st.button("◀️ ก่อนหน้า", disabled=(current_page <= 1), key=f"prev_page_{tab_key}"):
-            st.session_state[page_key] -= 1
-            st.rerun()
+        choices = [dim for dim in DIMENSIONS if dim != rows]
+        cols = st.selectbox("คอลัมน์", choices, index=choices.index('weekday') if 'weekday' in choices else 0,
+                            format_func=DIMENSION_NAMES.get, key="heatmap_cols")
+    with col3:
+        metric = st.selectbox("ค่า", METRICS, format_func=METRIC_NAMES.get, key="heatmap_metric")
 
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        pairs = st.multiselect("คู่เงิน", list(cube.labels('pair')), key="heatmap_pairs")
+    with col2:
+        directions = st.multiselect("ทิศทาง", list(cube.labels('direction')), key="heatmap_directions")
     with col3:
-        st.markdown(f"<div style='text-align: center; padding: 5px'>หน้า {current_page} จาก {total_pages} ({total_trades_count} เทรดทั้งหมด)</div>", unsafe_allow_html=True)
+        min_trades = st.number_input("จำนวนเทรดขั้นต่ำต่อช่อง", min_value=0, value=10, step=5, key="heatmap_min")
+
+    filters = {'pair': pairs, 'direction': directions}
+    table = cube.table(rows, cols, metric, filters)
+    counts = cube.table(rows, cols, 'trades', filters)
+    if metric in ('win_rate', 'avg_pnl'):
+        # ช่องที่เทรดน้อยเกินไปไม่น่าเชื่อถือ - ซ่อนไว้
+        table = table.where(counts >= max(min_trades, 1))
+
+    if metric == 'win_rate':
+        colors = dict(colorscale='RdYlGn', zmid=50)
+    elif metric == 'trades':
+        colors = dict(colorscale='Blues')
+    else:
+        colors = dict(colorscale='RdYlGn', zmid=0)
+    fig = go.Figure(go.Heatmap(
+        z=table.to_numpy(dtype=float), x=list(table.columns), y=list(table.index),
+        customdata=counts.to_numpy(), **colors,
+        hovertemplate="%{y} / %{x}<br>" + METRIC_NAMES[metric] + ": %{z:.2f}<br>เทรด: %{customdata}<extra></extra>",
+    ))
+    fig.update_layout(
+        paper_bgcolor='#1a1a1a',
+        plot_bgcolor='#1a1a1a',
+        font=dict(color='#e0e0e0'),
+        height=max(400, 24 * len(table.index) + 120),
+        xaxis=dict(title=DIMENSION_NAMES[cols], type='category'),
+        yaxis=dict(title=DIMENSION_NAMES[rows], type='category', autorange='reversed'),
+    )
+    st.plotly_chart(fig, width='stretch')
+
+    # ช่วง session ที่ใช้อยู่ใน config (เทียบกับ heatmap ตามชั่วโมง)
+    sessions = [f"{pair}: " + ", ".join(f"{window} {direction.upper()}" for window, direction in params['session_filters'].items())
+                for pair, params in config.get('currencies', {}).items()
+                if params.get('enabled', False) and params.get('session_filters')]
+    if sessions:
+        st.caption("⏰ Session ใน config: " + " | ".join(sessions))
+
+# Monte Carlo: สุ่มลำดับผลเทรดใหม่ (bootstrap) เพื่อดูการกระจายของ drawdown / streak / โอกาสหมดทุน
+@st.cache_data(max_entries=16)
+def get_monte_carlo(pair, data_version, capital, scale, paths, block, horizon, stop_loss):
+    """
+    ผล Monte Carlo ของมุมมองเดียว - cache ตาม data_version และพารามิเตอร์
 
-    with col4:
-        if st.button("ถัดไป ▶️", disabled=(current_page >= total_pages), key=f"next_page_{tab_key}"):
-            st.session_state[page_key] += 1
-            st.rerun()
+    คืนเฉพาะสรุป, fan และ histogram (ไม่เก็บ array ทุก path ไว้ใน cache)
+    """
+    if trade_store is not None:
+        profits, _ = trade_store.series(pair)
+    else:
+        view_df = trades_df if pair is None else trades_df[trades_df['pair'] == pair]
+        profits = view_df.sort_values('time', kind='stable')['profit'].to_numpy(dtype=np.float64)
+    if len(profits) == 0:
+        return None
+    result = simulate(profits, capital, paths, horizon or None, block, scale)
+    counts, edges = np.histogram(result['max_dd_pct'], bins=50)
+    return {
+        'summary': summarize_paths(result, capital, stop_loss),
+        'fan': result['fan'],
+        'fan_steps': result['fan_steps'],
+        'dd_hist': (counts, edges),
+        'streaks': np.bincount(result['max_loss_streak']),
+        'trades': len(profits),
+    }
 
+def render_monte_carlo(pairs):
+    """การกระจายของ max drawdown, losing streak และโอกาสหมดทุน จากการสุ่มลำดับเทรด"""
+    st.markdown("### 🎲 Monte Carlo (สุ่มลำดับผลเทรดใหม่)")
+    amount = config.get('amount', 1)
+    stop_loss = config.get('risk', {}).get('stop_loss')
+
+    col1, col2, col3, col4, col5 = st.columns(5)
+    with col1:
+        pair = st.selectbox("คู่เงิน", [None] + list(pairs or []), format_func=lambda p: "ทั้งหมด" if p is None else p,
+                            key="mc_pair")
+    with col2:
+        paths = st.selectbox("จำนวน path", [10_000, 100_000], index=1, format_func="{:,}".format, key="mc_paths")
+    with col3:
+        block = st.number_input("Block (เทรดติดกัน)", min_value=1, max_value=50, value=1, key="mc_block",
+                                help="1 = bootstrap ปกติ, มากกว่า 1 = เก็บลำดับแพ้/ชนะที่ติดกันไว้")
+    with col4:
+        horizon = st.number_input("เทรดต่อ path (0 = เท่าข้อมูลจริง)", min_value=0, value=0, step=50, key="mc_horizon")
     with col5:
-        if st.button("ท้ายสุด ⏭️", disabled=(current_page >= total_pages), key=f"last_page_{tab_key}"):
-            st.session_state[page_key] = total_pages
-            st.rerun()
-
-    # Get trades for current page (reversed order - newest first)
-    trades_df_sorted = df.sort_values('time', ascending=False).reset_index(drop=True)
-    start_idx = (current_page - 1) * trades_per_page
-    end_idx = min(start_idx + trades_per_page, total_trades_count)
-    page_trades = trades_df_sorted.iloc[start_idx:end_idx]
-
-    # Display trades (exactly 10 per page, fill with empty rows if needed)
-    for i in range(trades_per_page):
-        if i < len(page_trades):
-            # Show real trade data
-            trade = page_trades.iloc[i]
-            result_color = "🟢" if trade['result'] == 'win' else "🔴"
-            direction_icon = "🔼" if trade['direction'] == 'call' else "🔽"
-
-            col1, col2, col3, col4, col5, col6 = st.columns([2, 1, 1, 1, 1, 1])
-
-            with col1:
-                st.text(trade['time'].strftime('%Y-%m-%d %H:%M:%S'))
-            with col2:
-                st.text(f"{direction_icon} {trade['direction'].upper()}")
-            with col3:
-                st.text(f"{result_color} {trade['result'].upper()}")
-            with col4:
-                profit_color = "green" if trade['profit'] > 0 else "red"
-                st.markdown(f"<span style='color: {profit_color}'>${trade['profit']:.2f}</span>", unsafe_allow_html=True)
-            with col5:
-                st.text(f"${trade['capital']:.2f}")
-            with col6:
-                # Use trade_id to create unique key
-                actual_idx = start_idx + i
-                trade_id = trade.get('trade_id', f"trade_{actual_idx}")
-                if st.button("📊 ดูรายละเอียด", key=f"view_{trade_id}_{tab_key}_{current_page}"):
-                    st.session_state['selected_trade_id'] = trade_id
-                    st.rerun()
-        else:
-            # Show empty placeholder to keep layout consistent
-            col1, col2, col3, col4, col5, col6 = st.columns([2, 1, 1, 1, 1, 1])
-            with col1:
-                st.text("")
-            with col2:
-                st.text("")
-            with col3:
-                st.text("")
-            with col4:
-                st.text("")
-            with col5:
-                st.text("")
-            with col6:
-                st.text("")
-
-# Create tabs for Overview and individual pairs
-if 'pair' in trades_df.columns:
-    # V1.4: Multi-currency mode - create tabs
+        stake = st.number_input("เงินต่อเทรด ($)", min_value=0.1, value=float(amount), step=0.5, key="mc_amount")
+
+    mc = get_monte_carlo(pair, data_version, start_capital, stake / amount, paths, block, horizon, stop_loss)
+    if mc is None:
+        st.info("ยังไม่มีเทรดในมุมมองนี้")
+        return
+    summary = mc['summary']
+    st.caption(f"{summary['paths']:,} paths จาก {mc['trades']:,} เทรด - ทุน ${start_capital}, เงินต่อเทรด ${stake:g}")
+
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("📉 Max DD (มัธยฐาน)", f"{summary['max_dd_pct'][50]:.2f}%")
+    with col2:
+        st.metric("📉 Max DD (95%)", f"{summary['max_dd_pct'][95]:.2f}%")
+    with col3:
+        st.metric("💀 โอกาสขาดทุน 50% ของทุน", f"{summary['ruin'][0.5]:.2%}")
+    with col4:
+        if 'p_stop_loss' in summary:
+            st.metric(f"🛑 โอกาสแพ้ติด {stop_loss} ไม้ (stop_loss)", f"{summary['p_stop_loss']:.2%}")
+
+    table = pd.DataFrame({
+        'Max DD (%)': summary['max_dd_pct'],
+        'แพ้ติดกันสูงสุด': summary['max_loss_streak'],
+        'ทุนสุดท้าย ($)': summary['final'],
+    }, index=[f"P{p}" for p in PERCENTILES]).T
+    st.dataframe(table, width='stretch')
+    st.caption("โอกาสหมดทุน: " + " | ".join(f"เสีย {level:.0%} = {summary['ruin'][level]:.2%}" for level in RUIN_LEVELS)
+               + f" | จบต่ำกว่าทุน = {summary['p_loss']:.2%}")
+
+    layout = dict(paper_bgcolor='#1a1a1a', plot_bgcolor='#1a1a1a', font=dict(color='#e0e0e0'), height=400,
+                  xaxis=dict(gridcolor='#2d2d2d', showgrid=True), yaxis=dict(gridcolor='#2d2d2d', showgrid=True))
+    col1, col2 = st.columns(2)
+    with col1:
+        fig = go.Figure()
+        for level, values in zip(PERCENTILES, mc['fan']):
+            fig.add_trace(go.Scatter(x=mc['fan_steps'], y=values, mode='lines', name=f"P{level}",
+                                     line=dict(width=3 if level == 50 else 1.5)))
+        fig.update_layout(title=dict(text="ทุนตามจำนวนเทรด (percentile ของทุก path)", font=dict(size=16)), **layout)
+        st.plotly_chart(fig, width='stretch')
+    with col2:
+        counts, edges = mc['dd_hist']
+        fig = go.Figure(go.Bar(x=(edges[:-1] + edges[1:]) / 2, y=counts / summary['paths'] * 100,
+                               marker_color='#ff6b6b'))
+        fig.update_layout(title=dict(text="การกระจายของ Max Drawdown (%)", font=dict(size=16)),
+                          yaxis_title="% ของ path", **layout)
+        st.plotly_chart(fig, width='stretch')
+
+# เลือกมุมมอง: render เฉพาะมุมมองที่เลือก (ไม่ render ทุกแท็บทุกรอบเหมือน st.tabs)
+if trade_store is not None:
+    unique_pairs = trade_store.pairs()
+elif 'pair' in trades_df.columns:
     unique_pairs = sorted(trades_df['pair'].unique())
-    tab_names = ["📊 ภาพรวมทั้งหมด"] + [f"💱 {pair}" for pair in unique_pairs]
-    tabs = st.tabs(tab_names)
-
-    # Tab 0: Overview (All Pairs)
-    with tabs[0]:
-        render_metrics(metrics, trades_df)
-        render_charts(trades_df, metrics, "ภาพรวมทั้งหมด")
-        render_trade_list(trades_df, "overview")
-
-    # Individual pair tabs
-    for idx, pair in enumerate(unique_pairs):
-        with tabs[idx + 1]:
-            pair_df = trades_df[trades_df['pair'] == pair]
-            pair_metrics = calculate_metrics(pair_df, start_capital)
-
-            render_metrics(pair_metrics, pair_df)
-            render_charts(pair_df, pair_metrics, pair)
-            render_trade_list(pair_df, pair)
+else:
+    unique_pairs = None
+
+if unique_pairs is not None:
+    # V1.4: Multi-currency mode - selector แทนแท็บ
+    view_names = ["📊 ภาพรวมทั้งหมด"] + [f"💱 {pair}" for pair in unique_pairs]
+    shadow_df = load_shadow_trades() if MODE != "test" else pd.DataFrame()
+    view_names.append("🗓️ Heatmap")
+    view_names.append("🎲 Monte Carlo")
+    if not shadow_df.empty:
+        view_names.append("🧪 Shadow")
+    selected_view = st.radio("มุมมอง", view_names, horizontal=True,
+                             key="selected_view", label_visibility="collapsed")
+    view_idx = view_names.index(selected_view)
+
+    if selected_view == "🧪 Shadow":
+        render_shadow(shadow_df)
+    elif selected_view == "🗓️ Heatmap":
+        render_heatmap(load_perf_cube())
+    elif selected_view == "🎲 Monte Carlo":
+        render_monte_carlo(unique_pairs)
+    elif view_idx == 0:
+        # Overview (All Pairs)
+        view_metrics = load_view_metrics(None)
+        render_metrics(view_metrics)
+        render_charts(view_metrics, "ภาพรวมทั้งหมด")
+        render_trade_list(trades_df, "overview", None, data_version, trade_store)
+    else:
+        # Individual pair
+        pair = unique_pairs[view_idx - 1]
+        view_metrics = load_view_metrics(pair)
+        render_metrics(view_metrics)
+        render_charts(view_metrics, pair)
+        render_trade_list(trades_df, pair, pair, data_version, trade_store)
 else:
     # V1.3 or earlier - single currency mode
-    render_metrics(metrics, trades_df)
-    render_charts(trades_df, metrics, "EURUSD")
-    render_trade_list(trades_df, "eurusd")
+    view_metrics = load_view_metrics(None)
+    render_metrics(view_metrics)
+    render_charts(view_metrics, "EURUSD")
+    render_trade_list(trades_df, "eurusd", None, data_version)
 
 # Show detail if selected
 if 'selected_trade_id' in st.session_state:
@@ -775,7 +1202,10 @@ if 'selected_trade_id' in st.session_state:
 
     # Find the trade by trade_id
     trade_id = st.session_state['selected_trade_id']
-    selected_trade = trades_df[trades_df['trade_id'] == trade_id].iloc[0] if 'trade_id' in trades_df.columns and trade_id in trades_df['trade_id'].values else None
+    if trade_store is not None:
+        selected_trade = trade_store.get(trade_id)
+    else:
+        selected_trade = trades_df[trades_df['trade_id'] == trade_id].iloc[0] if 'trade_id' in trades_df.columns and trade_id in trades_df['trade_id'].values else None
 
     if selected_trade is None:
         st.error("ไม่พบข้อมูลเทรดที่เลือก")
@@ -818,48 +1248,40 @@ if 'selected_trade_id' in st.session_state:
                 macd_status = "✅ ดี" if abs(macd_value) > 0.0005 else "⚠️ อ่อน"
                 st.metric("MACD", f"{macd_value:.4f}", macd_status)
 
-        # Load real candles from CSV data
+        # Load real candles
         trade_time = selected_trade['time']
         pair = selected_trade.get('pair', 'EURUSD')
 
-        # Try to load candles from CSV file
-        candles_loaded = False
-        candles = []
+        # candles = dict ของ numpy arrays: time (epoch วินาที UTC), open, high, low, close, volume
+        candles = None
+        candles_source = None
 
-        # First try JSON file (old format)
+        # First try the snapshot the bot captured at trade time (อ่านเฉพาะเทรดนี้)
         trade_id = selected_trade['trade_id']
         candle_file = f"data/candles/{trade_id}.json"
 
-        if os.path.exists(candle_file):
+        snapshot = get_snapshot_archive().read(trade_id)
+        if snapshot is not None and len(snapshot['time']) > 0:
+            candles = snapshot
+            candles_source = "snapshot"
+
+        # Then JSON file (old format)
+        if candles is None and os.path.exists(candle_file):
             with open(candle_file, 'r') as f:
-                candles = json.load(f)
-            candles_loaded = True if len(candles) > 0 else False
-
-        # If no JSON, load from CSV
-        if not candles_loaded and os.path.exists("data/EURUSD_1m_30d.csv"):
-            df_candles = pd.read_csv("data/EURUSD_1m_30d.csv")
-            df_candles['time'] = pd.to_datetime(df_candles['time'])
-
-            # Get 50 candles before trade time
-            mask = df_candles['time'] <= trade_time
-            candle_data = df_candles[mask].tail(50)
-
-            if len(candle_data) > 0:
-                # Convert to JSON-like format
-                candles = []
-                for _, row in candle_data.iterrows():
-                    candles.append({
-                        'time': row['time'].timestamp(),
-                        'open': row['open'],
-                        'high': row['high'],
-                        'low': row['low'],
-                        'close': row['close'],
-                        'volume': row['volume']
-                    })
-                candles_loaded = True
+                json_candles = json.load(f)
+            if len(json_candles) > 0:
+                candles = {col: np.array([c[col] for c in json_candles])
+                           for col in ('time', 'open', 'high', 'low', 'close', 'volume')}
+                candles_source = "snapshot"
+
+        # If no JSON, use the per-pair candle store (binary search + zero-copy slice)
+        if candles is None:
+            candles = load_candle_window(pair, trade_time, 50)
+            if candles is not None:
+                candles_source = "store"
 
         # If still no data (e.g., in TEST mode), generate mock candles
-        if not candles_loaded:
+        if candles is None:
             st.info("📊 Generating mock candles for demonstration (Test Mode)")
 
             # Generate 50 realistic mock candles
@@ -895,24 +1317,22 @@ if 'selected_trade_id' in st.session_state:
 
                 current_price = close_price
 
-            candles = mock_candles
-            candles_loaded = True
+            candles = {col: np.array([c[col] for c in mock_candles])
+                       for col in ('time', 'open', 'high', 'low', 'close', 'volume')}
+            candles_source = "mock"
 
-        if candles_loaded and len(candles) > 0:
+        if candles is not None and len(candles['time']) > 0:
                 # Check if it's mock or real data
-                if not os.path.exists(candle_file) and not os.path.exists("data/EURUSD_1m_30d.csv"):
-                    # Mock data
-                    pass  # Info message already shown above
-                else:
-                    st.success(f"✅ Loaded {len(candles)} REAL candles from IQ Option historical data")
+                if candles_source != "mock":
+                    st.success(f"✅ Loaded {len(candles['time'])} REAL candles from IQ Option historical data")
 
-                # Extract data
-                timestamps = [datetime.fromtimestamp(c['time']) for c in candles]
-                opens = [c['open'] for c in candles]
-                highs = [c['high'] for c in candles]
-                lows = [c['low'] for c in candles]
-                closes = [c['close'] for c in candles]
-                volumes = [c['volume'] for c in candles]
+                # Extract data (arrays ส่งต่อให้ plotly ตรงๆ ไม่ต้องแปลงทีละแถว)
+                timestamps = pd.to_datetime(candles['time'], unit='s')
+                opens = candles['open']
+                highs = candles['high']
+                lows = candles['low']
+                closes = candles['close']
+                volumes = candles['volume']
 
                 # Calculate indicators
                 ema20 = pd.Series(closes).ewm(span=20, adjust=False).mean().values
@@ -927,7 +1347,7 @@ if 'selected_trade_id' in st.session_state:
                     shared_xaxes=True,
                     vertical_spacing=0.03,
                     row_heights=[0.5, 0.15, 0.15, 0.2],
-                    subplot_titles=('EURUSD 1-Minute Chart with EMA20 & Bollinger Bands',
+                    subplot_titles=(f'{pair} 1-Minute Chart with EMA20 & Bollinger Bands',
                                    'RSI (14)',
                                    'MACD (5,13,3)',
                                    'ADX (14) & Volume')
@@ -941,7 +1361,7 @@ if 'selected_trade_id' in st.session_state:
                         high=highs,
                         low=lows,
                         close=closes,
-                        name='EURUSD',
+                        name=pair,
                         increasing_line_color='#00c853',
                         decreasing_line_color='#ff1744',
                         increasing_fillcolor='#00c853',
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Indicators - ADX/MACD/RSI/EMA/slope of many pairs in one vectorized pass
+
+Inputs are 2D float arrays shaped (pairs, candles): one row per pair, all
+rows the same length (the bot's candle windows). The indicators are
+recursions over time, so each is one loop over the candle axis with numpy
+operations across all rows - the cost per iteration barely grows with the
+number of pairs.
+
+Values match the ta library calls the bot used before (ADXIndicator(14),
+MACD(5, 13, 3), RSIIndicator, EMAIndicator, fillna=False), warm-up values
+included: NaN for EMA/MACD/RSI/slope and 0 for ADX.
+
+IndicatorBatch computes each series lazily and keeps it, so everything
+that asks for the same parameters shares one computation.
+
+Usage:
+  python indicators.py --pairs 3 10 100    # compare with ta and time both
+"""
+
+import time
+import argparse
+import numpy as np
+import pandas as pd
+
+ADX_WINDOW = 14
+MACD_FAST, MACD_SLOW, MACD_SIGN = 5, 13, 3
+SLOPE_LAG = 10
+COLUMNS = ('adx', 'macd', 'macd_signal', 'rsi', 'ema20', 'slope')
+
+
+def ewm_mean(x, alpha, min_periods):
+    """
+    Row-wise Series.ewm(alpha=alpha, adjust=False, min_periods=...).mean()
+
+    Leading all-NaN columns are skipped, like pandas does for each series
+    (rows are aligned, so they share the same warm-up columns).
+    """
+    out = np.full(x.shape, np.nan)
+    valid = ~np.isnan(x).all(axis=0)
+    if not valid.any():
+        return out
+    start = int(valid.argmax())
+
+    old, new = 1.0 - alpha, alpha
+    weighted = x[:, start].copy()
+    out[:, start] = weighted
+    for t in range(start + 1, x.shape[1]):
+        cur = x[:, t]
+        # same operation order as pandas (and no update on an equal value)
+        weighted = np.where(weighted != cur, (old * weighted + new * cur) / (old + new), weighted)
+        out[:, t] = weighted
+    out[:, start:start + min_periods - 1] = np.nan
+    return out
+
+
+def ema(close, window):
+    return ewm_mean(close, 2.0 / (window + 1), window)
+
+
+def macd(close, fast=MACD_FAST, slow=MACD_SLOW, sign=MACD_SIGN):
+    """(macd line, signal line)"""
+    line = ema(close, fast) - ema(close, slow)
+    return line, ema(line, sign)
+
+
+def rsi(close, window=14):
+    diff = np.full(close.shape, np.nan)
+    diff[:, 1:] = np.diff(close, axis=1)
+    up = np.where(diff > 0, diff, 0.0)
+    down = np.where(diff < 0, -diff, 0.0)
+    up = ewm_mean(up, 1.0 / window, window)
+    down = ewm_mean(down, 1.0 / window, window)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(down == 0, 100.0, 100 - 100 / (1 + up / down))
+
+
+def _wilder_sum(values, window, length):
+    """ta's running sum: first `window` values after the NaN, then s - s/window + x"""
+    out = np.zeros((values.shape[0], length))
+    out[:, 0] = values[:, 1:window + 1].sum(axis=1)
+    for i in range(1, length - 1):
+        out[:, i] = out[:, i - 1] - out[:, i - 1] / float(window) + values[:, window + i]
+    return out
+
+
+def adx(high, low, close, window=ADX_WINDOW):
+    n = close.shape[1]
+    length = n - (window - 1)
+    out = np.zeros(close.shape)
+    if length <= window:
+        return out
+
+    prev_close = np.full(close.shape, np.nan)
+    prev_close[:, 1:] = close[:, :-1]
+    true_range = np.maximum(high, prev_close) - np.minimum(low, prev_close)
+
+    diff_up = np.full(close.shape, np.nan)
+    diff_down = np.full(close.shape, np.nan)
+    diff_up[:, 1:] = high[:, 1:] - high[:, :-1]
+    diff_down[:, 1:] = low[:, :-1] - low[:, 1:]
+    with np.errstate(invalid='ignore'):
+        pos = np.abs(((diff_up > diff_down) & (diff_up > 0)) * diff_up)
+        neg = np.abs(((diff_down > diff_up) & (diff_down > 0)) * diff_down)
+
+    trs = _wilder_sum(true_range, window, length)
+    dip = _wilder_sum(pos, window, length)
+    din = _wilder_sum(neg, window, length)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        dip = np.where(trs != 0, 100 * (dip / trs), 0.0)
+        din = np.where(trs != 0, 100 * (din / trs), 0.0)
+        total = dip + din
+        dx = np.where(total != 0, 100 * np.abs((dip - din) / total), 0.0)
+
+    smoothed = np.zeros((close.shape[0], length))
+    smoothed[:, window] = dx[:, :window].mean(axis=1)
+    for i in range(window + 1, length):
+        smoothed[:, i] = (smoothed[:, i - 1] * (window - 1) + dx[:, i - 1]) / float(window)
+    out[:, window - 1:] = smoothed
+    return out
+
+
+def slope(close, lag=SLOPE_LAG):
+    out = np.full(close.shape, np.nan)
+    out[:, lag:] = (close[:, lag:] - close[:, :-lag]) / lag
+    return out
+
+
+def compute(high, low, close, ema_period=20, rsi_period=14):
+    """All bot indicators for stacked (pairs, candles) arrays -> {column: 2D array}"""
+    macd_line, macd_signal = macd(close)
+    return {
+        'adx': adx(high, low, close),
+        'macd': macd_line,
+        'macd_signal': macd_signal,
+        'rsi': rsi(close, rsi_period),
+        'ema20': ema(close, ema_period),
+        'slope': slope(close),
+    }
+
+
+class IndicatorBatch:
+    """
+    Equal-length candle windows of several pairs, stacked once
+
+    frames: {pair: DataFrame(time, open, high, low, close, volume)}
+    Each indicator series is computed for all pairs on first use and kept,
+    so callers asking for the same parameters (the live config and shadow
+    variants) share it. Rows are read back per pair with row(); frame()
+    builds a full DataFrame only when one is needed (e.g. a trade snapshot).
+    """
+
+    def __init__(self, frames):
+        self.frames = frames
+        self.index = {pair: row for row, pair in enumerate(frames)}
+        self.high, self.low, self.close = (
+            np.stack([df[col].to_numpy(dtype=np.float64) for df in frames.values()])
+            for col in ('high', 'low', 'close')
+        )
+        self.cache = {}
+
+    def series(self, name, period=None):
+        """One indicator for all pairs (2D array), computed once per (name, period)"""
+        key = (name, period)
+        if key not in self.cache:
+            if name == 'adx':
+                self.cache[key] = adx(self.high, self.low, self.close)
+            elif name in ('macd', 'macd_signal'):
+                self.cache[('macd', None)], self.cache[('macd_signal', None)] = macd(self.close)
+            elif name == 'rsi':
+                self.cache[key] = rsi(self.close, period)
+            elif name == 'ema20':
+                self.cache[key] = ema(self.close, period)
+            elif name == 'slope':
+                self.cache[key] = slope(self.close)
+            else:
+                raise KeyError(name)
+        return self.cache[key]
+
+    def _columns(self, ema_period, rsi_period):
+        periods = {'rsi': rsi_period, 'ema20': ema_period}
+        return {col: self.series(col, periods.get(col)) for col in COLUMNS}
+
+    def row(self, pair, position=-2, ema_period=20, rsi_period=14):
+        """{'time', 'close', indicator: value} of one candle of a pair (default: last completed)"""
+        row = self.index[pair]
+        values = {col: float(series[row, position]) for col, series in self._columns(ema_period, rsi_period).items()}
+        values['close'] = float(self.close[row, position])
+        values['time'] = self.frames[pair]['time'].iloc[position]
+        return values
+
+    def frame(self, pair, ema_period=20, rsi_period=14):
+        """Copy of the pair's candles with the indicator columns added"""
+        df = self.frames[pair].copy()
+        row = self.index[pair]
+        for col, series in self._columns(ema_period, rsi_period).items():
+            df[col] = series[row]
+        return df
+
+
+def compute_with_ta(df, ema_period=20, rsi_period=14):
+    """Reference: the per-pair ta computation the batched path replaces"""
+    import ta
+
+    df = df.copy()
+    df['adx'] = ta.trend.ADXIndicator(high=df['high'], low=df['low'], close=df['close'],
+                                      window=ADX_WINDOW).adx()
+    indicator = ta.trend.MACD(close=df['close'], window_slow=MACD_SLOW, window_fast=MACD_FAST,
+                              window_sign=MACD_SIGN)
+    df['macd'] = indicator.macd()
+    df['macd_signal'] = indicator.macd_signal()
+    df['rsi'] = ta.momentum.RSIIndicator(close=df['close'], window=rsi_period).rsi()
+    df['ema20'] = ta.trend.EMAIndicator(close=df['close'], window=ema_period).ema_indicator()
+    df['slope'] = df['close'].diff(SLOPE_LAG) / SLOPE_LAG
+    return df
+
+
+def random_window(rng, candles=100):
+    close = 1.1 + np.cumsum(rng.normal(0, 0.0002, candles))
+    spread = np.abs(rng.normal(0, 0.0001, (2, candles)))
+    times = pd.date_range("2026-10-19", periods=candles, freq="min")
+    return pd.DataFrame({'time': times, 'open': close, 'high': close + spread[0], 'low': close - spread[1],
+                         'close': close, 'volume': 0.0})
+
+
+def main():
+    """Compare with ta and time both for several pair counts"""
+    parser = argparse.ArgumentParser(description="Batched indicators vs per-pair ta")
+    parser.add_argument("--pairs", type=int, nargs="+", default=[3, 10, 30, 100])
+    parser.add_argument("--candles", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    for count in args.pairs:
+        frames = {f"P{i}": random_window(rng, args.candles) for i in range(count)}
+
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            batch = IndicatorBatch(frames)
+            rows = {pair: batch.row(pair) for pair in frames}
+        batch_ms = (time.perf_counter() - start) / args.repeat * 1000
+        batched = {pair: batch.frame(pair) for pair in frames}
+
+        start = time.perf_counter()
+        reference = {pair: compute_with_ta(df) for pair, df in frames.items()}
+        ta_ms = (time.perf_counter() - start) * 1000
+
+        error = max(
+            np.nanmax(np.abs(batched[p][col].to_numpy() - reference[p][col].to_numpy()), initial=0)
+            for p in frames for col in COLUMNS
+        )
+        same_nan = all(
+            np.array_equal(batched[p][col].isna().to_numpy(), reference[p][col].isna().to_numpy())
+            for p in frames for col in COLUMNS
+        )
+        same_rows = all(np.isclose(rows[p]['adx'], reference[p]['adx'].iloc[-2]) for p in frames)
+        print(f"{count:>4} pairs: batched {batch_ms:7.1f}ms  ta {ta_ms:7.1f}ms  "
+              f"max diff {error:.2e}  warm-up {'ok' if same_nan else 'MISMATCH'}  rows {'ok' if same_rows else 'MISMATCH'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Balance Ledger - local account balance tracked from stakes and settlements
+
+The trade path never waits for a balance query: stake() debits the order
+amount when a trade opens, settle() credits stake + profit when it closes.
+A background thread reconciles against the broker's balance every
+`interval` seconds and flags drift above `drift_threshold`.
+
+    balance   cash as the broker reports it (open stakes already debited)
+    equity    balance + open stakes at cost (used by the risk checks)
+
+Both are plain attribute reads - O(1), no network.
+"""
+
+import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DRIFT_THRESHOLD = 0.5   # dollars
+DEFAULT_RECONCILE_INTERVAL = 60  # seconds
+
+
+class BalanceLedger:
+    """Thread-safe local balance with background reconciliation"""
+
+    def __init__(self, balance, drift_threshold=DEFAULT_DRIFT_THRESHOLD):
+        self.balance = float(balance)
+        self.open_stakes = {}     # trade_id -> amount
+        self.drift_threshold = drift_threshold
+        self.drift = 0.0          # broker - ledger at the last reconcile
+        self.drift_flagged = False
+        self.reconciled_at = time.time()
+        self.lock = threading.Lock()
+        self.version = 0          # bumped on every stake/settle (reconcile skips stale reads)
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def equity(self):
+        return self.balance + sum(self.open_stakes.values())
+
+    def stake(self, trade_id, amount):
+        """Debit the stake of a newly opened trade"""
+        with self.lock:
+            self.open_stakes[str(trade_id)] = float(amount)
+            self.balance -= float(amount)
+            self.version += 1
+
+    def settle(self, trade_id, profit):
+        """
+        Credit a closed trade: stake back plus profit (profit = -stake on a loss)
+
+        Trades staked in an earlier run are already in the broker balance the
+        ledger started from, so they are ignored here.
+        """
+        with self.lock:
+            amount = self.open_stakes.pop(str(trade_id), None)
+            if amount is None:
+                return
+            self.balance += amount + float(profit)
+            self.version += 1
+
+    def reconcile(self, broker_balance):
+        """
+        Compare against the broker balance and adopt it
+
+        Skipped when a stake/settle happened while the balance was being
+        fetched (the read would be stale). Returns the drift, or None if skipped.
+        """
+        return self._reconcile(broker_balance, self.version)
+
+    def _reconcile(self, broker_balance, version):
+        if broker_balance is None:
+            return None
+        with self.lock:
+            if version != self.version:
+                return None
+            drift = float(broker_balance) - self.balance
+            self.drift = drift
+            self.drift_flagged = abs(drift) > self.drift_threshold
+            self.balance = float(broker_balance)
+            self.reconciled_at = time.time()
+
+        if self.drift_flagged:
+            logger.warning(f"⚠️  Balance drift ${drift:+.2f} (ledger vs broker) exceeds ${self.drift_threshold:.2f}")
+        return drift
+
+    def reconcile_with(self, fetch_balance):
+        """Fetch the broker balance and reconcile (a fetch error is logged, not raised)"""
+        version = self.version
+        try:
+            broker_balance = fetch_balance()
+        except Exception as e:
+            logger.warning(f"⚠️  Balance reconcile failed: {e}")
+            return None
+        return self._reconcile(broker_balance, version)
+
+    def start_reconciler(self, fetch_balance, interval=DEFAULT_RECONCILE_INTERVAL):
+        """Reconcile every `interval` seconds on a daemon thread"""
+        def loop():
+            while not self._stop.wait(interval):
+                self.reconcile_with(fetch_balance)
+
+        self._thread = threading.Thread(target=loop, name="ledger-reconcile", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
@@ -0,0 +1,420 @@
+#!/usr/bin/env python3
+"""
+Load Test - TradeBotV14.run against a simulated broker for N pairs
+
+For every pair count a fresh worker process writes a synthetic config
+(N pairs, all open, default indicator thresholds, no risk limits) into a
+scratch directory and runs the real bot loop with:
+
+    SimBroker   local IQ_Option stand-in: random-walk candles per pair
+                (about 1 in 10 trends, so some iterations place orders),
+                orders always accepted, every call delayed by the
+                configured latency (+/- jitter)
+    SimClock    idle time is skipped (sleeping fast-forwards the clock),
+                while the bot's own work, rate-limit waits and broker
+                latency take real time - a run of several minutes finishes
+                in the time the bot is actually busy
+
+The api rate limits are the bot's own (config "api" / DEFAULT_RATE_LIMITS).
+With --shards K the pairs run under coordinator.py in K worker processes
+(each with its own simulated connection); the table then shows the worst
+shard's latencies and missed closes, and RSS / CPU summed over processes.
+
+Reported per pair count:
+    scan ms         wake-up at the candle close until the bot sleeps again
+                    (p50 / p95) - open orders settle on their own threads
+    iteration ms    the same intervals (p95 / max)
+    missed closes   candle closes that passed while an iteration was still
+                    busy (that candle is never evaluated on time)
+    peak RSS, CPU   of the worker process
+
+Usage:
+  python loadtest.py --pairs 3 20 100 500              # print the table
+  python loadtest.py --pairs 100 500 --shards 1 4       # single process vs 4 shards
+  python loadtest.py --save                            # refresh the committed baseline
+  python loadtest.py --check                           # exit 1 on a regression vs the baseline
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import resource
+import tempfile
+import threading
+import functools
+import subprocess
+import zlib
+import importlib.util
+from datetime import datetime
+
+import numpy as np
+
+from recorder import Clock
+from coordinator import Coordinator
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+BOT_PATH = os.path.join(ROOT, "bot_v1.4.py")
+CONFIG_PATH = os.path.join(ROOT, "versions/v1.4/config.json")
+DEFAULT_BASELINE = os.path.join(ROOT, "test_results/loadtest_baseline.json")
+DEFAULT_PAIRS = [3, 20, 100, 500]
+HISTORY = 200  # candles before the run starts
+TRENDING = 10  # one synthetic pair in TRENDING trends (signals), the rest are random walks
+
+# regression = worse than the baseline by more than this
+TOLERANCE = {'scan_p95_ms': (1.5, 50.0), 'peak_rss_mb': (1.3, 20.0)}  # (factor, absolute slack)
+
+
+class SimClock(Clock):
+    """
+    Clock that skips idle time: work runs in real time, sleeping fast-forwards
+
+    Order threads return from their sleep at once: the bot loop does not
+    wait for results, so only the main thread's sleep advances the clock.
+    """
+
+    def __init__(self, start):
+        self.offset = start - time.perf_counter()
+        self.lock = threading.Lock()
+        self.woke_at = None
+        self.busy = []  # (woke_at, slept_at) of the main loop
+
+    def time(self):
+        return self.offset + time.perf_counter()
+
+    def utcnow(self):
+        return datetime.utcfromtimestamp(self.time())
+
+    def _advance(self, until):
+        with self.lock:
+            self.offset += max(0.0, until - self.time())
+
+    def sleep(self, seconds):
+        if threading.current_thread() is not threading.main_thread():
+            return
+        if self.woke_at is not None:
+            self.busy.append((self.woke_at, self.time()))
+        self._advance(self.time() + seconds)
+        self.woke_at = self.time()
+
+
+class SimBroker:
+    """IQ_Option stand-in with random-walk candles and a fixed call latency"""
+
+    def __init__(self, currencies, start, minutes, latency_ms=50, jitter_ms=20, seed=0):
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.next_id = 1
+        self.balance = 10000.0
+        self.stakes = {}
+        self.candles = {}
+
+        first = int(start) // 60 * 60 - HISTORY * 60
+        count = HISTORY + minutes + 5
+        for pair, cfg in currencies.items():
+            # per-pair stream (the same however the pairs are sharded); about one pair
+            # in TRENDING trends in its session direction so orders happen too
+            rng = np.random.default_rng([seed, zlib.crc32(pair.encode('utf-8'))])
+            direction = next(iter(cfg['session_filters'].values()))
+            drift = (3e-4 if direction == 'call' else -3e-4) if rng.random() < 1 / TRENDING else 0.0
+            close = 1.1 + np.cumsum(rng.normal(drift, 2e-4, count))
+            spread = np.abs(rng.normal(0, 1e-4, (2, count)))
+            self.candles[pair] = [
+                {'from': first + i * 60, 'open': float(close[i - 1] if i else close[0]),
+                 'max': float(close[i] + spread[0, i]), 'min': float(close[i] - spread[1, i]),
+                 'close': float(close[i]), 'volume': 1}
+                for i in range(count)
+            ]
+        self.first = first
+
+    def _wait(self):
+        time.sleep(max(0.0, self.latency + self.rng.uniform(-self.jitter, self.jitter)))
+
+    def connect(self):
+        self._wait()
+        return True, None
+
+    def check_connect(self):
+        return True
+
+    def change_balance(self, mode):
+        self._wait()
+
+    def get_balance(self):
+        self._wait()
+        return self.balance
+
+    def get_candles(self, pair, interval, count, end):
+        self._wait()
+        last = int((end - self.first) // 60)
+        return self.candles[pair][max(0, last - count + 1):last + 1]
+
+    def buy(self, amount, pair, direction, expiry):
+        self._wait()
+        with self.lock:
+            self.next_id += 1
+            self.balance -= amount
+            self.stakes[self.next_id] = amount
+            return True, self.next_id
+
+    def check_win_v4(self, trade_id):
+        self._wait()
+        with self.lock:
+            amount = self.stakes.pop(trade_id)
+            profit = amount * 0.8 if self.rng.random() < 0.55 else -amount
+            self.balance += amount + profit
+        return profit
+
+    def get_optioninfo_v2(self, limit):
+        self._wait()
+        return {'msg': {'closed_options': []}}
+
+    def get_all_init_v2(self):
+        self._wait()
+        actives = {i: {'name': f"front.{pair}", 'enabled': True, 'is_suspended': False,
+                       'option': {'profit': {'commission': 20}}}
+                   for i, pair in enumerate(self.candles)}
+        return {'turbo': {'actives': actives}}
+
+
+def synthetic_config(count, minutes):
+    """The live config with `count` always-open SIMnnnn pairs and no risk limits"""
+    with open(CONFIG_PATH) as f:
+        config = json.load(f)
+    config['risk'] = {}
+    config['scheduler'] = {**config.get('scheduler', {}), 'max_runtime_seconds': minutes * 60}
+    config['ledger'] = {'reconcile_interval': None}
+    config['currencies'] = {
+        f"SIM{i:04d}": {
+            'enabled': True,
+            'trading_hours': {'start': 0, 'end': 23},
+            'session_filters': {'0-23': 'call' if i % 2 else 'put'},
+            'indicators': dict(config['default_indicators']),
+        }
+        for i in range(count)
+    }
+    return config
+
+
+def load_bot():
+    spec = importlib.util.spec_from_file_location("bot_v14", BOT_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def summarize_run(clock, broker, pairs, wall, cpu, rss_mb):
+    busy = clock.busy or [(0.0, 0.0)]
+    scan = iteration = np.array([b - a for a, b in busy]) * 1000
+    # closes (multiples of 60s) that passed while an iteration was running
+    missed = sum(int(b // 60) - int(a // 60) for a, b in busy)
+    return {
+        'pairs': pairs,
+        'shards': 1,
+        'iterations': len(clock.busy),
+        'scan_p50_ms': round(float(np.percentile(scan, 50)), 1),
+        'scan_p95_ms': round(float(np.percentile(scan, 95)), 1),
+        'iteration_p95_ms': round(float(np.percentile(iteration, 95)), 1),
+        'iteration_max_ms': round(float(iteration.max()), 1),
+        'missed_closes': missed,
+        'orders': broker.next_id - 1,
+        'peak_rss_mb': round(rss_mb, 1),
+        'cpu_s': round(cpu, 2),
+        'cpu_pct': round(cpu / wall * 100, 1) if wall else 0.0,
+        'wall_s': round(wall, 1),
+    }
+
+
+def combine(reports, pairs, shards, wall, cpu, rss_mb):
+    """One row for a sharded run: worst shard latencies, summed orders / RSS / CPU"""
+    worst = lambda key: max(r[key] for r in reports)
+    return {
+        'pairs': pairs,
+        'shards': shards,
+        'iterations': min(r['iterations'] for r in reports),
+        'scan_p50_ms': worst('scan_p50_ms'),
+        'scan_p95_ms': worst('scan_p95_ms'),
+        'iteration_p95_ms': worst('iteration_p95_ms'),
+        'iteration_max_ms': worst('iteration_max_ms'),
+        'missed_closes': worst('missed_closes'),
+        'orders': sum(r['orders'] for r in reports),
+        'peak_rss_mb': round(rss_mb + sum(r['peak_rss_mb'] for r in reports), 1),
+        'cpu_s': round(cpu, 2),
+        'cpu_pct': round(cpu / wall * 100, 1) if wall else 0.0,
+        'wall_s': round(wall, 1),
+    }
+
+
+def cpu_seconds(who):
+    usage = resource.getrusage(who)
+    return usage.ru_utime + usage.ru_stime
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def quiet(logging_module):
+    for handler in logging_module.getLogger().handlers:
+        if not isinstance(handler, logging_module.FileHandler):
+            handler.setLevel(logging_module.WARNING)
+
+
+def sim_shard(start, minutes, latency_ms, jitter_ms, seed, bot_module, shard, config, **shared):
+    """Coordinator bot factory: a shard bot on the simulated broker and clock"""
+    quiet(bot_module.logging)
+    clock = SimClock(start)
+    broker = SimBroker(config['currencies'], start, minutes, latency_ms, jitter_ms, seed)
+    bot = bot_module.TradeBotV14(broker=broker, clock=clock, config=config, **shared)
+
+    cpu, wall = cpu_seconds(resource.RUSAGE_SELF), time.perf_counter()
+    bot.report = lambda: summarize_run(clock, broker, len(config['currencies']), time.perf_counter() - wall,
+                                       cpu_seconds(resource.RUSAGE_SELF) - cpu, peak_rss_mb())
+    clock.woke_at = clock.time()
+    return bot
+
+
+def run_worker(pairs, shards, minutes, latency_ms, jitter_ms, seed):
+    """Run the bot for one pair count in this process (inside a scratch directory)"""
+    with tempfile.TemporaryDirectory() as root:
+        os.chdir(root)
+        os.makedirs("versions/v1.4")
+        config = synthetic_config(pairs, minutes)
+        with open("versions/v1.4/config.json", 'w') as f:
+            json.dump(config, f)
+        start = (time.time() // 60 + 1) * 60 + config['scheduler'].get('close_offset_seconds', 2)
+
+        if shards > 1:
+            factory = functools.partial(sim_shard, start, minutes, latency_ms, jitter_ms, seed)
+            coordinator = Coordinator(config, shards, factory=factory)
+            cpu, wall = cpu_seconds(resource.RUSAGE_SELF) + cpu_seconds(resource.RUSAGE_CHILDREN), time.perf_counter()
+            coordinator.run()
+            wall = time.perf_counter() - wall
+            cpu = cpu_seconds(resource.RUSAGE_SELF) + cpu_seconds(resource.RUSAGE_CHILDREN) - cpu
+            return combine(list(coordinator.reports.values()), pairs, shards, wall, cpu, peak_rss_mb())
+
+        bot_module = load_bot()
+        quiet(bot_module.logging)
+        clock = SimClock(start)
+        broker = SimBroker(config['currencies'], start, minutes, latency_ms, jitter_ms, seed)
+        bot = bot_module.TradeBotV14(broker=broker, clock=clock)
+
+        cpu, wall = cpu_seconds(resource.RUSAGE_SELF), time.perf_counter()
+        clock.woke_at = clock.time()
+        bot.run()
+        wall = time.perf_counter() - wall
+        cpu = cpu_seconds(resource.RUSAGE_SELF) - cpu
+        return summarize_run(clock, broker, pairs, wall, cpu, peak_rss_mb())
+
+
+def run(pairs, shards, minutes, latency_ms, jitter_ms, seed):
+    """One worker process per (pair count, shard count) (clean memory / CPU numbers)"""
+    results = []
+    for count in pairs:
+        for shard_count in shards:
+            with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as f:
+                out = f.name
+            try:
+                subprocess.run([sys.executable, os.path.abspath(__file__), "--worker", str(count),
+                                "--shards", str(shard_count), "--minutes", str(minutes),
+                                "--latency-ms", str(latency_ms), "--jitter-ms", str(jitter_ms),
+                                "--seed", str(seed), "--out", out],
+                               check=True, cwd=ROOT)
+                with open(out) as f:
+                    results.append(json.load(f))
+            finally:
+                os.remove(out)
+            print_row(results[-1])
+    return results
+
+
+HEADER = f"{'pairs':>6} {'shards':>6} {'iters':>5} {'scan p50':>9} {'scan p95':>9} {'iter p95':>9} {'iter max':>9} " \
+         f"{'missed':>6} {'orders':>6} {'RSS MB':>7} {'CPU s':>7} {'CPU %':>6} {'wall s':>7}"
+
+
+def print_row(r):
+    print(f"{r['pairs']:>6} {r.get('shards', 1):>6} {r['iterations']:>5} {r['scan_p50_ms']:>9.1f} {r['scan_p95_ms']:>9.1f} "
+          f"{r['iteration_p95_ms']:>9.1f} {r['iteration_max_ms']:>9.1f} "
+          f"{r['missed_closes']:>6} {r['orders']:>6} {r['peak_rss_mb']:>7.1f} {r['cpu_s']:>7.2f} "
+          f"{r['cpu_pct']:>6.1f} {r['wall_s']:>7.1f}")
+
+
+def regressions(results, baseline):
+    """Metrics worse than the baseline (same pair and shard count) beyond TOLERANCE"""
+    found = []
+    reference = {(r['pairs'], r.get('shards', 1)): r for r in baseline['results']}
+    for r in results:
+        key = (r['pairs'], r.get('shards', 1))
+        base = reference.get(key)
+        if base is None:
+            continue
+        label = f"{key[0]} pairs / {key[1]} shard(s)"
+        for metric, (factor, slack) in TOLERANCE.items():
+            if r[metric] > base[metric] * factor + slack:
+                found.append(f"{label}: {metric} {r[metric]} (baseline {base[metric]})")
+        if r['missed_closes'] > base['missed_closes']:
+            found.append(f"{label}: missed_closes {r['missed_closes']} (baseline {base['missed_closes']})")
+    return found
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Bot scalability vs pair count (simulated broker)")
+    parser.add_argument("--pairs", type=int, nargs="+", help=f"pair counts (default {DEFAULT_PAIRS} or the baseline's)")
+    parser.add_argument("--shards", type=int, nargs="+", help="worker process counts (default 1 or the baseline's)")
+    parser.add_argument("--minutes", type=int, default=5, help="simulated run length")
+    parser.add_argument("--latency-ms", type=float, default=50, help="broker latency per call")
+    parser.add_argument("--jitter-ms", type=float, default=20, help="+/- uniform latency jitter")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--check", action="store_true", help="compare with the baseline settings, exit 1 on regression")
+    parser.add_argument("--worker", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--out", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        result = run_worker(args.worker, (args.shards or [1])[0], args.minutes, args.latency_ms,
+                            args.jitter_ms, args.seed)
+        with open(args.out, 'w') as f:
+            json.dump(result, f)
+        return
+
+    settings = {'minutes': args.minutes, 'latency_ms': args.latency_ms, 'jitter_ms': args.jitter_ms,
+                'seed': args.seed, 'pairs': args.pairs or DEFAULT_PAIRS, 'shards': args.shards or [1]}
+    baseline = None
+    if args.check:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        settings = {'shards': [1], **baseline['settings']}
+        if args.pairs:
+            settings['pairs'] = args.pairs
+        if args.shards:
+            settings['shards'] = args.shards
+
+    print(HEADER)
+    results = run(settings['pairs'], settings['shards'], settings['minutes'], settings['latency_ms'],
+                  settings['jitter_ms'], settings['seed'])
+
+    if args.save:
+        os.makedirs(os.path.dirname(args.baseline) or ".", exist_ok=True)
+        with open(args.baseline, 'w') as f:
+            json.dump({'recorded_at': datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S"),
+                       'python': sys.version.split()[0], 'cpus': os.cpu_count(), 'settings': settings,
+                       'results': results}, f, indent=2)
+        print(f"Saved baseline to {args.baseline}")
+
+    if baseline is not None:
+        found = regressions(results, baseline)
+        for line in found:
+            print(f"REGRESSION {line}")
+        print("No regression vs the baseline" if not found else f"{len(found)} regression(s)")
+        sys.exit(1 if found else 0)
+
+
+if __name__ == "__main__":
+    main()
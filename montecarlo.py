@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Monte Carlo - drawdown, losing streak and ruin distributions of trade sequences
+
+The historical max drawdown and streak are one ordering of the trades.
+This module resamples the per-trade outcomes into many alternative
+sequences and reports the distributions instead:
+
+    bootstrap        each trade drawn independently (block=1)
+    block bootstrap  runs of `block` consecutive trades drawn together
+                     (circular), keeping win/loss clustering and streaks
+
+Every path starts at `capital`; the outcomes are scaled by
+amount / historical amount to try another stake. Per path:
+
+    max_dd_pct        largest peak-to-trough drop of the equity, in %
+    min_equity        lowest equity (ruin: it reached capital x (1 - level))
+    final             equity after `horizon` trades
+    max_loss_streak   longest run of losses (a tie does not reset it, like
+                      the risk engine's consecutive-loss counter)
+
+Paths are simulated as numpy matrices (paths x trades) per chunk, the
+chunk size bounded by MAX_CELLS. About four float64 matrices of a chunk
+are alive at once (outcomes, equity, peak, drawdown), so the default
+keeps the peak near 50 MB whatever the number of paths and trades.
+
+Usage:
+  python montecarlo.py                                     # trades of TRADE_STORE, config stake
+  python montecarlo.py --results "test_results/v1.4_*.csv" --pair EURUSD --block 5 --amount 2
+"""
+
+import json
+import argparse
+import logging
+import numpy as np
+
+from result_cache import ResultCache
+from trade_store import open_trade_store
+
+logger = logging.getLogger(__name__)
+
+CONFIG_PATH = "versions/v1.4/config.json"
+DEFAULT_PATHS = 100_000
+MAX_CELLS = 1_500_000                 # path x trade cells per chunk (~12 MB per float64 matrix)
+RUIN_LEVELS = (0.1, 0.25, 0.5, 1.0)   # fraction of the capital lost
+PERCENTILES = (5, 25, 50, 75, 95)
+FAN_POINTS = 50                       # equity checkpoints kept per path for the fan chart
+
+
+def resample(rng, n, paths, horizon, block=1):
+    """Trade indices (paths x horizon): plain bootstrap, or circular blocks of `block` trades"""
+    if block <= 1:
+        return rng.integers(0, n, size=(paths, horizon))
+    blocks = -(-horizon // block)
+    starts = rng.integers(0, n, size=(paths, blocks, 1))
+    return ((starts + np.arange(block)) % n).reshape(paths, blocks * block)[:, :horizon]
+
+
+def loss_streaks(profits):
+    """Longest run of losses per row (wins reset it, ties do not)"""
+    losses = np.cumsum(profits < 0, axis=1, dtype=np.int32)
+    at_win = np.where(profits > 0, losses, 0)
+    return (losses - np.maximum.accumulate(at_win, axis=1)).max(axis=1)
+
+
+def simulate(profits, capital, paths=DEFAULT_PATHS, horizon=None, block=1, scale=1.0, seed=0,
+             max_cells=MAX_CELLS):
+    """
+    Resampled equity paths of per-trade profits
+
+    horizon: trades per path (default: as many as the history)
+    Returns {'max_dd_pct', 'min_equity', 'final', 'max_loss_streak'} arrays
+    of one value per path, plus 'fan' (PERCENTILES x checkpoints of equity)
+    and 'fan_steps' (trade number of each checkpoint).
+    """
+    profits = np.asarray(profits, dtype=np.float64) * scale
+    if len(profits) == 0:
+        raise ValueError("No trades to resample")
+    horizon = int(horizon or len(profits))
+    rng = np.random.default_rng(seed)
+
+    steps = np.unique(np.linspace(0, horizon - 1, min(FAN_POINTS, horizon)).astype(np.int64))
+    result = {
+        'max_dd_pct': np.empty(paths, dtype=np.float32),
+        'min_equity': np.empty(paths, dtype=np.float64),
+        'final': np.empty(paths, dtype=np.float64),
+        'max_loss_streak': np.empty(paths, dtype=np.int32),
+    }
+    checkpoints = np.empty((paths, len(steps)), dtype=np.float32)
+
+    chunk = max(1, min(paths, max_cells // horizon))
+    for lo in range(0, paths, chunk):
+        hi = min(paths, lo + chunk)
+        outcomes = profits[resample(rng, len(profits), hi - lo, horizon, block)]
+        # in place where possible: outcomes, equity, peak and drawdown are the only full matrices
+        equity = np.cumsum(outcomes, axis=1)
+        equity += capital
+        peak = np.maximum.accumulate(equity, axis=1)
+        np.maximum(peak, capital, out=peak)
+        drawdown = peak - equity
+        np.divide(drawdown, peak, out=drawdown, where=peak > 0)
+        drawdown[peak <= 0] = 0
+        drawdown *= 100
+
+        result['max_dd_pct'][lo:hi] = np.maximum(drawdown.max(axis=1), 0)
+        del peak, drawdown
+        result['min_equity'][lo:hi] = np.minimum(equity.min(axis=1), capital)
+        result['final'][lo:hi] = equity[:, -1]
+        result['max_loss_streak'][lo:hi] = loss_streaks(outcomes)
+        checkpoints[lo:hi] = equity[:, steps]
+
+    result['fan'] = np.percentile(checkpoints, PERCENTILES, axis=0)
+    result['fan_steps'] = steps + 1
+    return result
+
+
+def summarize(result, capital, stop_loss=None, levels=RUIN_LEVELS):
+    """Percentiles and probabilities of a simulate() result"""
+    paths = len(result['final'])
+    summary = {
+        'paths': paths,
+        'max_dd_pct': dict(zip(PERCENTILES, np.percentile(result['max_dd_pct'], PERCENTILES).round(2).tolist())),
+        'max_loss_streak': dict(zip(PERCENTILES, np.percentile(result['max_loss_streak'], PERCENTILES).tolist())),
+        'final': dict(zip(PERCENTILES, np.percentile(result['final'], PERCENTILES).round(2).tolist())),
+        'p_loss': float((result['final'] < capital).mean()),
+        'ruin': {level: float((result['min_equity'] <= capital * (1 - level)).mean()) for level in levels},
+    }
+    if stop_loss:
+        summary['p_stop_loss'] = float((result['max_loss_streak'] >= stop_loss).mean())
+    return summary
+
+
+def main():
+    """Command line entry point"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Monte Carlo drawdown / ruin analysis of trade outcomes")
+    parser.add_argument("--store", help="trade store spec (default: TRADE_STORE env var, else csv:trades.csv)")
+    parser.add_argument("--results", help="backtest result glob instead of the trade store (e.g. test_results/v1.4_*.csv)")
+    parser.add_argument("--pair", help="only this pair")
+    parser.add_argument("--paths", type=int, default=DEFAULT_PATHS)
+    parser.add_argument("--horizon", type=int, help="trades per path (default: as many as the history)")
+    parser.add_argument("--block", type=int, default=1, help="block length (1 = plain bootstrap)")
+    parser.add_argument("--amount", type=float, help="stake to simulate (default: config amount)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--config", default=CONFIG_PATH)
+    args = parser.parse_args()
+
+    with open(args.config) as f:
+        config = json.load(f)
+    capital = config.get('capital', 100)
+    base_amount = config.get('amount', 1)
+    stop_loss = config.get('risk', {}).get('stop_loss')
+
+    df = ResultCache(args.results).load() if args.results else open_trade_store(args.store).read()
+    if args.pair and not df.empty:
+        df = df[df['pair'] == args.pair]
+    if df.empty:
+        print("No trades")
+        return
+    profits = df.sort_values('time', kind='stable')['profit'].to_numpy(dtype=np.float64)
+
+    amount = args.amount or base_amount
+    result = simulate(profits, capital, args.paths, args.horizon, args.block, amount / base_amount, args.seed)
+    summary = summarize(result, capital, stop_loss)
+
+    horizon = args.horizon or len(profits)
+    print(f"{summary['paths']:,} paths x {horizon} trades from {len(profits)} trades "
+          f"(block {args.block}, stake ${amount:g}, capital ${capital:g})")
+    print(f"{'percentile':>10} " + " ".join(f"{p:>8}" for p in PERCENTILES))
+    for key, label in (('max_dd_pct', 'max DD %'), ('max_loss_streak', 'streak'), ('final', 'final $')):
+        print(f"{label:>10} " + " ".join(f"{value:>8g}" for value in summary[key].values()))
+    print(f"P(final < capital) = {summary['p_loss']:.2%}")
+    for level, p in summary['ruin'].items():
+        print(f"P(lose {level:.0%} of capital) = {p:.2%}")
+    if 'p_stop_loss' in summary:
+        print(f"P(streak >= stop_loss {stop_loss}) = {summary['p_stop_loss']:.2%}")
+
+
+if __name__ == "__main__":
+    main()
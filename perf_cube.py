@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+Performance Cube - trade counts, wins and P&L pre-aggregated by session dimensions
+
+The session windows in config.json ("12-13": "put") come from win rates by
+hour. The cube keeps those aggregates ready for any slice:
+
+    pair x direction x weekday x hour (UTC) x ADX bucket x RSI bucket
+        -> trades, wins, P&L
+
+as three dense numpy arrays (about 19k cells per pair). Adding trades is
+one bincount over their flattened cell index; a query sums the cube over
+the dimensions not shown, so its cost depends on the cube size only, not
+on the number of trades behind it.
+
+The cube is built incrementally: it remembers the last trade time it
+counted (and the trade ids at that time), so an update only adds newer
+trades - from a DataFrame (dashboard) or from the trade store (CLI). If
+the data no longer extends what was counted (rewritten, filtered
+differently), it is rebuilt from scratch. Sessions sharing one cube may
+still hold an older data version: an update with a version the cube has
+already moved past is ignored instead of rolling the cube back.
+
+Cube file (.cache/perf_cube.npz): trades / wins / pnl arrays plus a JSON
+meta entry (pairs, watermark), like the bot state snapshot.
+
+Usage:
+  python perf_cube.py                                   # TRADE_STORE -> .cache/perf_cube.npz, hour x direction
+  python perf_cube.py --rows hour --cols weekday --metric pnl --pair EURUSD
+"""
+
+import os
+import json
+import argparse
+import logging
+import threading
+from collections import deque
+import numpy as np
+import pandas as pd
+
+from trade_schema import DIRECTIONS
+from trade_store import open_trade_store
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PATH = ".cache/perf_cube.npz"
+CUBE_VERSION = 1
+VERSION_HISTORY = 32  # data versions remembered as older than the current one
+
+WEEKDAYS = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')
+HOURS = tuple(f"{hour:02d}" for hour in range(24))
+ADX_EDGES = (8, 15, 20, 25, 30, 40)   # buckets <8, 8-15, ..., 40+ and n/a
+RSI_EDGES = (30, 40, 50, 60, 70)
+
+DIMENSIONS = ('pair', 'direction', 'weekday', 'hour', 'adx', 'rsi')
+METRICS = ('win_rate', 'trades', 'pnl', 'avg_pnl')
+
+
+def bucket_labels(edges):
+    inner = [f"{lo}-{hi}" for lo, hi in zip(edges[:-1], edges[1:])]
+    return (f"<{edges[0]}", *inner, f"{edges[-1]}+", "n/a")
+
+
+def bucket_codes(values, edges):
+    """Bucket index per value (missing values go to the last, n/a bucket)"""
+    values = np.asarray(values, dtype=np.float64)
+    codes = np.searchsorted(np.asarray(edges, dtype=np.float64), values, side='right')
+    codes[np.isnan(values)] = len(edges) + 1
+    return codes
+
+
+class PerfCube:
+    """Trades / wins / P&L by pair, direction, weekday, hour and indicator bucket"""
+
+    def __init__(self):
+        self.pairs = []
+        shape = (0, len(DIRECTIONS), len(WEEKDAYS), len(HOURS), len(ADX_EDGES) + 2, len(RSI_EDGES) + 2)
+        self.trades = np.zeros(shape, dtype=np.int64)
+        self.wins = np.zeros(shape, dtype=np.int64)
+        self.pnl = np.zeros(shape, dtype=np.float64)
+        self.total = 0             # trades counted
+        self.watermark = None      # time of the newest counted trade
+        self.seen = set()          # trade ids counted at the watermark time
+        self.version = None        # data version of the last update (dashboard)
+        self.history = deque(maxlen=VERSION_HISTORY)  # versions the cube moved past
+        self.lock = threading.RLock()
+
+    def labels(self, dimension):
+        return {
+            'pair': tuple(self.pairs),
+            'direction': DIRECTIONS,
+            'weekday': WEEKDAYS,
+            'hour': HOURS,
+            'adx': bucket_labels(ADX_EDGES),
+            'rsi': bucket_labels(RSI_EDGES),
+        }[dimension]
+
+    # ------------------------------------------------------------------ build
+    def reset(self):
+        fresh = PerfCube()
+        with self.lock:
+            for name in ('pairs', 'trades', 'wins', 'pnl', 'total', 'watermark', 'seen'):
+                setattr(self, name, getattr(fresh, name))
+
+    def _pair_codes(self, pairs):
+        codes, uniques = pd.factorize(pairs)
+        known = {pair: i for i, pair in enumerate(self.pairs)}
+        for pair in uniques:
+            if pair not in known:
+                known[pair] = len(self.pairs)
+                self.pairs.append(pair)
+        grow = len(self.pairs) - self.trades.shape[0]
+        if grow > 0:
+            pad = [(0, grow)] + [(0, 0)] * (self.trades.ndim - 1)
+            self.trades = np.pad(self.trades, pad)
+            self.wins = np.pad(self.wins, pad)
+            self.pnl = np.pad(self.pnl, pad)
+        return np.array([known[pair] for pair in uniques], dtype=np.int64)[codes]
+
+    def _new_rows(self, df):
+        """Mask of the rows after the watermark (not counted yet)"""
+        if self.watermark is None:
+            return np.ones(len(df), dtype=bool)
+        times = df['time']
+        fresh = times > self.watermark
+        if self.seen and 'trade_id' in df.columns:
+            fresh |= (times == self.watermark) & ~df['trade_id'].isin(self.seen)
+        return fresh.to_numpy()
+
+    def add(self, df):
+        """Count trades (canonical schema rows); returns how many were added"""
+        if df is None or df.empty:
+            return 0
+        with self.lock:
+            pairs = df['pair'].astype(str) if 'pair' in df.columns else pd.Series('UNKNOWN', index=df.index)
+            times = df['time']
+            nan = np.full(len(df), np.nan)
+            index = np.ravel_multi_index((
+                self._pair_codes(pairs),
+                (df['direction'].astype(str) == DIRECTIONS[1]).to_numpy().astype(np.int64),
+                times.dt.weekday.to_numpy(),
+                times.dt.hour.to_numpy(),
+                bucket_codes(df['adx'] if 'adx' in df.columns else nan, ADX_EDGES),
+                bucket_codes(df['rsi'] if 'rsi' in df.columns else nan, RSI_EDGES),
+            ), self.trades.shape)
+
+            size = self.trades.size
+            win = (df['result'].astype(str) == 'win').to_numpy()
+            self.trades += np.bincount(index, minlength=size).reshape(self.trades.shape)
+            self.wins += np.bincount(index[win], minlength=size).reshape(self.trades.shape)
+            self.pnl += np.bincount(index, weights=df['profit'].to_numpy(dtype=np.float64),
+                                    minlength=size).reshape(self.trades.shape)
+            self.total += len(df)
+
+            newest = times.max()
+            at_newest = df.loc[times == newest, 'trade_id'] if 'trade_id' in df.columns else []
+            if self.watermark is None or newest > self.watermark:
+                self.watermark, self.seen = newest, set(at_newest)
+            elif newest == self.watermark:
+                self.seen.update(at_newest)
+        return len(df)
+
+    def _stale(self, version):
+        """True if `version` is the current one or one the cube already moved past"""
+        return version is not None and (version == self.version or version in self.history)
+
+    def _set_version(self, version):
+        if self.version is not None and version != self.version:
+            self.history.append(self.version)
+        self.version = version
+
+    def update(self, df, version=None):
+        """
+        Count the trades of `df` not counted yet; returns how many were added
+
+        df must be everything counted so far plus newer trades - otherwise
+        (or for a new cube) the cube is rebuilt from it. version: data
+        version of df - the current version, or one the cube already moved
+        past (a session still on older data), returns at once.
+        """
+        with self.lock:
+            if self._stale(version):
+                return 0
+            if df is None or df.empty:
+                self.reset()
+                self._set_version(version)
+                return 0
+            fresh = self._new_rows(df)
+            if len(df) - int(fresh.sum()) != self.total:
+                self.reset()
+                fresh = np.ones(len(df), dtype=bool)
+            added = self.add(df[fresh])
+            self._set_version(version)
+            return added
+
+    def update_from_store(self, store, version=None):
+        """Add the trade store's trades from the watermark on (the store only grows)"""
+        with self.lock:
+            if self._stale(version):
+                return 0
+            df = store.read(start=self.watermark)
+            added = self.add(df[self._new_rows(df)]) if df is not None and not df.empty else 0
+            if version is not None:
+                self._set_version(version)
+            return added
+
+    # ------------------------------------------------------------------ query
+    def query(self, rows, cols, filters=None):
+        """
+        Trades, wins and P&L of `rows` x `cols` (dimension names)
+
+        filters: {dimension: [labels]} - only those cells are summed
+        Returns (row labels, col labels, trades, wins, pnl) as 2-D arrays.
+        """
+        if rows == cols:
+            raise ValueError("rows and cols must be different dimensions")
+        with self.lock:
+            arrays = [self.trades, self.wins, self.pnl]
+            for dimension, keep in (filters or {}).items():
+                if not keep:
+                    continue
+                labels = self.labels(dimension)
+                positions = [labels.index(label) for label in keep if label in labels]
+                axis = DIMENSIONS.index(dimension)
+                arrays = [np.take(a, positions, axis=axis) for a in arrays]
+            r, c = DIMENSIONS.index(rows), DIMENSIONS.index(cols)
+            other = tuple(axis for axis in range(len(DIMENSIONS)) if axis not in (r, c))
+            summed = [a.sum(axis=other) for a in arrays]
+            if r > c:
+                summed = [a.T for a in summed]
+            row_labels, col_labels = self.labels(rows), self.labels(cols)
+            for dimension, keep in (filters or {}).items():
+                if keep and dimension == rows:
+                    row_labels = tuple(label for label in row_labels if label in keep)
+                if keep and dimension == cols:
+                    col_labels = tuple(label for label in col_labels if label in keep)
+        return (row_labels, col_labels, *summed)
+
+    def table(self, rows, cols, metric='win_rate', filters=None):
+        """One metric of a slice as a DataFrame (win rate in %, NaN where there are no trades)"""
+        row_labels, col_labels, trades, wins, pnl = self.query(rows, cols, filters)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            values = {
+                'win_rate': np.where(trades > 0, wins / trades * 100, np.nan),
+                'trades': trades,
+                'pnl': pnl,
+                'avg_pnl': np.where(trades > 0, pnl / trades, np.nan),
+            }[metric]
+        return pd.DataFrame(values, index=list(row_labels), columns=list(col_labels))
+
+    # ---------------------------------------------------------------- persist
+    def save(self, path=DEFAULT_PATH):
+        """Write the cube atomically"""
+        with self.lock:
+            meta = {
+                'version': CUBE_VERSION,
+                'pairs': self.pairs,
+                'total': self.total,
+                'watermark': self.watermark.isoformat() if self.watermark is not None else None,
+                'seen': sorted(int(trade_id) for trade_id in self.seen),
+            }
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            tmp = path + ".tmp"
+            with open(tmp, 'wb') as f:
+                np.savez(f, meta=np.frombuffer(json.dumps(meta).encode('utf-8'), dtype=np.uint8),
+                         trades=self.trades, wins=self.wins, pnl=self.pnl)
+            os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path=DEFAULT_PATH):
+        """Restore a saved cube (an empty cube if missing, unreadable or from another version)"""
+        cube = cls()
+        if not os.path.exists(path):
+            return cube
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                meta = json.loads(data['meta'].tobytes().decode('utf-8'))
+                if meta.get('version') != CUBE_VERSION:
+                    logger.warning(f"⚠️  Ignoring performance cube version {meta.get('version')}")
+                    return cube
+                cube.trades, cube.wins, cube.pnl = data['trades'], data['wins'], data['pnl']
+            cube.pairs = meta['pairs']
+            cube.total = meta['total']
+            cube.watermark = pd.Timestamp(meta['watermark']) if meta['watermark'] else None
+            cube.seen = set(meta['seen'])
+        except Exception as e:
+            logger.warning(f"⚠️  Failed to load performance cube: {e}")
+            return cls()
+        return cube
+
+
+def main():
+    """Command line entry point"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Update the performance cube from the trade store and print a slice")
+    parser.add_argument("--store", help="trade store spec (default: TRADE_STORE env var, else csv:trades.csv)")
+    parser.add_argument("--cube", default=DEFAULT_PATH)
+    parser.add_argument("--rows", choices=DIMENSIONS, default='hour')
+    parser.add_argument("--cols", choices=DIMENSIONS, default='direction')
+    parser.add_argument("--metric", choices=METRICS, default='win_rate')
+    parser.add_argument("--pair", nargs="+", help="only these pairs")
+    parser.add_argument("--rebuild", action="store_true", help="count every trade again")
+    args = parser.parse_args()
+
+    cube = PerfCube() if args.rebuild else PerfCube.load(args.cube)
+    added = cube.update_from_store(open_trade_store(args.store))
+    cube.save(args.cube)
+    print(f"{added} new trades, {cube.total} in the cube ({len(cube.pairs)} pairs)")
+
+    table = cube.table(args.rows, args.cols, args.metric, {'pair': args.pair})
+    with pd.option_context('display.max_rows', None, 'display.max_columns', None, 'display.width', 200):
+        print(table.round(1))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,375 @@
+"""
+Recorder - deterministic record / replay of the bot's external inputs
+
+A recorded run (BOT_RECORD=<path>) writes every input the bot reads from
+outside into a compact binary event log:
+
+    clock     time.time() / datetime.utcnow() readings, and observations:
+              outcomes of thread timing the bot acts on (which orders are
+              still open at a candle close)
+    broker    every IQ_Option call (candles, order acks, settlement
+              results, balance, ...) with its arguments and result or error
+    store     trade store reads (the risk counters are rebuilt from them)
+    trade     the trade records the run produced (the expected output)
+
+plus a header with the config, the shadow variants and the warm-state
+snapshot the run started from.
+
+Replay feeds the log back through TradeBotV14 with the broker, clock and
+store replaced and sleeps skipped, so a whole run takes seconds. Inputs
+are matched per thread and per call (endpoint + arguments), so concurrent
+order threads replay deterministically too; a call the log cannot answer
+raises ReplayDivergence. The background balance reconcile is not replayed.
+
+File format (gzip):
+    MAGIC, then records of  <kind u8><thread u16><length u32><payload>
+    kind THREAD defines a thread name id, TIME/UTCNOW carry a float64,
+    the other kinds a JSON payload.
+"""
+
+import io
+import os
+import gzip
+import json
+import time
+import base64
+import struct
+import logging
+import threading
+from collections import defaultdict, deque
+from datetime import datetime
+
+import pandas as pd
+
+from trade_schema import TIME_FORMAT
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"BOTREC1\n"
+RECORD = struct.Struct("<BHI")
+FLOAT = struct.Struct("<d")
+
+HEADER, THREAD, TIME, UTCNOW, CALL, ERROR, STORE_READ, TRADE, OBSERVED = range(9)
+
+# broker methods that are configuration, not input
+PASSTHROUGH = {'set_max_reconnect', 'reset_practice_balance'}
+
+
+class ReplayDivergence(Exception):
+    """The replayed run asked for an input the recorded run never read"""
+
+
+def diverge(divergences, message):
+    """Remember a divergence (the bot may catch the exception) and raise it"""
+    divergences.append(message)
+    raise ReplayDivergence(message)
+
+
+def call_key(name, args, kwargs):
+    return json.dumps([name, list(args), kwargs], default=str, sort_keys=True)
+
+
+# ---------------------------------------------------------------------- log
+class EventLog:
+    """Thread-safe writer of the binary event log"""
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.file = gzip.open(path, 'wb', compresslevel=6)
+        self.file.write(MAGIC)
+        self.threads = {}
+        self.lock = threading.Lock()
+        self.count = 0
+
+    def _thread(self):
+        name = threading.current_thread().name
+        if name not in self.threads:
+            self.threads[name] = len(self.threads)
+            raw = name.encode('utf-8')
+            self.file.write(RECORD.pack(THREAD, self.threads[name], len(raw)) + raw)
+        return self.threads[name]
+
+    def write(self, kind, payload):
+        raw = FLOAT.pack(payload) if kind in (TIME, UTCNOW) else json.dumps(payload, default=str).encode('utf-8')
+        with self.lock:
+            self.file.write(RECORD.pack(kind, self._thread(), len(raw)) + raw)
+            self.count += 1
+
+    def close(self):
+        with self.lock:
+            self.file.close()
+
+
+def read_events(path):
+    """Yield (kind, thread name, payload) from an event log"""
+    with gzip.open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a bot recording")
+        threads = {}
+        while True:
+            head = f.read(RECORD.size)
+            if not head:
+                return
+            kind, thread, length = RECORD.unpack(head)
+            raw = f.read(length)
+            if kind == THREAD:
+                threads[thread] = raw.decode('utf-8')
+            elif kind in (TIME, UTCNOW):
+                yield kind, threads[thread], FLOAT.unpack(raw)[0]
+            else:
+                yield kind, threads[thread], json.loads(raw)
+
+
+# -------------------------------------------------------------------- clock
+class Clock:
+    """Wall clock used by the bot (replaced when recording / replaying)"""
+
+    def time(self):
+        return time.time()
+
+    def utcnow(self):
+        return datetime.utcnow()
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+    def observe(self, name, value):
+        """A value that depends on thread timing (JSON-able; recorded / replayed like a reading)"""
+        return value
+
+
+class RecordingClock(Clock):
+    def __init__(self, log):
+        self.log = log
+
+    def time(self):
+        now = time.time()
+        self.log.write(TIME, now)
+        return now
+
+    def utcnow(self):
+        now = time.time()
+        self.log.write(UTCNOW, now)
+        return datetime.utcfromtimestamp(now)
+
+    def observe(self, name, value):
+        self.log.write(OBSERVED, {'name': name, 'value': value})
+        return value
+
+
+class ReplayClock(Clock):
+    """Recorded readings per thread; sleeping is free"""
+
+    def __init__(self, readings):
+        self.readings = readings  # (kind, thread) -> deque of floats (observations: dicts)
+        self.lock = threading.Lock()
+        self.divergences = []
+
+    def _next(self, kind):
+        thread = threading.current_thread().name
+        with self.lock:
+            queue = self.readings.get((kind, thread))
+            if not queue:
+                diverge(self.divergences, f"{thread}: no recorded clock reading left")
+            return queue.popleft()
+
+    def time(self):
+        return self._next(TIME)
+
+    def utcnow(self):
+        return datetime.utcfromtimestamp(self._next(UTCNOW))
+
+    def sleep(self, seconds):
+        pass
+
+    def observe(self, name, value):
+        observed = self._next(OBSERVED)
+        if observed['name'] != name:
+            diverge(self.divergences, f"{threading.current_thread().name}: observed {observed['name']}, "
+                                      f"replay asked for {name}")
+        return observed['value']
+
+
+# ------------------------------------------------------------------- broker
+class RecordingBroker:
+    """Pass-through IQ_Option wrapper that logs every call and its outcome"""
+
+    def __init__(self, api, log):
+        self._api = api
+        self._log = log
+
+    def __getattr__(self, name):
+        attr = getattr(self._api, name)
+        if not callable(attr) or name in PASSTHROUGH:
+            return attr
+
+        def call(*args, **kwargs):
+            key = call_key(name, args, kwargs)
+            try:
+                result = attr(*args, **kwargs)
+            except Exception as e:
+                self._log.write(ERROR, {'key': key, 'error': f"{type(e).__name__}: {e}"})
+                raise
+            self._log.write(CALL, {'key': key, 'result': result})
+            return result
+        return call
+
+
+class ReplayBroker:
+    """Answers broker calls from the log: FIFO per (thread, endpoint + arguments)"""
+
+    def __init__(self, responses):
+        self.responses = responses  # (thread, key) -> deque of (kind, value)
+        self.lock = threading.Lock()
+        self.divergences = []
+
+    def __getattr__(self, name):
+        if name in PASSTHROUGH:
+            return lambda *args, **kwargs: None
+
+        def call(*args, **kwargs):
+            thread = threading.current_thread().name
+            key = call_key(name, args, kwargs)
+            with self.lock:
+                queue = self.responses.get((thread, key))
+                if not queue:
+                    diverge(self.divergences, f"{thread}: unrecorded call {key}")
+                kind, value = queue.popleft()
+            if kind == ERROR:
+                raise RuntimeError(value)
+            return value
+        return call
+
+
+# -------------------------------------------------------------------- store
+class RecordingStore:
+    """Trade store wrapper that logs reads and produced trades"""
+
+    def __init__(self, store, log):
+        self._store = store
+        self._log = log
+
+    def __getattr__(self, name):
+        return getattr(self._store, name)
+
+    def read(self, start=None):
+        df = self._store.read(start=start)
+        self._log.write(STORE_READ, frame_to_text(df))
+        return df
+
+    def append(self, trades):
+        self._store.append(trades)
+        for trade in trades:
+            self._log.write(TRADE, trade)
+
+
+class ReplayStore:
+    """Recorded reads, trades collected in memory"""
+
+    def __init__(self, reads):
+        self.reads = deque(reads)
+        self.trades = []
+        self.divergences = []
+
+    def read(self, start=None):
+        if not self.reads:
+            diverge(self.divergences, "unrecorded trade store read")
+        return text_to_frame(self.reads.popleft())
+
+    def append(self, trades):
+        self.trades.extend(trades)
+
+
+def frame_to_text(df):
+    if df is None or df.empty:
+        return ""
+    if 'time' in df.columns:
+        df = df.assign(time=df['time'].dt.strftime(TIME_FORMAT))
+    return df.to_csv(index=False)
+
+
+def text_to_frame(text):
+    from trade_schema import read_trades
+    return read_trades(io.StringIO(text)) if text else pd.DataFrame()
+
+
+# ------------------------------------------------------------------ session
+def start_recording(path, config_path, state_path, variants_path=None):
+    """Open an event log and write the header (config, shadow variants, warm state, IQ_MODE)"""
+    log = EventLog(path)
+    with open(config_path) as f:
+        config = json.load(f)
+    header = {'recorded_at': time.time(), 'mode': os.getenv("IQ_MODE", "PRACTICE"),
+              'config': config, 'variants': None, 'state': None}
+    if variants_path and os.path.exists(variants_path):
+        with open(variants_path) as f:
+            header['variants'] = json.load(f)
+    if os.path.exists(state_path):
+        with open(state_path, 'rb') as f:
+            header['state'] = base64.b64encode(f.read()).decode('ascii')
+    log.write(HEADER, header)
+    logger.info(f"⏺️  Recording inputs to {path}")
+    return log
+
+
+def load_recording(path):
+    """Parse a recording into (header, clock readings, broker responses, store reads, trades)"""
+    header = None
+    readings = defaultdict(deque)
+    responses = defaultdict(deque)
+    reads, trades = [], []
+    for kind, thread, payload in read_events(path):
+        if kind == HEADER:
+            header = payload
+        elif kind in (TIME, UTCNOW, OBSERVED):
+            readings[(kind, thread)].append(payload)
+        elif kind == CALL:
+            responses[(thread, payload['key'])].append((CALL, payload['result']))
+        elif kind == ERROR:
+            responses[(thread, payload['key'])].append((ERROR, payload['error']))
+        elif kind == STORE_READ:
+            reads.append(payload)
+        elif kind == TRADE:
+            trades.append(payload)
+    if header is None:
+        raise ValueError(f"{path} has no header")
+    return header, readings, responses, reads, trades
+
+
+def write_workspace(header, root, config_path, variants_path, state_path):
+    """Recreate the files the recorded run started from under `root`"""
+    for rel, content in ((config_path, header['config']), (variants_path, header['variants'])):
+        if content is not None:
+            path = os.path.join(root, rel)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w') as f:
+                json.dump(content, f)
+    if header['state']:
+        path = os.path.join(root, state_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(base64.b64decode(header['state']))
+
+
+COMPARED_FIELDS = ('trade_id', 'time', 'pair', 'direction', 'result', 'profit', 'entry_price')
+
+
+def compare_trades(recorded, replayed):
+    """
+    Differences between recorded and replayed trade records (empty list = identical)
+
+    Orders of one candle settle concurrently, so records are matched by
+    trade id rather than by the order they were written in.
+    """
+    def by_id(trades):
+        return sorted(trades, key=lambda t: (str(t.get('trade_id')), str(t.get('pair'))))
+
+    differences = []
+    if len(recorded) != len(replayed):
+        differences.append(f"trade count: recorded {len(recorded)}, replayed {len(replayed)}")
+    for a, b in zip(by_id(recorded), by_id(replayed)):
+        for field in COMPARED_FIELDS:
+            if str(a.get(field)) != str(b.get(field)):
+                differences.append(f"trade {a.get('trade_id')} {field}: recorded {a.get(field)}, replayed {b.get(field)}")
+    return differences
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Result Cache - consolidated, pre-typed cache of backtest result CSVs
+
+Cache files (per glob pattern):
+    .cache/results_<slug>.parquet        all rows, typed, with a 'source' column
+    .cache/results_<slug>.manifest.json  {"schema": N, "layout": N, "files": {path: [size, mtime_ns]}}
+
+A load only stats the matching files. Files whose (size, mtime_ns) match
+the manifest are served from the parquet file; new or changed files are
+parsed and merged in, and rows of removed files are dropped. A file that
+fails to parse is left out of the manifest, so the next load retries it.
+
+Backtest files carry no trade ids: a row's id is derived from its file
+path (crc32) and row number, so it stays the same when other files are
+added, changed or removed.
+
+Usage:
+  python result_cache.py                        # refresh cache for test_results/v1.4_*.csv
+  python result_cache.py "test_results/v*.csv"  # any glob (recursive ** supported)
+"""
+
+import os
+import re
+import sys
+import glob
+import json
+import zlib
+import logging
+import numpy as np
+import pandas as pd
+
+from trade_schema import CSV_DTYPES, SCHEMA_VERSION, normalize_trades
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PATTERN = "test_results/v1.4_*.csv"
+DEFAULT_CACHE_DIR = ".cache"
+CACHE_LAYOUT = 2  # bumped when the cached columns change (2: per-file trade ids)
+
+
+def file_trade_ids(path, rows):
+    """Stable ids of a file's rows: crc32 of the path in the high 31 bits, row number below"""
+    base = (zlib.crc32(path.replace(os.sep, '/').encode('utf-8')) & 0x7FFFFFFF) << 32
+    return base + np.arange(rows, dtype=np.int64)
+
+
+class ResultCache:
+    """Incremental parquet cache over a glob of result CSV files"""
+
+    def __init__(self, pattern=DEFAULT_PATTERN, cache_dir=DEFAULT_CACHE_DIR):
+        self.pattern = pattern
+        slug = re.sub(r'[^A-Za-z0-9]+', '_', pattern).strip('_')
+        self.data_path = os.path.join(cache_dir, f"results_{slug}.parquet")
+        self.manifest_path = os.path.join(cache_dir, f"results_{slug}.manifest.json")
+
+    def scan(self):
+        """Return {path: [size, mtime_ns]} for every file matching the pattern"""
+        files = {}
+        for path in glob.iglob(self.pattern, recursive=True):
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            files[path] = [st.st_size, st.st_mtime_ns]
+        return files
+
+    def signature(self):
+        """Hashable fingerprint of the inputs (cheap: stat calls only)"""
+        return tuple(sorted((path, size, mtime) for path, (size, mtime) in self.scan().items()))
+
+    def load(self):
+        """Return all rows, re-parsing only files that are new or changed since the last load"""
+        current = self.scan()
+        manifest, cached = self._read_cache()
+
+        unchanged = {p for p, stamp in current.items() if manifest.get(p) == stamp}
+        changed = [p for p in sorted(current) if p not in unchanged]
+        dropped = set(manifest) - unchanged
+
+        if not changed and not dropped and cached is not None:
+            return cached
+
+        frames, failed = [], set()
+        if cached is not None and unchanged:
+            frames.append(cached[cached['source'].isin(unchanged)])
+        for path in changed:
+            df = self._read_csv(path)
+            if df is None:
+                failed.add(path)
+            elif not df.empty:
+                frames.append(df)
+
+        if frames:
+            df = pd.concat(frames, ignore_index=True)
+            df['source'] = df['source'].astype('category')
+            df['pair'] = df['pair'].astype('category')
+        else:
+            df = pd.DataFrame()
+
+        logger.info(f"Result cache: {len(unchanged)} cached, {len(changed) - len(failed)} parsed, "
+                    f"{len(failed)} failed, {len(dropped - set(current))} removed")
+        self._write_cache({p: stamp for p, stamp in current.items() if p not in failed}, df)
+        return df
+
+    def _read_csv(self, path):
+        """Parse one result CSV into the cached (typed) layout (None if it fails to parse)"""
+        try:
+            df = pd.read_csv(path, dtype=CSV_DTYPES)
+            if df.empty:
+                return df
+
+            # ดึงชื่อคู่เงินจากชื่อไฟล์ (เช่น v1.4_EURUSD_1m_30d.csv -> EURUSD) ถ้าไม่มีคอลัมน์ pair
+            if 'pair' not in df.columns:
+                filename = os.path.basename(path)
+                df['pair'] = re.sub(r'^v[\d.]+_', '', filename).replace("_1m_30d.csv", "")
+
+            df = normalize_trades(df, assign_ids=False)
+        except Exception as e:
+            logger.warning(f"Skipping {path}: {e}")
+            return None
+
+        if 'trade_id' not in df.columns:
+            df['trade_id'] = file_trade_ids(path, len(df))
+        df['source'] = path
+        return df
+
+    def _read_cache(self):
+        try:
+            with open(self.manifest_path) as f:
+                manifest = json.load(f)
+            if manifest.get('schema') != SCHEMA_VERSION or manifest.get('layout') != CACHE_LAYOUT:
+                return {}, None
+            return manifest['files'], pd.read_parquet(self.data_path)
+        except Exception:
+            return {}, None
+
+    def _write_cache(self, manifest, df):
+        try:
+            os.makedirs(os.path.dirname(self.data_path), exist_ok=True)
+            tmp = self.data_path + ".tmp"
+            df.to_parquet(tmp, index=False)
+            os.replace(tmp, self.data_path)
+            # manifest last: a crash in between only costs a re-parse
+            with open(self.manifest_path + ".tmp", 'w') as f:
+                json.dump({'schema': SCHEMA_VERSION, 'layout': CACHE_LAYOUT, 'files': manifest}, f)
+            os.replace(self.manifest_path + ".tmp", self.manifest_path)
+        except Exception as e:
+            logger.warning(f"Failed to write result cache: {e}")
+
+
+def main():
+    """Command line entry point"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    pattern = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_PATTERN
+    df = ResultCache(pattern).load()
+    print(f"{len(df)} rows from {df['source'].nunique() if not df.empty else 0} files")
+
+
+if __name__ == "__main__":
+    main()
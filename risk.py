@@ -0,0 +1,216 @@
+"""
+Risk Engine - daily risk limits enforced with O(1) running counters
+
+Counters (per UTC day, overall and per pair):
+    trades              orders opened today
+    pnl                 realized profit/loss today
+    consecutive_losses  losses in a row (reset by a win; a tie leaves it as is)
+
+Limits (config.json "risk"):
+    max_trades_per_day  overall trades today
+    daily_loss_limit    overall realized loss today, in dollars
+    stop_loss           consecutive losses - overall, and per pair (that pair
+                        is paused for the rest of the day)
+
+check() only compares a few numbers, so it runs right before every buy.
+reserve_batch() checks and reserves a whole batch of orders under one lock:
+each reserved order counts as a trade at once and its stake as open
+exposure (worst-case loss) until its result is recorded.
+Counters roll over on the first call of a new UTC day (calls dated on an
+earlier day, like a trade recovered from yesterday's run, are ignored),
+are saved to .state/risk.json after every change and rebuilt from the
+trade store when the bot starts.
+"""
+
+import os
+import json
+import logging
+import threading
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PATH = ".state/risk.json"
+
+
+def utc_day(now=None):
+    return (now or datetime.utcnow()).strftime("%Y-%m-%d")
+
+
+class Counters:
+    """Running totals for one scope (all pairs or a single pair)"""
+
+    __slots__ = ('trades', 'pnl', 'consecutive_losses')
+
+    def __init__(self, trades=0, pnl=0.0, consecutive_losses=0):
+        self.trades = trades
+        self.pnl = pnl
+        self.consecutive_losses = consecutive_losses
+
+    def add_result(self, profit):
+        self.pnl += profit
+        if profit < 0:
+            self.consecutive_losses += 1
+        elif profit > 0:
+            self.consecutive_losses = 0
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class RiskEngine:
+    """Daily limits checked against running counters"""
+
+    def __init__(self, limits, path=DEFAULT_PATH):
+        self.max_trades = limits.get('max_trades_per_day')
+        self.daily_loss_limit = limits.get('daily_loss_limit')
+        self.stop_loss = limits.get('stop_loss')
+        self.path = path
+        self.lock = threading.RLock()
+        self.exposure = 0.0  # stakes of open (reserved, unsettled) orders
+        self.reset(utc_day())
+
+    def reset(self, day):
+        self.day = day
+        self.total = Counters()
+        self.pairs = {}
+
+    def _roll(self, now=None):
+        """Move to the day of `now` if it is newer; False when `now` is on an earlier day"""
+        day = utc_day(now)
+        if day < self.day:
+            return False
+        if day != self.day:
+            logger.info(f"📅 New UTC day {day} - risk counters reset")
+            self.reset(day)
+        return True
+
+    def _pair(self, pair):
+        if pair not in self.pairs:
+            self.pairs[pair] = Counters()
+        return self.pairs[pair]
+
+    # ----------------------------------------------------------------- checks
+    def halted(self, now=None):
+        """Reason the whole account is stopped for the day (None if trading is allowed)"""
+        self._roll(now)
+        total = self.total
+        if self.max_trades is not None and total.trades >= self.max_trades:
+            return f"max trades per day reached ({total.trades}/{self.max_trades})"
+        if self.daily_loss_limit is not None and total.pnl <= -self.daily_loss_limit:
+            return f"daily loss limit reached (${total.pnl:.2f} / -${self.daily_loss_limit})"
+        if self.stop_loss is not None and total.consecutive_losses >= self.stop_loss:
+            return f"stop loss: {total.consecutive_losses} losses in a row"
+        return None
+
+    def check(self, pair, amount=0, now=None):
+        """Reason an order of `amount` on `pair` is not allowed right now (None if allowed)"""
+        reason = self.halted(now)
+        if reason:
+            return reason
+        counters = self.pairs.get(pair)
+        if counters and self.stop_loss is not None and counters.consecutive_losses >= self.stop_loss:
+            return f"stop loss on {pair}: {counters.consecutive_losses} losses in a row"
+        if amount and self.daily_loss_limit is not None:
+            worst = self.total.pnl - self.exposure - amount
+            if worst < -self.daily_loss_limit:
+                return f"order could breach the daily loss limit (worst case ${worst:.2f})"
+        return None
+
+    def reserve_batch(self, orders, balance, now=None):
+        """
+        Check and reserve a batch of (pair, amount) orders atomically
+
+        balance: available cash - orders that no longer fit are rejected too
+        Returns one reason per order (None = reserved).
+        """
+        reasons = []
+        with self.lock:
+            available = balance
+            for pair, amount in orders:
+                reason = self.check(pair, amount, now)
+                if reason is None and available < amount:
+                    reason = f"insufficient balance (${available:.2f})"
+                if reason is None:
+                    self.record_open(pair, amount, now)
+                    available -= amount
+                reasons.append(reason)
+        return reasons
+
+    def release(self, pair, amount):
+        """Undo a reservation whose order was not placed"""
+        with self.lock:
+            self.total.trades -= 1
+            self._pair(pair).trades -= 1
+            self.exposure -= amount
+            self.save()
+
+    # ---------------------------------------------------------------- updates
+    def record_open(self, pair, amount=0, now=None):
+        with self.lock:
+            if not self._roll(now):
+                return  # a trade of an earlier day (recovered late) is not in today's budget
+            self.total.trades += 1
+            self._pair(pair).trades += 1
+            self.exposure += amount
+            self.save()
+
+    def record_result(self, pair, profit, amount=0, now=None):
+        with self.lock:
+            if not self._roll(now):
+                return
+            self.total.add_result(profit)
+            self._pair(pair).add_result(profit)
+            self.exposure = max(0.0, self.exposure - amount)
+            self.save()
+
+    def rebuild(self, trades, now=None):
+        """Recompute today's counters from a trades DataFrame (canonical schema)"""
+        self.reset(utc_day(now))
+        if trades is None or trades.empty:
+            return
+        today = trades[trades['time'].dt.strftime("%Y-%m-%d") == self.day].sort_values('time', kind='stable')
+        for pair, profit in zip(today['pair'].astype(str), today['profit'].astype(float)):
+            for counters in (self.total, self._pair(pair)):
+                counters.trades += 1
+                counters.add_result(profit)
+
+    # ------------------------------------------------------------ persistence
+    def save(self):
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path + ".tmp", 'w') as f:
+                json.dump({
+                    'day': self.day,
+                    'total': self.total.to_dict(),
+                    'pairs': {pair: c.to_dict() for pair, c in self.pairs.items()},
+                }, f)
+            os.replace(self.path + ".tmp", self.path)
+        except Exception as e:
+            logger.warning(f"⚠️  Failed to save risk counters: {e}")
+
+    def load(self, now=None):
+        """Restore saved counters if they are from today (returns True if restored)"""
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return False
+        if data.get('day') != utc_day(now):
+            return False
+        self.reset(data['day'])
+        self.total = Counters(**data['total'])
+        self.pairs = {pair: Counters(**c) for pair, c in data.get('pairs', {}).items()}
+        return True
+
+    def start(self, store, now=None):
+        """Startup: rebuild today's counters from the trade store, else use the saved ones"""
+        try:
+            self.rebuild(store.read(start=utc_day(now)), now)
+            source = type(store).__name__
+        except Exception as e:
+            logger.warning(f"⚠️  Could not rebuild risk counters from the trade store: {e}")
+            source = "saved state" if self.load(now) else "empty"
+        self.save()
+        logger.info(f"🛡️  Risk counters ({source}): {self.total.trades} trades, "
+                    f"P&L ${self.total.pnl:.2f}, {self.total.consecutive_losses} losses in a row")
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Shadow Runner - config variants evaluated on the live candle stream, no orders
+
+Variants (versions/v1.4/shadow.json):
+    {
+      "variants": {
+        "adx12": {"*": {"indicators": {"adx_min": 12}}},
+        "ema30": {"EURUSD": {"indicators": {"ema_period": 30}}}
+      }
+    }
+
+Each variant is the live per-pair config with its overrides deep-merged on
+top ("*" = every pair). The live config itself always runs as variant
+"live", so every variant is compared against a baseline settled the same way.
+
+Variants see the windows the live loop loaded (enabled pairs inside their
+live trading hours) and read the same IndicatorBatch: a series is computed
+once per parameter set and shared by the live config and every variant,
+so a variant only adds a few comparisons per pair.
+
+A hypothetical trade enters at the close of the signal candle and settles
+on the close of the next candle (1-minute expiry) once that candle is
+complete. Settled trades are appended to shadow_trades.csv (canonical trade
+schema + variant column); open ones are carried between runs in the bot
+state. Without a variants file shadow mode is off.
+
+Usage:
+  python shadow.py                       # per-variant summary of shadow_trades.csv
+  python shadow.py --since 2026-10-01
+"""
+
+import os
+import copy
+import json
+import argparse
+import logging
+import numpy as np
+import pandas as pd
+
+from trade_schema import TRADE_COLUMNS, format_trade, read_trades
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_VARIANTS = "versions/v1.4/shadow.json"
+DEFAULT_RESULTS = "shadow_trades.csv"
+LIVE = "live"
+RESULT_COLUMNS = TRADE_COLUMNS + ['variant']
+EXPIRY = 60  # seconds - 1-minute options like the live bot
+ID_SCALE = 1_000_000  # trade_id = settle time (epoch s) x ID_SCALE + counter
+
+
+def merge(base, override):
+    """Deep-merge `override` into a copy of `base`"""
+    merged = copy.deepcopy(base)
+    for key, value in override.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = merge(merged[key], value)
+        else:
+            merged[key] = copy.deepcopy(value)
+    return merged
+
+
+class ShadowRunner:
+    """Hypothetical trades of config variants (including the live config)"""
+
+    def __init__(self, variants, config, pending=None, path=DEFAULT_RESULTS, payout=None):
+        self.path = path
+        self.amount = config['amount']
+        self.payout = payout if payout is not None else config.get('payout', 0.8)
+        self.pending = pending if pending is not None else []
+        self._last_id = 0
+
+        live = {}
+        for pair, cfg in config['currencies'].items():
+            cfg = copy.deepcopy(cfg)
+            cfg['indicators'] = {**config['default_indicators'], **cfg.get('indicators', {})}
+            live[pair] = cfg
+
+        # variant -> pair -> merged pair config
+        self.configs = {LIVE: live}
+        for name, overrides in variants.items():
+            self.configs[name] = {
+                pair: merge(merge(cfg, overrides.get('*', {})), overrides.get(pair, {}))
+                for pair, cfg in live.items()
+            }
+
+    @classmethod
+    def load(cls, config, pending=None, path=DEFAULT_VARIANTS):
+        """Runner for the variants file, or None when there is none (shadow mode off)"""
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            spec = json.load(f)
+        if not spec.get('variants'):
+            return None
+        return cls(spec['variants'], config, pending,
+                   spec.get('results', DEFAULT_RESULTS), spec.get('payout'))
+
+    def evaluate(self, bot, batches, now, timeframes=None):
+        """
+        Open a hypothetical trade for every variant that signals on this candle
+
+        bot: supplies the live rules (is_pair_open, check_session_filter,
+        read_row, decide, confirm) so variants are judged exactly like live
+        trades. timeframes: the higher-timeframe batches of this candle.
+        Returns the number of trades opened.
+        """
+        rows = {}
+        opened = 0
+        for name, pairs in self.configs.items():
+            for pair, batch in batches.items():
+                cfg = pairs.get(pair)
+                if cfg is None or not bot.is_pair_open(cfg, now):
+                    continue
+                ind = cfg['indicators']
+                key = (pair, ind.get('ema_period', 20), ind.get('rsi_period', 14))
+                if key not in rows:
+                    rows[key] = bot.read_row(batch, pair, ind)
+                latest = rows[key]
+
+                direction = bot.decide(latest, ind, bot.check_session_filter(cfg, now))
+                if not direction or bot.confirm(pair, direction, cfg, timeframes or {}):
+                    continue
+                self.pending.append({
+                    'variant': name,
+                    'pair': pair,
+                    'direction': direction,
+                    'entry_time': int(latest['time'].timestamp()),
+                    'entry_price': latest['close'],
+                    'adx': latest['adx'],
+                    'macd': latest['macd'],
+                    'rsi': latest['rsi'],
+                })
+                opened += 1
+        return opened
+
+    def settle(self, candles):
+        """
+        Settle open trades whose expiry candle is complete in the candle buffers
+
+        Trades whose expiry candle is no longer (or never was) in the buffer
+        are dropped. Returns the settled trade records (also appended to the
+        results file).
+        """
+        completed = {}
+        settled, still_open, dropped = [], [], 0
+        for trade in self.pending:
+            pair = trade['pair']
+            if pair not in completed:
+                df = candles.get(pair)
+                if df is None or len(df) < 2:
+                    completed[pair] = None
+                else:
+                    done = df.iloc[:-1]  # last row is the forming candle
+                    times = ((done['time'] - pd.Timestamp(0)) // pd.Timedelta(seconds=1)).to_numpy(dtype=np.int64)
+                    completed[pair] = (times, done['close'].to_numpy(dtype=np.float64))
+            if completed[pair] is None:
+                still_open.append(trade)
+                continue
+
+            times, closes = completed[pair]
+            expiry = trade['entry_time'] + EXPIRY  # start of the candle after the signal candle
+            pos = int(np.searchsorted(times, expiry))
+            if pos < len(times) and times[pos] == expiry:
+                settled.append(self._record(trade, closes[pos], expiry + 60))
+            elif pos < len(times):
+                dropped += 1  # candle missing from / already out of the buffer
+            else:
+                still_open.append(trade)
+
+        self.pending[:] = still_open
+        if dropped:
+            logger.warning(f"⚠️  Shadow: dropped {dropped} trade(s) whose expiry candle is not in the buffer")
+        if settled:
+            append_results(self.path, settled)
+        return settled
+
+    def _record(self, trade, close, settled_at):
+        move = close - trade['entry_price'] if trade['direction'] == 'call' else trade['entry_price'] - close
+        if move > 0:
+            outcome, profit = "win", self.amount * self.payout
+        elif move < 0:
+            outcome, profit = "loss", -self.amount
+        else:
+            outcome, profit = "tie", 0.0
+
+        # candle time plus a counter: the same candles give the same ids (replay, simulated clock)
+        self._last_id = max(self._last_id + 1, int(settled_at) * ID_SCALE)
+        return {
+            'trade_id': self._last_id,
+            'time': pd.Timestamp(settled_at, unit='s'),
+            'pair': trade['pair'],
+            'direction': trade['direction'],
+            'result': outcome,
+            'profit': profit,
+            'entry_price': trade['entry_price'],
+            'adx': trade['adx'],
+            'macd': trade['macd'],
+            'rsi': trade['rsi'],
+            'variant': trade['variant'],
+        }
+
+
+def append_results(path, trades):
+    """Append shadow trade records (canonical columns + variant) to a CSV"""
+    rows = pd.DataFrame([{**format_trade(t), 'variant': t['variant']} for t in trades], columns=RESULT_COLUMNS)
+    new = not os.path.exists(path) or os.path.getsize(path) == 0
+    rows.to_csv(path, mode='w' if new else 'a', header=new, index=False)
+
+
+def read_results(path=DEFAULT_RESULTS, since=None):
+    """Shadow trades in the canonical schema (plus variant), optionally from a date on"""
+    df = read_trades(path)
+    if since is not None and not df.empty:
+        df = df[df['time'] >= pd.Timestamp(since)].reset_index(drop=True)
+    return df
+
+
+def summarize(df):
+    """One row per variant: trades, wins, losses, win rate, profit - best profit first"""
+    if df.empty:
+        return pd.DataFrame(columns=['variant', 'trades', 'wins', 'losses', 'win_rate', 'profit', 'avg_profit'])
+    grouped = df.assign(win=df['result'] == 'win', loss=df['result'] == 'loss').groupby('variant', observed=True)
+    summary = grouped.agg(trades=('profit', 'size'), wins=('win', 'sum'), losses=('loss', 'sum'),
+                          profit=('profit', 'sum'), avg_profit=('profit', 'mean')).reset_index()
+    decided = (summary['wins'] + summary['losses']).replace(0, np.nan)
+    summary.insert(4, 'win_rate', (summary['wins'] / decided * 100).fillna(0).round(1))
+    summary['profit'] = summary['profit'].astype(float).round(2)
+    summary['avg_profit'] = summary['avg_profit'].astype(float).round(3)
+    return summary.sort_values('profit', ascending=False, kind='stable').reset_index(drop=True)
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Shadow variant results")
+    parser.add_argument("--results", default=DEFAULT_RESULTS, help="shadow trades CSV")
+    parser.add_argument("--since", help="first date (inclusive)")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.results):
+        print(f"No shadow results at {args.results}")
+        return
+    print(summarize(read_results(args.results, args.since)).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
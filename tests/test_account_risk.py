@@ -0,0 +1,36 @@
+"""Account cash of the coordinator: only stakes it debited are credited back"""
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from coordinator import AccountRisk  # noqa: E402
+from risk import RiskEngine  # noqa: E402
+
+
+def account(tmp_path):
+    engine = RiskEngine({}, path=str(tmp_path / "risk.json"))
+    return AccountRisk(engine, {'balance': None})
+
+
+def test_recovered_trade_leaves_cash_alone(tmp_path):
+    risk = account(tmp_path)
+    assert risk.reserve_batch([('EURUSD', 10.0)], 100.0) == [None]
+
+    risk.record_open('GBPUSD', 10.0)
+    risk.record_result('GBPUSD', 8.0, 10.0)
+    assert risk.cash['balance'] == 90.0
+
+    risk.record_result('EURUSD', 8.0, 10.0)
+    assert risk.cash['balance'] == 108.0
+
+
+def test_release_credits_the_stake_once(tmp_path):
+    risk = account(tmp_path)
+    risk.reserve_batch([('EURUSD', 10.0), ('GBPUSD', 10.0)], 100.0)
+
+    risk.release('EURUSD', 10.0)
+    risk.release('EURUSD', 10.0)
+    assert risk.cash['balance'] == 90.0
@@ -0,0 +1,32 @@
+"""API client stats: counters of calls from many threads add up"""
+
+import os
+import sys
+import threading
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from api_client import ApiClient  # noqa: E402
+
+
+class Api:
+    def __init__(self):
+        self.calls = 0
+
+    def get_candles(self, *args):
+        self.calls += 1
+        return None if self.calls % 2 else []  # every other call is empty and retried
+
+
+def test_stats_count_every_call_across_threads():
+    client = ApiClient(Api(), {'rate_limits': {'get_candles': [1e9, 1e9]}, 'retry_backoff': 0})
+    threads = [threading.Thread(target=lambda: [client.get_candles() for _ in range(200)]) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = client.summary()['get_candles']
+    assert stats['calls'] == 1600 + stats['retries']
+    assert stats['errors'] == stats['retries']
@@ -0,0 +1,80 @@
+"""Record a bot run on the simulated broker, then replay it"""
+
+import os
+import sys
+import json
+import threading
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip("iqoptionapi")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import loadtest  # noqa: E402
+from recorder import OBSERVED, TIME, UTCNOW, RecordingClock, read_events, start_recording  # noqa: E402
+
+
+class LockstepClock(RecordingClock):
+    """
+    Recording clock on simulated time: the main loop's sleeps advance it,
+    an order thread sleeps until it passes the thread's wake-up time - so an
+    order placed at one close is still open at the next, like a live run
+    """
+
+    def __init__(self, log, start):
+        super().__init__(log)
+        self.now = start
+        self.cond = threading.Condition()
+
+    def time(self):
+        with self.cond:
+            self.log.write(TIME, self.now)
+            return self.now
+
+    def utcnow(self):
+        with self.cond:
+            self.log.write(UTCNOW, self.now)
+            return datetime.utcfromtimestamp(self.now)
+
+    def sleep(self, seconds):
+        with self.cond:
+            if threading.current_thread() is threading.main_thread():
+                self.now += seconds
+                self.cond.notify_all()
+            else:
+                wake = self.now + seconds
+                # the main thread stops advancing at the end of the run
+                self.cond.wait_for(lambda: self.now >= wake, timeout=1)
+
+
+@pytest.fixture
+def bot_module(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    module = loadtest.load_bot()
+    # every open pair signals on every candle: back-to-back signals on one pair
+    monkeypatch.setattr(module.TradeBotV14, 'decide', lambda self, latest, ind, allowed: allowed)
+    return module
+
+
+def test_replay_matches_back_to_back_signals(bot_module, tmp_path):
+    config = loadtest.synthetic_config(2, 4)
+    os.makedirs(os.path.dirname(bot_module.CONFIG_PATH))
+    with open(bot_module.CONFIG_PATH, 'w') as f:
+        json.dump(config, f)
+
+    start = (datetime.utcnow().timestamp() // 60 + 1) * 60 + 2
+    path = str(tmp_path / "run.rec")
+    log = start_recording(path, bot_module.CONFIG_PATH, bot_module.STATE_PATH, bot_module.SHADOW_PATH)
+    broker = loadtest.SimBroker(config['currencies'], start, 4, 0, 0, 0)
+    bot = bot_module.TradeBotV14(broker=broker, clock=LockstepClock(log, start), recording=log)
+    bot.run()
+    log.close()
+
+    observed = [payload['value'] for kind, _, payload in read_events(path) if kind == OBSERVED]
+    assert any(observed), "no pair was still open at a later close"
+    assert broker.next_id - 1 >= 3
+
+    assert bot_module.replay(path)
@@ -0,0 +1,40 @@
+"""Shadow results of the shards merge with unique trade ids"""
+
+import os
+import sys
+import json
+from types import SimpleNamespace
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from coordinator import Coordinator  # noqa: E402
+from shadow import DEFAULT_VARIANTS, ID_SCALE, append_results, read_results  # noqa: E402
+
+
+def shadow_trade(pair, variant, settled_at):
+    return {'trade_id': settled_at * ID_SCALE, 'time': pd.Timestamp(settled_at, unit='s'), 'pair': pair,
+            'direction': 'call', 'result': 'win', 'profit': 0.8, 'entry_price': 1.1,
+            'adx': 25.0, 'macd': 0.1, 'rsi': 40.0, 'variant': variant}
+
+
+def test_shard_ids_do_not_collide(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs(os.path.dirname(DEFAULT_VARIANTS))
+    with open(DEFAULT_VARIANTS, "w") as f:
+        json.dump({'variants': {'adx12': {'*': {'indicators': {'adx_min': 12}}}}}, f)
+
+    settled_at = 1_792_400_000
+    append_results("shadow_trades.shard-0.csv", [shadow_trade('EURUSD', 'live', settled_at)])
+    append_results("shadow_trades.shard-1.csv", [shadow_trade('GBPUSD', 'live', settled_at),
+                                                 shadow_trade('GBPUSD', 'adx12', settled_at + 60)])
+
+    Coordinator.merge_shadow(SimpleNamespace(config={'amount': 1, 'currencies': {}}))
+
+    merged = read_results("shadow_trades.csv")
+    assert len(merged) == 3 and merged['trade_id'].is_unique
+    assert merged['trade_id'].tolist() == [settled_at * ID_SCALE, settled_at * ID_SCALE + 1,
+                                           (settled_at + 60) * ID_SCALE]
+    assert not os.path.exists("shadow_trades.shard-0.csv")
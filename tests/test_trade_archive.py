@@ -0,0 +1,52 @@
+"""Trade archive compaction: only closed days are merged, months are written once"""
+
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("pyarrow")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from trade_archive import TradeArchive  # noqa: E402
+
+
+def trade(trade_id, day, hour=8):
+    return {'trade_id': trade_id, 'time': f"{day} {hour:02d}:00:00", 'pair': 'EURUSD',
+            'direction': 'call', 'result': 'win', 'profit': 0.8}
+
+
+def paths(archive):
+    return sorted(entry['path'] for entry in archive.manifest()['files'])
+
+
+def test_today_is_never_rewritten(tmp_path):
+    archive = TradeArchive(str(tmp_path))
+    for hour in (8, 9):
+        archive.append([trade(hour, "2026-10-18", hour), trade(100 + hour, "2026-10-19", hour)])
+    today = [p for p in paths(archive) if p.startswith("date=2026-10-19/")]
+
+    archive.compact(rollup_after=7, today="2026-10-19")
+
+    files = paths(archive)
+    assert [p for p in files if p.startswith("date=2026-10-19/")] == today
+    assert len([p for p in files if p.startswith("date=2026-10-18/")]) == 1
+    assert len(archive.read()) == 4
+
+
+def test_month_is_rolled_up_once(tmp_path):
+    archive = TradeArchive(str(tmp_path))
+    archive.append([trade(1, "2026-09-29"), trade(2, "2026-09-30"), trade(3, "2026-10-02")])
+
+    archive.compact(rollup_after=7, today="2026-10-05")
+    assert not any(p.startswith("month=") for p in paths(archive))
+
+    archive.compact(rollup_after=7, today="2026-10-08")
+    month = [p for p in paths(archive) if p.startswith("month=")]
+    assert len(month) == 1 and month[0].startswith("month=2026-09/pair=EURUSD/")
+
+    archive.compact(rollup_after=7, today="2026-10-09")
+    assert [p for p in paths(archive) if p.startswith("month=")] == month
+    assert len(archive.read()) == 3
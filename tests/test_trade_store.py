@@ -0,0 +1,40 @@
+"""SQLite trade store: inserts never overwrite, the CSV export follows the database"""
+
+import os
+import sys
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from trade_schema import read_trades  # noqa: E402
+from trade_store import SqliteTradeStore  # noqa: E402
+
+
+def trade(trade_id, minute, result='win', profit=0.8):
+    return {'trade_id': trade_id, 'time': f"2026-10-19 08:{minute:02d}:00", 'pair': 'EURUSD',
+            'direction': 'call', 'result': result, 'profit': profit}
+
+
+def test_reappended_trade_is_exported_once(tmp_path):
+    export = str(tmp_path / "trades.csv")
+    store = SqliteTradeStore(str(tmp_path / "trades.db"), csv_export=export)
+
+    store.append([trade(101, 0), trade(102, 1)])
+    store.append([trade(102, 1, 'loss', -1.0), trade(103, 2)])
+
+    db = store.read()
+    csv = read_trades(export)
+    assert db['trade_id'].tolist() == [101, 102, 103]
+    assert csv['trade_id'].tolist() == [101, 102, 103]
+    assert db.loc[db['trade_id'] == 102, 'result'].astype(str).item() == 'win'
+
+
+def test_imports_get_their_own_ids(tmp_path):
+    store = SqliteTradeStore(str(tmp_path / "trades.db"), csv_export=None)
+    backtest = pd.DataFrame([trade(None, minute) for minute in range(3)]).drop(columns='trade_id')
+
+    assert store.import_frame(backtest) == 3
+    assert store.import_frame(backtest) == 3
+    assert store.read()['trade_id'].is_unique
@@ -0,0 +1,118 @@
+"""
+Timeframes - 5m / 15m / 1h bars resampled from the 1m candle stream
+
+Higher-timeframe bars are built from the 1m candles the bot already has,
+so confirmation from 5m/15m/1h costs no get_candles request:
+
+    update_bars(bars, window, minutes)
+
+appends the bars completed since the last update. Only complete bars are
+kept (all of its 1m candles present and closed), aligned to UTC
+boundaries like the broker's own candles, at most MAX_BARS per
+timeframe. Nothing is recomputed when no new bar completed.
+
+The bars live in the warm state, so they keep growing across runs: a gap
+in the 1m stream (e.g. between scheduled runs further apart than the 1m
+window) leaves a gap in the bars, the partial bars at its edges are skipped.
+Indicators per timeframe come from IndicatorBatch on the bar frames.
+
+Per-pair confirmation (config.json, pair or variant config):
+    "confirm": {"5m": {"ema_period": 20}, "15m": {"ema_period": 10, "adx_min": 15}}
+
+A signal is kept only if every listed timeframe's last completed bar
+closes on the signal's side of its EMA (above for call, below for put)
+and, if set, its ADX is at least adx_min. A timeframe without enough bars
+for its EMA yet does not confirm.
+"""
+
+import numpy as np
+import pandas as pd
+
+TIMEFRAMES = {'5m': 5, '15m': 15, '1h': 60}  # name -> minutes
+MAX_BARS = 100
+BAR_COLUMNS = ('time', 'open', 'high', 'low', 'close', 'volume')
+
+
+def required_timeframes(pair_configs):
+    """Timeframe names the pair configs ask to confirm with (unknown names raise ValueError)"""
+    names = set()
+    for cfg in pair_configs:
+        for name in cfg.get('confirm', {}):
+            if name not in TIMEFRAMES:
+                raise ValueError(f"Unknown timeframe '{name}' (use {', '.join(TIMEFRAMES)})")
+            names.add(name)
+    return names
+
+
+def empty_bars():
+    return pd.DataFrame({col: pd.Series(dtype='datetime64[ns]' if col == 'time' else np.float64)
+                         for col in BAR_COLUMNS})
+
+
+def update_bars(bars, window, minutes, max_bars=MAX_BARS):
+    """
+    Bars of `minutes` with the ones completed in a 1m window appended
+
+    bars: previous bars (None / empty to start) - returned unchanged when
+    no new bar completed. window: 1m candles, last row still forming.
+    """
+    if bars is None:
+        bars = empty_bars()
+    if len(window) < 2:
+        return bars
+
+    span = minutes * 60
+    if not bars.empty:
+        # the next bar is not complete until its last minute has closed
+        if window['time'].iloc[-2] < bars['time'].iloc[-1] + pd.Timedelta(seconds=2 * span - 60):
+            return bars
+
+    done = window.iloc[:-1]
+    times = ((done['time'] - pd.Timestamp(0)) // pd.Timedelta(seconds=1)).to_numpy(dtype=np.int64)
+    end = (times[-1] + 60) // span * span  # bars starting before this are complete
+
+    first = times[0] // span * span
+    if times[0] != first:
+        first += span  # the bar the window starts inside is partial
+    if not bars.empty:
+        first = max(first, int(bars['time'].iloc[-1].timestamp()) + span)
+    if first >= end:
+        return bars
+
+    lo, hi = np.searchsorted(times, first), np.searchsorted(times, end)
+    if lo == hi:
+        return bars  # no 1m candle inside the complete bars (hole)
+    bucket = times[lo:hi] // span * span
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    ends = np.r_[starts[1:], len(bucket)] - 1
+
+    full = ends - starts + 1 == minutes  # bars next to a hole lack some 1m candles
+
+    values = {col: done[col].to_numpy(dtype=np.float64)[lo:hi] for col in BAR_COLUMNS[1:]}
+    new = pd.DataFrame({
+        'time': pd.to_datetime(bucket[starts], unit='s'),
+        'open': values['open'][starts],
+        'high': np.maximum.reduceat(values['high'], starts),
+        'low': np.minimum.reduceat(values['low'], starts),
+        'close': values['close'][ends],
+        'volume': np.add.reduceat(values['volume'], starts),
+    })[full]
+    if bars.empty:
+        return new.tail(max_bars).reset_index(drop=True)
+    return pd.concat([bars, new], ignore_index=True).tail(max_bars).reset_index(drop=True)
+
+
+def confirmation(batch, pair, direction, rule):
+    """Reason one timeframe does not confirm `direction` (None = confirmed)"""
+    row = batch.index[pair]
+    period = rule.get('ema_period', 20)
+    ema = batch.series('ema20', period)[row, -1]
+    close = batch.close[row, -1]
+    if np.isnan(ema):
+        return f"warming up ({batch.close.shape[1]}/{period} bars)"
+    if (direction == 'call' and close <= ema) or (direction == 'put' and close >= ema):
+        return f"trend against {direction} (close {close:.5f}, EMA{period} {ema:.5f})"
+    adx_min = rule.get('adx_min')
+    if adx_min is not None and batch.series('adx')[row, -1] < adx_min:
+        return f"ADX {batch.series('adx')[row, -1]:.1f} below {adx_min}"
+    return None
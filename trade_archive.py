@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+Trade Archive - date/pair partitioned parquet archive of trades
+
+Layout (hive-style partitions under one root):
+    archive/trades/manifest.json
+    archive/trades/date=2026-10-19/pair=EURUSD/part-<stamp>-<id>.parquet
+    archive/trades/month=2026-09/pair=EURUSD/part-<stamp>-<id>.parquet   (rolled up)
+
+manifest.json lists every live file with its pair, first/last trade date
+and row count. Readers select files from the manifest by date range and
+pair before opening any parquet file, and only the requested columns are
+decoded. Files that are not in the manifest are ignored, so a crash
+between writing a file and the manifest only leaves an orphan behind.
+
+Each bot run appends one small part per (day, pair); `compact` (run once a
+day) merges the parts of each closed day into a single file and, with
+--rollup-after N, rolls a month's daily partitions up into one monthly file
+once the whole month is more than N days old. Today's partition is never
+rewritten.
+
+The root may also be an http(s) URL (read-only), e.g. the GitHub raw URL
+of the repo, so the dashboard can prune remotely too.
+
+Usage:
+  python trade_archive.py import trades.csv
+  python trade_archive.py compact --rollup-after 7
+  python trade_archive.py info
+  python trade_archive.py export out.csv --start 2026-10-01 --end 2026-10-19 --pair EURUSD
+"""
+
+import io
+import os
+import json
+import time
+import uuid
+import argparse
+import logging
+import urllib.error
+import urllib.request
+import pandas as pd
+
+from trade_schema import DIRECTIONS, RESULTS, SCHEMA_VERSION, TIME_FORMAT, append_trades, format_trade, normalize_trades
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ROOT = "archive/trades"
+MANIFEST = "manifest.json"
+COMPRESSION = "zstd"
+
+
+def to_day(value):
+    """'YYYY-MM-DD' for a date-like value (None stays None)"""
+    if value is None:
+        return None
+    return pd.Timestamp(value).strftime("%Y-%m-%d")
+
+
+class TradeArchive:
+    """Partitioned parquet trade archive (usable as a trade store backend)"""
+
+    queryable = False
+
+    def __init__(self, root=DEFAULT_ROOT, csv_export=None):
+        self.root = root.rstrip('/')
+        self.remote = self.root.startswith(("http://", "https://"))
+        self.csv_export = csv_export
+
+    # ------------------------------------------------------------------ paths
+    def _path(self, rel):
+        if self.remote:
+            return f"{self.root}/{rel}"
+        return os.path.join(self.root, *rel.split('/'))
+
+    def _open(self, rel):
+        """File-like object for a path relative to the root (local or URL)"""
+        if self.remote:
+            with urllib.request.urlopen(self._path(rel), timeout=30) as resp:
+                return io.BytesIO(resp.read())
+        return open(self._path(rel), 'rb')
+
+    # --------------------------------------------------------------- manifest
+    def manifest(self):
+        """Return the manifest ({'schema': N, 'files': [...]}); empty if none yet"""
+        try:
+            with self._open(MANIFEST) as f:
+                manifest = json.load(f)
+        except (FileNotFoundError, urllib.error.HTTPError):
+            return {'schema': SCHEMA_VERSION, 'files': []}
+
+        if manifest.get('schema') != SCHEMA_VERSION:
+            raise ValueError(f"Archive schema {manifest.get('schema')} != {SCHEMA_VERSION}, re-import the trades")
+        return manifest
+
+    def _write_manifest(self, manifest):
+        path = self._path(MANIFEST)
+        manifest['files'].sort(key=lambda e: (e['first'], e['pair'], e['path']))
+        with open(path + ".tmp", 'w') as f:
+            json.dump(manifest, f, indent=1)
+        os.replace(path + ".tmp", path)
+
+    def files(self, start=None, end=None, pairs=None, manifest=None):
+        """
+        Manifest entries that can hold trades in [start, end] for the given pairs
+
+        start, end: inclusive dates (anything pd.Timestamp accepts)
+        """
+        start, end = to_day(start), to_day(end)
+        manifest = manifest or self.manifest()
+        return [
+            entry for entry in manifest['files']
+            if (start is None or entry['last'] >= start)
+            and (end is None or entry['first'] <= end)
+            and (not pairs or entry['pair'] in pairs)
+        ]
+
+    # ------------------------------------------------------------------ write
+    def append(self, trades):
+        """Append trade records (dicts) - one new part file per (day, pair)"""
+        rows = pd.DataFrame([format_trade(t) for t in trades])
+        self.import_frame(rows)
+        if self.csv_export:
+            append_trades(self.csv_export, trades)
+
+    def import_frame(self, df):
+        """Add a trades DataFrame (any accepted format) to the archive"""
+        df = normalize_trades(df)
+        if df.empty:
+            return 0
+        if 'pair' not in df.columns:
+            df['pair'] = 'UNKNOWN'
+
+        manifest = self.manifest()
+        days = df['time'].dt.strftime("%Y-%m-%d")
+        for (day, pair), part in df.groupby([days, df['pair'].astype(str)], sort=True):
+            manifest['files'].append(self._write_part(f"date={day}/pair={pair}", pair, part))
+        self._write_manifest(manifest)
+        return len(df)
+
+    def _write_part(self, partition, pair, df):
+        """Write one parquet file into a partition and return its manifest entry"""
+        if self.remote:
+            raise ValueError("Remote archives are read-only")
+
+        df = df.sort_values('time', kind='stable').reset_index(drop=True)
+        rel = f"{partition}/part-{time.strftime('%Y%m%dT%H%M%S', time.gmtime())}-{uuid.uuid4().hex[:6]}.parquet"
+        path = self._path(rel)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        df.to_parquet(path + ".tmp", index=False, compression=COMPRESSION)
+        os.replace(path + ".tmp", path)
+
+        return {
+            'path': rel,
+            'pair': pair,
+            'first': df['time'].iloc[0].strftime("%Y-%m-%d"),
+            'last': df['time'].iloc[-1].strftime("%Y-%m-%d"),
+            'rows': len(df),
+        }
+
+    def compact(self, rollup_after=None, today=None):
+        """
+        Merge small files of closed partitions
+
+        - only days before today are touched: today's partition still gets a
+          part per run, so merging it would rewrite the same file all day
+        - every closed partition with more than one part is rewritten as one file
+        - rollup_after=N: daily partitions are merged into month=YYYY-MM/pair=X
+          once the whole month is more than N days old, so each month file is
+          written once instead of on every compaction
+
+        Returns (files before, files after).
+        """
+        manifest = self.manifest()
+        before = len(manifest['files'])
+        today = pd.Timestamp(today) if today else pd.Timestamp.now(tz='UTC').tz_localize(None)
+        today = today.normalize()
+        open_from = to_day(today)
+        rollup_month = None
+        if rollup_after is not None:
+            # months strictly before the cutoff's month are complete and old enough
+            rollup_month = to_day(today - pd.Timedelta(days=rollup_after))[:7]
+
+        groups = {}
+        for entry in manifest['files']:
+            partition = entry['path'].rsplit('/', 1)[0]
+            if partition.startswith("date=") and entry['last'] >= open_from:
+                partition = entry['path']  # still open: a group of its own, left as is
+            elif rollup_month and partition.startswith("date=") and entry['last'][:7] < rollup_month:
+                partition = f"month={entry['first'][:7]}/pair={entry['pair']}"
+            groups.setdefault(partition, []).append(entry)
+
+        kept, removed = [], []
+        for partition, entries in groups.items():
+            path = entries[0]['path']
+            if len(entries) == 1 and (path == partition or path.startswith(partition + "/")):
+                kept.extend(entries)
+                continue
+            df = self._read_entries(entries)
+            # Only exact copies of a row (the same file appended twice) are dropped:
+            # trade_id alone is not unique (backtest ids are positional per file)
+            df = df.drop_duplicates(ignore_index=True)
+            kept.append(self._write_part(partition, entries[0]['pair'], df))
+            removed.extend(entries)
+
+        if removed:
+            manifest['files'] = kept
+            self._write_manifest(manifest)
+            # ลบไฟล์เก่าหลังเขียน manifest แล้วเท่านั้น
+            for entry in removed:
+                try:
+                    os.remove(self._path(entry['path']))
+                except FileNotFoundError:
+                    pass
+                self._remove_empty_dirs(os.path.dirname(self._path(entry['path'])))
+
+        logger.info(f"🗜️ Compacted archive: {before} -> {len(kept)} files")
+        return before, len(kept)
+
+    def _remove_empty_dirs(self, path):
+        root = os.path.abspath(self.root)
+        path = os.path.abspath(path)
+        while path != root and path.startswith(root) and not os.listdir(path):
+            os.rmdir(path)
+            path = os.path.dirname(path)
+
+    # ------------------------------------------------------------------- read
+    def read(self, start=None, end=None, pairs=None, columns=None, manifest=None):
+        """
+        Read trades in [start, end] (inclusive dates) for the given pairs
+
+        Partitions are pruned through the manifest first, so only matching
+        files are opened; columns limits what is decoded from each file.
+        """
+        entries = self.files(start, end, pairs, manifest)
+        if not entries:
+            return pd.DataFrame()
+
+        df = self._read_entries(entries, columns)
+
+        # rolled-up / multi-day files can still hold rows outside the range
+        start, end = to_day(start), to_day(end)
+        if start or end or pairs:
+            mask = pd.Series(True, index=df.index)
+            if start or end:
+                days = df['time'].dt.strftime("%Y-%m-%d")
+                if start:
+                    mask &= days >= start
+                if end:
+                    mask &= days <= end
+            if pairs and 'pair' in df.columns:
+                mask &= df['pair'].isin(pairs)
+            df = df[mask]
+
+        return df.sort_values('time', kind='stable').reset_index(drop=True)
+
+    def _read_entries(self, entries, columns=None):
+        if columns is not None:
+            columns = list(dict.fromkeys(['time', 'pair', *columns]))
+        frames = []
+        for entry in entries:
+            with self._open(entry['path']) as f:
+                frames.append(pd.read_parquet(f, columns=columns))
+        df = pd.concat(frames, ignore_index=True)
+        # categories differ per file - unify after concat
+        if 'pair' in df.columns:
+            df['pair'] = df['pair'].astype(str).astype('category')
+        for col, allowed in (('direction', DIRECTIONS), ('result', RESULTS)):
+            if col in df.columns:
+                df[col] = pd.Categorical(df[col].astype(str), categories=list(allowed))
+        return df
+
+    def export_csv(self, path, start=None, end=None, pairs=None):
+        df = self.read(start, end, pairs)
+        if not df.empty:
+            df = df.assign(time=df['time'].dt.strftime(TIME_FORMAT))
+        df.to_csv(path, index=False)
+
+
+def main():
+    """Command line entry point"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="Partitioned parquet trade archive")
+    parser.add_argument("--root", default=DEFAULT_ROOT, help="archive directory")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    imp = sub.add_parser("import", help="import a trades CSV")
+    imp.add_argument("csv_path")
+
+    compact = sub.add_parser("compact", help="merge small part files")
+    compact.add_argument("--rollup-after", type=int, default=None,
+                         help="roll daily partitions older than N days into monthly ones")
+
+    sub.add_parser("info", help="show partitions")
+
+    exp = sub.add_parser("export", help="export (a slice of) the archive to CSV")
+    exp.add_argument("csv_path")
+    exp.add_argument("--start", help="first date (inclusive)")
+    exp.add_argument("--end", help="last date (inclusive)")
+    exp.add_argument("--pair", action="append", help="pair to include (repeatable)")
+
+    args = parser.parse_args()
+    archive = TradeArchive(args.root)
+
+    if args.command == "import":
+        count = archive.import_frame(pd.read_csv(args.csv_path))
+        print(f"Imported {count} trades into {args.root}")
+    elif args.command == "compact":
+        before, after = archive.compact(args.rollup_after)
+        print(f"{before} -> {after} files")
+    elif args.command == "info":
+        entries = archive.files()
+        for entry in entries:
+            print(f"{entry['path']}\t{entry['first']}..{entry['last']}\trows={entry['rows']}")
+        print(f"{len(entries)} files, {sum(e['rows'] for e in entries)} trades")
+    elif args.command == "export":
+        archive.export_csv(args.csv_path, args.start, args.end, args.pair)
+        print(f"Exported trades to {args.csv_path}")
+
+
+if __name__ == "__main__":
+    main()
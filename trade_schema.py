@@ -0,0 +1,179 @@
+"""
+Trade Schema - canonical trade record layout shared by the bot and dashboard
+
+One row per trade:
+    trade_id     int64       broker order id (or sequence number for backtests)
+    time         datetime64  UTC, written as TIME_FORMAT
+    pair         category
+    direction    category    call / put
+    result       category    win / loss / tie
+    profit       float32
+    capital      float64
+    entry_price  float64     prices keep full precision
+    rsi, adx     float32
+    macd         float32
+
+normalize_trades() is the single place that accepts both the old format
+(time, direction) and the new one (entry_time, signal), validates the
+values and coerces the dtypes above. Extra columns are kept as-is.
+"""
+
+import os
+import logging
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+SCHEMA_VERSION = 1  # bump when dtypes/columns change (invalidates derived caches)
+
+TRADE_COLUMNS = [
+    'trade_id', 'time', 'pair', 'direction', 'result', 'profit',
+    'capital', 'entry_price', 'rsi', 'adx', 'macd',
+]
+REQUIRED_COLUMNS = ('time', 'direction', 'result', 'profit')
+
+DIRECTIONS = ('call', 'put')
+RESULTS = ('win', 'loss', 'tie')
+
+FLOAT_DTYPES = {
+    'profit': np.float32,
+    'capital': np.float64,
+    'entry_price': np.float64,
+    'rsi': np.float32,
+    'adx': np.float32,
+    'macd': np.float32,
+}
+
+# dtype hints for read_csv (avoids building object columns first)
+CSV_DTYPES = {
+    'pair': 'category',
+    'direction': 'category',
+    'result': 'category',
+    'signal': 'category',
+    **{col: dtype for col, dtype in FLOAT_DTYPES.items()},
+}
+
+
+def parse_times(values):
+    """Parse trade timestamps with the explicit format (falls back to ISO8601 for older files)"""
+    try:
+        return pd.to_datetime(values, format=TIME_FORMAT)
+    except (ValueError, TypeError):
+        return pd.to_datetime(values, format='ISO8601')
+
+
+def normalize_trades(df, assign_ids=True):
+    """
+    Validate and coerce a trades DataFrame to the canonical schema
+
+    assign_ids: when the frame has no trade_id column, number the rows 0..n-1
+    Raises ValueError on missing required columns or unknown direction/result values.
+    """
+    df = df.copy()
+
+    # รองรับทั้ง format เก่า (time, direction) และ format ใหม่ (entry_time, signal)
+    if 'entry_time' in df.columns and 'time' not in df.columns:
+        df = df.rename(columns={'entry_time': 'time'})
+    if 'signal' in df.columns and 'direction' not in df.columns:
+        df = df.rename(columns={'signal': 'direction'})
+
+    missing = [col for col in REQUIRED_COLUMNS if col not in df.columns]
+    if missing:
+        raise ValueError(f"Trades missing required columns: {', '.join(missing)}")
+
+    if not pd.api.types.is_datetime64_any_dtype(df['time']):
+        df['time'] = parse_times(df['time'])
+
+    for col, allowed in (('direction', DIRECTIONS), ('result', RESULTS)):
+        df[col] = coerce_category(df[col], allowed)
+
+    if 'pair' in df.columns and not isinstance(df['pair'].dtype, pd.CategoricalDtype):
+        df['pair'] = df['pair'].astype(str).astype('category')
+
+    for col, dtype in FLOAT_DTYPES.items():
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype(dtype)
+
+    if 'trade_id' in df.columns:
+        df['trade_id'] = coerce_trade_ids(df['trade_id'])
+    elif assign_ids:
+        df['trade_id'] = np.arange(len(df), dtype=np.int64)
+
+    ordered = [col for col in TRADE_COLUMNS if col in df.columns]
+    return df[ordered + [col for col in df.columns if col not in ordered]]
+
+
+def coerce_category(values, allowed):
+    """Map values (case-insensitive) onto a fixed categorical; validation works on categories, not rows"""
+    if not isinstance(values.dtype, pd.CategoricalDtype):
+        values = values.astype('category')
+
+    lowered = [str(c).lower() for c in values.cat.categories]
+    bad = sorted(set(lowered) - set(allowed))
+    codes = values.cat.codes.to_numpy()
+    if bad:
+        raise ValueError(f"Invalid {values.name} values: {', '.join(bad)}")
+    if (codes < 0).any():
+        raise ValueError(f"Missing {values.name} values")
+
+    mapping = np.array([allowed.index(c) for c in lowered], dtype=np.int8)
+    return pd.Categorical.from_codes(mapping[codes], categories=list(allowed))
+
+
+def coerce_trade_ids(ids):
+    """Integer trade ids (legacy 'trade_012' strings keep their numeric suffix)"""
+    numeric = pd.to_numeric(ids, errors='coerce')
+    if numeric.isna().any():
+        suffix = ids.astype(str).str.extract(r'(\d+)$')[0]
+        numeric = numeric.fillna(pd.to_numeric(suffix, errors='coerce'))
+    if numeric.isna().any():
+        raise ValueError("trade_id values must be integers")
+    return numeric.astype(np.int64)
+
+
+def read_trades(path, assign_ids=True):
+    """Read a trades CSV (local path or URL) into the canonical schema"""
+    df = pd.read_csv(path, dtype=CSV_DTYPES)
+    if df.empty:
+        return df
+    return normalize_trades(df, assign_ids=assign_ids)
+
+
+def format_trade(trade):
+    """Turn a trade record dict into a CSV row in TRADE_COLUMNS order"""
+    row = {col: trade.get(col, '') for col in TRADE_COLUMNS}
+    if hasattr(row['time'], 'strftime'):
+        row['time'] = pd.Timestamp(row['time']).strftime(TIME_FORMAT)
+    return row
+
+
+def append_trades(path, trades):
+    """
+    Append trade records to a CSV in the canonical column order
+
+    Files with the canonical header are appended to directly (O(1) per trade);
+    older layouts are migrated once by rewriting the file.
+    """
+    rows = pd.DataFrame([format_trade(t) for t in trades], columns=TRADE_COLUMNS)
+
+    header = None
+    if os.path.exists(path) and os.path.getsize(path) > 0:
+        with open(path) as f:
+            header = f.readline().strip().split(',')
+
+    if header is None:
+        rows.to_csv(path, index=False)
+    elif header == TRADE_COLUMNS:
+        rows.to_csv(path, mode='a', header=False, index=False)
+    else:
+        logger.info(f"Migrating {path} to the canonical trade schema")
+        existing = pd.read_csv(path)
+        if not existing.empty:
+            existing = normalize_trades(existing)
+            existing['time'] = existing['time'].dt.strftime(TIME_FORMAT)
+        merged = pd.concat([existing, rows], ignore_index=True)
+        merged['trade_id'] = pd.to_numeric(merged['trade_id']).astype('Int64')
+        ordered = TRADE_COLUMNS + [col for col in merged.columns if col not in TRADE_COLUMNS]
+        merged[ordered].to_csv(path, index=False)
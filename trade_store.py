@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+Trade Store - pluggable trade storage shared by the bot and dashboard
+
+Backends (select with the TRADE_STORE env var):
+    csv:trades.csv      CsvTradeStore     default, the file committed by GitHub Actions
+    sqlite:trades.db    SqliteTradeStore  WAL mode, indexed on (pair, time) and result
+    archive:<dir>       TradeArchive      date/pair partitioned parquet (trade_archive.py)
+
+The SQLite store keeps exporting every trade to trades.csv as well, so the
+workflow and the dashboard's GitHub raw URL keep working. Its query methods
+(aggregates, pages, series) let the dashboard push filters, pagination and
+aggregates down to SQL instead of loading every trade into pandas.
+
+Usage:
+  python trade_store.py import trades.csv --db trades.db --keep-ids
+  python trade_store.py export trades.csv --db trades.db
+"""
+
+import os
+import argparse
+import sqlite3
+import logging
+from contextlib import closing
+import numpy as np
+import pandas as pd
+
+from trade_archive import TradeArchive
+from trade_schema import (FLOAT_DTYPES, TIME_FORMAT, TRADE_COLUMNS, append_trades, format_trade,
+                          normalize_trades, read_trades)
+
+logger = logging.getLogger(__name__)
+
+# trade records carry numpy scalars (pandas indicator values, int64 ids)
+for _type, _cast in ((np.int64, int), (np.int32, int), (np.float32, float), (np.bool_, bool)):
+    sqlite3.register_adapter(_type, _cast)
+
+DEFAULT_STORE = "csv:trades.csv"
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS trades (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    trade_id    INTEGER NOT NULL,
+    time        TEXT    NOT NULL,   -- TIME_FORMAT, sorts chronologically
+    pair        TEXT    NOT NULL,
+    direction   TEXT    NOT NULL,
+    result      TEXT    NOT NULL,
+    profit      REAL    NOT NULL,
+    capital     REAL,
+    entry_price REAL,
+    rsi         REAL,
+    adx         REAL,
+    macd        REAL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_trades_trade_id  ON trades(trade_id);
+CREATE INDEX        IF NOT EXISTS idx_trades_pair_time ON trades(pair, time);
+CREATE INDEX        IF NOT EXISTS idx_trades_time      ON trades(time);
+CREATE INDEX        IF NOT EXISTS idx_trades_result    ON trades(result);
+"""
+
+
+class CsvTradeStore:
+    """Trades in a single CSV file (canonical schema)"""
+
+    queryable = False
+
+    def __init__(self, path="trades.csv"):
+        self.path = path
+
+    def append(self, trades):
+        append_trades(self.path, trades)
+
+    def read(self, start=None):
+        """All trades (or those from the `start` date on)"""
+        if not os.path.exists(self.path):
+            return pd.DataFrame()
+        df = read_trades(self.path)
+        if start is not None and not df.empty:
+            df = df[df['time'] >= pd.Timestamp(start)].reset_index(drop=True)
+        return df
+
+    def export_csv(self, path):
+        df = self.read()
+        if not df.empty:
+            df = df.assign(time=df['time'].dt.strftime(TIME_FORMAT))
+        df.to_csv(path, index=False)
+
+
+class SqliteTradeStore:
+    """Trades in SQLite (WAL): the bot writes while dashboards read without blocking"""
+
+    queryable = True
+
+    def __init__(self, path="trades.db", csv_export="trades.csv"):
+        self.path = path
+        self.csv_export = csv_export
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SQLITE_SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _query(self, sql, params=()):
+        with closing(self._connect()) as conn:
+            return conn.execute(sql, params).fetchall()
+
+    # ------------------------------------------------------------------ write
+    def append(self, trades):
+        inserted = self._insert([format_trade(t) for t in trades])
+        skipped = len(trades) - sum(inserted)
+        if skipped:
+            logger.warning(f"⚠️ Skipped {skipped} trades already in {self.path} (same trade_id)")
+        if self.csv_export and any(inserted):
+            # only the rows the database took - a skipped duplicate is already in the export
+            append_trades(self.csv_export, [t for t, ok in zip(trades, inserted) if ok])
+
+    def import_frame(self, df, keep_ids=False):
+        """
+        Bulk-insert a trades DataFrame (any accepted format)
+
+        The store assigns the imported rows fresh trade ids below zero (and below
+        every id already stored), so backtest files numbered 0..n-1 never collide
+        with each other or with broker order ids. keep_ids: keep the frame's own
+        trade_id (the bot's trades.csv); rows whose id is already stored are
+        skipped and counted. Returns the number of rows inserted.
+        """
+        raw = df
+        df = normalize_trades(df, assign_ids=keep_ids)
+        df = df.assign(time=df['time'].dt.strftime(TIME_FORMAT))
+        # store full-precision values (the in-memory schema narrows some to float32)
+        for col in FLOAT_DTYPES:
+            if col in raw.columns:
+                df[col] = pd.to_numeric(raw[col], errors='coerce').to_numpy(dtype=np.float64)
+        for col in TRADE_COLUMNS:
+            if col not in df.columns:
+                df[col] = None
+        rows = df[TRADE_COLUMNS].astype(object).where(df[TRADE_COLUMNS].notna(), None).to_dict('records')
+        inserted = sum(self._insert(rows, assign_ids=not keep_ids))
+        if inserted < len(rows):
+            logger.warning(f"⚠️ Skipped {len(rows) - inserted} of {len(rows)} imported trades (trade_id already stored)")
+        return inserted
+
+    def _insert(self, rows, assign_ids=False):
+        """Insert rows, never overwriting a stored trade; returns whether each row was inserted"""
+        columns = ', '.join(TRADE_COLUMNS)
+        marks = ', '.join(f":{col}" for col in TRADE_COLUMNS)
+        params = [{col: (row.get(col) if row.get(col) != '' else None) for col in TRADE_COLUMNS} for row in rows]
+        with closing(self._connect()) as conn:
+            with conn:  # one short transaction
+                if assign_ids:
+                    lowest = conn.execute("SELECT MIN(COALESCE(MIN(trade_id), 0), 0) FROM trades").fetchone()[0]
+                    for offset, row in enumerate(params, start=1):
+                        row['trade_id'] = lowest - offset
+                sql = f"INSERT OR IGNORE INTO trades ({columns}) VALUES ({marks})"
+                return [conn.execute(sql, row).rowcount == 1 for row in params]
+
+    # ------------------------------------------------------------------- read
+    def read(self, start=None):
+        """All trades (or those from the `start` date on, via the time index)"""
+        where, params = ("WHERE time >= ?", [pd.Timestamp(start).strftime(TIME_FORMAT)]) if start is not None else ("", [])
+        with closing(self._connect()) as conn:
+            df = pd.read_sql_query(f"SELECT {', '.join(TRADE_COLUMNS)} FROM trades {where} ORDER BY time, id",
+                                   conn, params=params)
+        return normalize_trades(df) if not df.empty else df
+
+    def export_csv(self, path):
+        df = self.read()
+        if not df.empty:
+            df = df.assign(time=df['time'].dt.strftime(TIME_FORMAT))
+        df.to_csv(path, index=False)
+
+    def version(self):
+        """Cheap change marker (max rowid, row count) for dashboard caches"""
+        return tuple(self._query("SELECT COALESCE(MAX(id), 0), COUNT(*) FROM trades")[0])
+
+    def pairs(self):
+        return [row[0] for row in self._query("SELECT DISTINCT pair FROM trades ORDER BY pair")]
+
+    def labels(self, column):
+        if column not in ('pair', 'result', 'direction'):
+            raise ValueError(f"Unsupported column: {column}")
+        return [row[0] for row in self._query(f"SELECT DISTINCT {column} FROM trades ORDER BY {column}")]
+
+    def time_range(self, pair=None):
+        where, params = self._where(pair=pair)
+        return tuple(self._query(f"SELECT MIN(time), MAX(time) FROM trades {where}", params)[0])
+
+    def aggregates(self, pair=None, day=None):
+        """
+        Counts and P&L sums for one pair (or all pairs)
+
+        day: 'YYYY-MM-DD' to also aggregate that day's trades
+        """
+        where, params = self._where(pair=pair)
+        day_start = f"{day} 00:00:00" if day else ''
+        day_end = f"{day} 23:59:59" if day else ''
+        row = self._query(f"""
+            SELECT COUNT(*),
+                   SUM(result = 'win'),
+                   SUM(result = 'loss'),
+                   COALESCE(SUM(profit), 0),
+                   AVG(CASE WHEN result = 'win' THEN profit END),
+                   AVG(CASE WHEN result = 'loss' THEN profit END),
+                   SUM(time BETWEEN ? AND ?),
+                   COALESCE(SUM(CASE WHEN time BETWEEN ? AND ? THEN profit END), 0),
+                   SUM(time BETWEEN ? AND ? AND result = 'win')
+            FROM trades {where}
+        """, (day_start, day_end) * 3 + tuple(params))[0]
+        keys = ('total_trades', 'wins', 'losses', 'total_profit', 'avg_win', 'avg_loss',
+                'today_trades', 'today_profit', 'today_wins')
+        return {key: (value or 0) for key, value in zip(keys, row)}
+
+    def series(self, pair=None):
+        """Profits and win flags in time order (walks the (pair, time) index)"""
+        where, params = self._where(pair=pair)
+        rows = self._query(f"SELECT profit, result = 'win' FROM trades {where} ORDER BY time, id", params)
+        if not rows:
+            return np.array([], dtype=np.float64), np.array([], dtype=bool)
+        arr = np.array(rows, dtype=np.float64)
+        return arr[:, 0], arr[:, 1].astype(bool)
+
+    def count(self, pairs=None, results=None, directions=None):
+        where, params = self._where(pairs=pairs, results=results, directions=directions)
+        return self._query(f"SELECT COUNT(*) FROM trades {where}", params)[0][0]
+
+    def page(self, pairs=None, results=None, directions=None, limit=100, offset=0):
+        """Newest-first page of trades (LIMIT/OFFSET on the time index)"""
+        where, params = self._where(pairs=pairs, results=results, directions=directions)
+        with closing(self._connect()) as conn:
+            df = pd.read_sql_query(
+                f"SELECT {', '.join(TRADE_COLUMNS)} FROM trades {where} ORDER BY time DESC, id DESC LIMIT ? OFFSET ?",
+                conn, params=list(params) + [int(limit), int(offset)])
+        return normalize_trades(df) if not df.empty else df
+
+    def get(self, trade_id):
+        """Single trade as a Series (or None)"""
+        with closing(self._connect()) as conn:
+            df = pd.read_sql_query(f"SELECT {', '.join(TRADE_COLUMNS)} FROM trades WHERE trade_id = ?",
+                                   conn, params=[int(trade_id)])
+        return normalize_trades(df).iloc[0] if not df.empty else None
+
+    @staticmethod
+    def _where(pair=None, pairs=None, results=None, directions=None):
+        clauses, params = [], []
+        if pair is not None:
+            pairs = [pair]
+        for column, values in (('pair', pairs), ('result', results), ('direction', directions)):
+            if values:
+                clauses.append(f"{column} IN ({', '.join('?' * len(values))})")
+                params.extend(values)
+        return ("WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+
+def open_trade_store(spec=None):
+    """
+    Open the configured trade store
+
+    spec: 'csv:<path>', 'sqlite:<path>' or 'archive:<dir>' (default: TRADE_STORE env var, else csv:trades.csv)
+    """
+    spec = spec or os.getenv("TRADE_STORE", DEFAULT_STORE)
+    kind, _, path = spec.partition(":")
+
+    if kind == "csv":
+        return CsvTradeStore(path or "trades.csv")
+    if kind == "sqlite":
+        return SqliteTradeStore(path or "trades.db")
+    if kind == "archive":
+        return TradeArchive(path or "archive/trades")
+    raise ValueError(f"Unknown trade store: {spec}")
+
+
+def main():
+    """Command line entry point"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="Trade store maintenance")
+    parser.add_argument("--db", default="trades.db", help="SQLite database path")
+    sub = parser.add_subparsers(dest="command", required=True)
+    imp = sub.add_parser("import", help="import a trades CSV into SQLite")
+    imp.add_argument("csv_path")
+    imp.add_argument("--keep-ids", action="store_true",
+                     help="keep the file's trade ids (the bot's own trades.csv) instead of assigning new ones")
+    exp = sub.add_parser("export", help="export SQLite trades to CSV")
+    exp.add_argument("csv_path")
+
+    args = parser.parse_args()
+    store = SqliteTradeStore(args.db, csv_export=None)
+
+    if args.command == "import":
+        count = store.import_frame(pd.read_csv(args.csv_path), keep_ids=args.keep_ids)
+        print(f"Imported {count} trades into {args.db}")
+    elif args.command == "export":
+        store.export_csv(args.csv_path)
+        print(f"Exported trades to {args.csv_path}")
+
+
+if __name__ == "__main__":
+    main()
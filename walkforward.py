@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""
+Walk-Forward - out-of-sample check of the per-pair thresholds on rolling folds
+
+The candle history of each pair (candle store) is split into rolling folds:
+
+    |---- train (--train-days) ----|-- test (--test-days) --|
+              |---- train ----------------|-- test --|          step = test days
+
+On every train window the thresholds of the bot's decide() rule (adx_min,
+macd_min, price_ema_max, and the EMA period) are tuned by grid search for
+profit (at least --min-trades trades); the tuned values and the current
+config.json values are then both evaluated on the following test window,
+which the tuning never saw.
+
+Trades follow the live rules: a candle is evaluated at its close (trading
+hours and session direction of that hour), enters at its close and
+settles on the close of the next candle (1-minute expiry, payout from
+config). Risk limits are not applied - this compares signal quality.
+
+Indicators are computed once per (pair, EMA period, RSI period) over the
+whole history and cached as .npy files (.cache/indicators/<pair>/...),
+rebuilt only when the candle store changes. Folds slice those arrays, so
+overlapping train windows (and later runs) share them; the fold workers
+(a process pool) memory-map the same files instead of receiving copies.
+Indicators are recursive, so values from the full history can differ from
+the bot's 100-candle windows during the first candles after a gap.
+
+Usage:
+  python walkforward.py                                  # all enabled pairs in the candle store
+  python walkforward.py --pair EURUSD --train-days 14 --test-days 7 --workers 4
+"""
+
+import os
+import json
+import time
+import argparse
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from candle_store import CandleStore, DEFAULT_ROOT
+from indicators import compute
+
+logger = logging.getLogger(__name__)
+
+CONFIG_PATH = "versions/v1.4/config.json"
+CACHE_DIR = ".cache/indicators"
+CACHE_VERSION = 1
+DEFAULT_OUT = "test_results/walkforward.csv"
+CACHED_COLUMNS = ('adx', 'macd', 'ema20', 'slope')
+
+THRESHOLDS = ('adx_min', 'macd_min', 'price_ema_max')
+DEFAULT_GRID = {
+    'ema_period': (14, 20, 30),
+    'adx_min': (6, 8, 10, 12, 15, 20),
+    'macd_min': (0.0002, 0.0003, 0.0005, 0.0008, 0.001),
+    'price_ema_max': (0.002, 0.003, 0.005, 0.008),
+}
+NONE, CALL, PUT = 0, 1, 2
+
+
+# -------------------------------------------------------------- indicators
+def indicator_paths(pair, ema_period, rsi_period, cache_dir=CACHE_DIR):
+    """Cache directory of one (pair, EMA period, RSI period)"""
+    return os.path.join(cache_dir, pair, f"ema{ema_period}_rsi{rsi_period}")
+
+
+def cache_indicators(store, pair, ema_period, rsi_period, cache_dir=CACHE_DIR):
+    """Compute (or reuse) the full-history indicators of a pair; returns the cache directory"""
+    path = indicator_paths(pair, ema_period, rsi_period, cache_dir)
+    st = os.stat(os.path.join(store.pair_dir(pair), "time.npy"))
+    stamp = {'version': CACHE_VERSION, 'candles': [st.st_size, st.st_mtime_ns]}
+    try:
+        with open(os.path.join(path, "stamp.json")) as f:
+            if json.load(f) == stamp:
+                return path
+    except (OSError, ValueError):
+        pass
+
+    start = time.perf_counter()
+    cols = store.columns(pair)
+    values = compute(*(np.asarray(cols[name], dtype=np.float64)[None, :] for name in ('high', 'low', 'close')),
+                     ema_period=ema_period, rsi_period=rsi_period)
+    os.makedirs(path, exist_ok=True)
+    for name in CACHED_COLUMNS:
+        tmp = os.path.join(path, f"{name}.tmp.npy")
+        np.save(tmp, values[name][0])
+        os.replace(tmp, os.path.join(path, f"{name}.npy"))
+    # stamp last: an interrupted write is recomputed next time
+    with open(os.path.join(path, "stamp.json"), 'w') as f:
+        json.dump(stamp, f)
+    logger.info(f"🧮 {pair}: indicators EMA{ema_period}/RSI{rsi_period} for {len(cols['time'])} candles "
+                f"cached in {time.perf_counter() - start:.1f}s")
+    return path
+
+
+def load_arrays(store_root, pair, path):
+    """Memory-mapped candle and indicator columns of a pair"""
+    store = CandleStore(store_root)
+    cols = store.columns(pair)
+    arrays = {'time': cols['time'], 'close': cols['close']}
+    for name in CACHED_COLUMNS:
+        arrays[name] = np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r')
+    return arrays
+
+
+# ------------------------------------------------------------------- rules
+def hour_directions(pair_config):
+    """
+    Allowed direction per UTC hour (NONE / CALL / PUT)
+
+    Same rules as the bot: trading_hours (start > end wraps midnight), then
+    the first session filter with start <= hour <= end.
+    """
+    start, end = pair_config['trading_hours']['start'], pair_config['trading_hours']['end']
+    table = np.full(24, NONE, dtype=np.int8)
+    for hour in range(24):
+        if not (hour >= start or hour < end if start > end else start <= hour < end):
+            continue
+        for session, direction in pair_config.get('session_filters', {}).items():
+            lo, hi = map(int, session.split('-'))
+            if lo <= hour <= hi:
+                table[hour] = CALL if direction.lower() == 'call' else PUT
+                break
+    return table
+
+
+def candidates(arrays, lo, hi, hours):
+    """
+    Per-candle inputs of decide() for candles lo..hi-1 that can trade
+
+    Returns (adx, |macd|, price-EMA distance, move) of the candles whose
+    session direction agrees with slope and MACD and whose next candle
+    exists; move > 0 is a win for that direction.
+    """
+    times = np.asarray(arrays['time'][lo:hi + 1])
+    close = np.asarray(arrays['close'][lo:hi + 1], dtype=np.float64)
+    n = len(times) - 1
+    if n <= 0:
+        return tuple(np.empty(0) for _ in range(4))
+    adx, macd, ema, slope = (np.asarray(arrays[name][lo:lo + n], dtype=np.float64)
+                             for name in CACHED_COLUMNS)
+    entry, exit = close[:n], close[1:]
+
+    # evaluated at the candle's close: the hour of the next candle's start
+    direction = hours[((times[:n] + 60) // 3600) % 24]
+    agrees = (((direction == CALL) & (slope > 0) & (macd > 0)) |
+              ((direction == PUT) & (slope < 0) & (macd < 0)))
+    keep = agrees & (times[1:] == times[:n] + 60)
+
+    with np.errstate(invalid='ignore'):
+        distance = np.abs(entry - ema) / entry
+    move = np.where(direction == CALL, exit - entry, entry - exit)
+    return adx[keep], np.abs(macd[keep]), distance[keep], move[keep]
+
+
+def grid_results(inputs, grid, amount, payout):
+    """
+    Trades, wins and profit for every threshold combination at once
+
+    Returns arrays shaped like the grid (adx_min x macd_min x price_ema_max).
+    """
+    adx, macd, distance, move = inputs
+    # negated like decide(): a NaN indicator does not reject the candle
+    with np.errstate(invalid='ignore'):
+        mask = (~(adx[None, :] < np.asarray(grid['adx_min'])[:, None])[:, None, None, :] &
+                ~(macd[None, :] < np.asarray(grid['macd_min'])[:, None])[None, :, None, :] &
+                ~(distance[None, :] > np.asarray(grid['price_ema_max'])[:, None])[None, None, :, :])
+    trades = mask.sum(axis=-1)
+    wins = (mask & (move > 0)).sum(axis=-1)
+    losses = (mask & (move < 0)).sum(axis=-1)
+    return trades, wins, wins * amount * payout - losses * amount
+
+
+def evaluate(inputs, thresholds, amount, payout):
+    """(trades, wins, profit) of one threshold set"""
+    grid = {name: (thresholds[name],) for name in THRESHOLDS}
+    trades, wins, profit = grid_results(inputs, grid, amount, payout)
+    return int(trades.ravel()[0]), int(wins.ravel()[0]), float(profit.ravel()[0])
+
+
+# ------------------------------------------------------------------- folds
+def make_folds(times, train_days, test_days):
+    """[(train_lo, train_hi, test_hi)] candle index ranges of the rolling folds"""
+    if len(times) == 0:
+        return []
+    first, last = int(times[0]), int(times[-1])
+    train, test = train_days * 86400, test_days * 86400
+    folds = []
+    start = first
+    while start + train + test <= last + 60:
+        lo, mid, hi = np.searchsorted(times, [start, start + train, start + train + test])
+        folds.append((int(lo), int(mid), int(hi)))
+        start += test
+    return folds
+
+
+def run_fold(task):
+    """Tune on one train window and evaluate tuned and current thresholds on its test window (pool worker)"""
+    pair, fold, (lo, mid, hi), paths, current, grid, hours, amount, payout, min_trades, store_root = task
+    best = None
+    for ema_period in grid['ema_period']:
+        arrays = load_arrays(store_root, pair, paths[ema_period])
+        trades, wins, profit = grid_results(candidates(arrays, lo, mid, hours), grid, amount, payout)
+        score = np.where(trades >= min_trades, profit, -np.inf)
+        i = np.unravel_index(int(np.argmax(score)), score.shape)
+        if np.isfinite(score[i]) and (best is None or score[i] > best[0]):
+            params = {name: grid[name][k] for name, k in zip(THRESHOLDS, i)}
+            best = (float(score[i]), {'ema_period': ema_period, **params})
+    tuned = best[1] if best else dict(current)
+
+    arrays = load_arrays(store_root, pair, paths[current['ema_period']])
+    times = arrays['time']
+    row = {
+        'pair': pair,
+        'fold': fold,
+        'train_start': pd.to_datetime(int(times[lo]), unit='s'),
+        'test_start': pd.to_datetime(int(times[mid]), unit='s') if mid < len(times) else None,
+        'test_end': pd.to_datetime(int(times[hi - 1]), unit='s'),
+        'tuned': best is not None,
+        **{f"tuned_{name}": tuned[name] for name in ('ema_period',) + THRESHOLDS},
+    }
+    for label, params in (('current', current), ('tuned', tuned)):
+        arrays = load_arrays(store_root, pair, paths[params['ema_period']])
+        for window, (a, b) in (('train', (lo, mid)), ('test', (mid, hi))):
+            trades, wins, profit = evaluate(candidates(arrays, a, b, hours), params, amount, payout)
+            row[f"{label}_{window}_trades"] = trades
+            row[f"{label}_{window}_win_rate"] = round(wins / trades * 100, 1) if trades else None
+            row[f"{label}_{window}_profit"] = round(profit, 2)
+    return row
+
+
+def stability(report):
+    """Per pair: out-of-sample tuned vs current and how steady the tuned thresholds are"""
+    rows = []
+    for pair, folds in report.groupby('pair', sort=True):
+        row = {
+            'pair': pair,
+            'folds': len(folds),
+            'current_test_profit': round(folds['current_test_profit'].sum(), 2),
+            'tuned_test_profit': round(folds['tuned_test_profit'].sum(), 2),
+            'tuned_beats_current': f"{(folds['tuned_test_profit'] > folds['current_test_profit']).sum()}/{len(folds)}",
+            # tuned train profit vs what it kept on the test window (overfitting shows as a big drop)
+            'tuned_train_profit': round(folds['tuned_train_profit'].sum(), 2),
+        }
+        for name in ('ema_period',) + THRESHOLDS:
+            counts = folds[f"tuned_{name}"].value_counts()
+            row[name] = f"{counts.index[0]:g} ({counts.iloc[0]}/{len(folds)})"
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def walk_forward(config, store, pairs, train_days, test_days, grid=DEFAULT_GRID, min_trades=20,
+                 workers=None, cache_dir=CACHE_DIR):
+    """Fold-by-fold report (DataFrame) of tuned vs current thresholds"""
+    amount, payout = config['amount'], config.get('payout', 0.8)
+    tasks = []
+    for pair in pairs:
+        cfg = config['currencies'][pair]
+        ind = cfg.get('indicators', config['default_indicators'])
+        current = {'ema_period': ind.get('ema_period', 20), **{name: ind[name] for name in THRESHOLDS}}
+        rsi_period = ind.get('rsi_period', 14)
+
+        # every indicator set is cached here, once, before the workers read them
+        periods = sorted(set(grid.get('ema_period', ())) | {current['ema_period']})
+        paths = {period: cache_indicators(store, pair, period, rsi_period, cache_dir) for period in periods}
+        folds = make_folds(store.columns(pair)['time'], train_days, test_days)
+        if not folds:
+            logger.warning(f"⚠️  {pair}: history shorter than one fold ({train_days}+{test_days} days)")
+        searched = {'ema_period': tuple(grid.get('ema_period', ())) or (current['ema_period'],),
+                    **{name: grid[name] for name in THRESHOLDS}}
+        for n, fold in enumerate(folds):
+            tasks.append((pair, n, fold, paths, current, searched, hour_directions(cfg), amount, payout,
+                          min_trades, store.root))
+
+    if not tasks:
+        return pd.DataFrame()
+    start = time.perf_counter()
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        rows = list(pool.map(run_fold, tasks))
+    logger.info(f"🔁 {len(tasks)} folds in {time.perf_counter() - start:.1f}s")
+    return pd.DataFrame(rows)
+
+
+def main():
+    """Command line entry point"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Walk-forward validation of the per-pair thresholds")
+    parser.add_argument("--pair", nargs="+", help="pairs (default: enabled pairs in the candle store)")
+    parser.add_argument("--train-days", type=int, default=14)
+    parser.add_argument("--test-days", type=int, default=3)
+    parser.add_argument("--min-trades", type=int, default=20, help="fewest train trades for a tuned set")
+    parser.add_argument("--workers", type=int, help="pool processes (default: CPU count)")
+    parser.add_argument("--config", default=CONFIG_PATH)
+    parser.add_argument("--root", default=DEFAULT_ROOT, help="candle store directory")
+    parser.add_argument("--out", default=DEFAULT_OUT, help="fold-by-fold CSV")
+    args = parser.parse_args()
+
+    with open(args.config) as f:
+        config = json.load(f)
+    store = CandleStore(args.root)
+    pairs = args.pair or [pair for pair, cfg in config['currencies'].items()
+                          if cfg.get('enabled', False) and store.has_pair(pair)]
+    missing = [pair for pair in pairs if pair not in config['currencies'] or not store.has_pair(pair)]
+    if missing:
+        parser.error(f"not in the config or the candle store: {', '.join(missing)}")
+    if not pairs:
+        parser.error(f"no enabled pair has candles in {args.root} (python candle_store.py build ...)")
+
+    report = walk_forward(config, store, pairs, args.train_days, args.test_days,
+                          min_trades=args.min_trades, workers=args.workers)
+    if report.empty:
+        print("No complete fold")
+        return
+
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    report.to_csv(args.out, index=False)
+    columns = ['pair', 'fold', 'test_start', 'tuned_ema_period', *(f"tuned_{name}" for name in THRESHOLDS),
+               'tuned_train_profit', 'current_test_trades', 'current_test_win_rate', 'current_test_profit',
+               'tuned_test_trades', 'tuned_test_win_rate', 'tuned_test_profit']
+    with pd.option_context('display.max_rows', None, 'display.max_columns', None, 'display.width', 250):
+        print(report[columns].to_string(index=False))
+        print()
+        print(stability(report).to_string(index=False))
+    print(f"\nFold report written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()